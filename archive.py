@@ -0,0 +1,214 @@
+"""A compact archive of traces for long-term monitoring.
+
+Traces are stored as blocks of consecutive traces on one frequency axis.
+Within a block, every trace is:
+  - quantized to int16 in steps of 1/SCALE dB (NaN gets its own code)
+  - delta coded against the previous trace of the block, which is mostly
+    small numbers as the noise floor and steady signals barely change
+  - zigzag coded, mapping small negative and positive deltas alike to
+    small unsigned numbers (0, -1, 1, -2, ... to 0, 1, 2, 3, ...)
+  - byte shuffled, so the high bytes, nearly all zero, compress as long
+    runs
+and the block is compressed with zlib. Blocks don't depend on each other, so
+any block can be decoded on its own by seeking to it. Every step is a whole
+array numpy operation.
+
+An archive file is a sequence of blocks, each a BLOCK_HEADER followed by
+the compressed trace_info rows (tracestore.TRACE_META_DTYPE) and the
+compressed traces. The tiles of every block, as in a trace store, are kept
+beside it in the archive's path + TILES_SUFFIX, so queries only decode the
+blocks they need.
+"""
+
+import os
+import zlib
+import struct
+
+import numpy as np
+
+from tracestore import (TRACE_META_DTYPE, tile_writer, read_tiles,
+                        select_chunks)
+
+
+SCALE = 10         # quantization steps per dB
+NAN_CODE = -32768  # code of NaN, never the code of a power
+LEVEL = 1          # zlib compression level, favouring speed
+TILES_SUFFIX = ".tiles"
+
+# little endian:
+#   4s       magic, BLOCK_MAGIC
+#   uint32   number of traces
+#   uint32   points per trace
+#   float64  frequency of the first bin in Hz
+#   float64  bin width in Hz
+#   float64  start time of the first sweep
+#   float64  end time of the last sweep
+#   uint32   bytes of compressed trace_info rows
+#   uint32   bytes of compressed traces
+BLOCK_HEADER = struct.Struct("<4sIIddddII")
+BLOCK_MAGIC = b"GRA1"
+
+
+def quantize(traces):
+    """Return float dBm traces as int16 codes."""
+    codes = np.round(traces * SCALE)
+    np.clip(codes, NAN_CODE + 1, 32767, out=codes)
+    codes[np.isnan(traces)] = NAN_CODE
+    return codes.astype(np.int16)
+
+
+def dequantize(codes):
+    traces = codes.astype(np.float32)
+    traces /= SCALE
+    traces[codes == NAN_CODE] = np.nan
+    return traces
+
+
+def encode(traces):
+    """Return the compressed form of a 2-D array of traces."""
+    codes = quantize(np.asarray(traces, dtype=np.float32))
+    deltas = codes.copy()
+    deltas[1:] -= codes[:-1] # wraps around, as cumsum does when decoding
+    deltas = deltas.astype(np.int32)
+    zigzag = ((deltas << 1) ^ (deltas >> 15)).astype(np.uint16)
+    # shuffle: all low bytes, then all high bytes
+    shuffled = zigzag.view(np.uint8).reshape(-1, 2).T
+    return zlib.compress(np.ascontiguousarray(shuffled).tostring(), LEVEL)
+
+
+def decode(data, nrows, npoints):
+    """Return the traces compressed by encode."""
+    shuffled = np.frombuffer(zlib.decompress(data), dtype=np.uint8)
+    zigzag = shuffled.reshape(2, -1).T.copy().view(np.uint16)
+    zigzag = zigzag.astype(np.int32)
+    deltas = ((zigzag >> 1) ^ -(zigzag & 1)).astype(np.int16)
+    codes = np.cumsum(deltas.reshape(nrows, npoints), axis=0, dtype=np.int16)
+    return dequantize(codes)
+
+
+class archive_writer(object):
+    """Append blocks of traces to an archive file.
+
+    Has the same append as tracestore.store_writer, so a
+    tracestore.trace_recorder can write to either (--archive). Blocks are
+    written by an async_writer, and one the disk can't take in time is
+    dropped whole, so the archive stays readable.
+    """
+    def __init__(self, path):
+        # only imported here, keeping this module importable without the
+        # analyzer package
+        from analyzer import async_writer
+
+        self.path = path
+        self.nblocks = 0
+        if os.path.exists(path):
+            reader = archive_reader(path)
+            self.nblocks = len(reader.blocks)
+            end = reader.end(self.nblocks - 1) if reader.blocks else 0
+            reader.close()
+            # drop a block cut short by a crash, which would hide every
+            # block appended after it from readers
+            with open(path, 'r+b') as f:
+                f.truncate(end)
+        self.writer = async_writer(path, append=True)
+        self.tiles = tile_writer(path + TILES_SUFFIX, self.nblocks)
+
+    def append(self, axis, traces, meta):
+        """Write traces (2-D float32) and their meta rows as a block.
+
+        axis is the (min_freq, deltaf) of the traces' bins.
+        """
+        nrows, npoints = traces.shape
+        meta = np.asarray(meta, dtype=TRACE_META_DTYPE)
+        packed_meta = zlib.compress(meta.tostring(), LEVEL)
+        packed_traces = encode(traces)
+        min_freq, deltaf = axis
+        header = BLOCK_HEADER.pack(BLOCK_MAGIC, nrows, npoints,
+                                   min_freq, deltaf,
+                                   meta['start_time'][0],
+                                   meta['end_time'][-1],
+                                   len(packed_meta), len(packed_traces))
+        if not self.writer.write(header + packed_meta + packed_traces):
+            return
+        # A crash can leave the tiles without their block, which are
+        # dropped on reopening, or the block without its tiles, which
+        # queries never rule out
+        self.tiles.append(self.nblocks, axis, traces, meta)
+        self.nblocks += 1
+
+    def flush(self):
+        """Return once every block appended is in the file."""
+        self.writer.flush()
+
+    def stats(self):
+        return self.writer.stats()
+
+    def close(self):
+        self.writer.close()
+        self.tiles.close()
+
+
+class archive_reader(object):
+    """Read blocks of an archive file.
+
+    The blocks are found by reading only their headers, and a block is read
+    and decoded only when asked for. blocks is a list of dicts, one per
+    block: offset, nrows, npoints, min_freq, deltaf, start_time, end_time.
+    """
+    def __init__(self, path):
+        self.f = open(path, 'rb')
+        self.blocks = []
+        offset = 0
+        while True:
+            self.f.seek(offset)
+            header = self.f.read(BLOCK_HEADER.size)
+            if len(header) < BLOCK_HEADER.size:
+                break # end of file, or a block cut short by a crash
+            (magic, nrows, npoints, min_freq, deltaf, start_time, end_time,
+             meta_len, data_len) = BLOCK_HEADER.unpack(header)
+            if magic != BLOCK_MAGIC:
+                raise ValueError("{} is not a trace archive".format(path))
+            end = offset + BLOCK_HEADER.size + meta_len + data_len
+            self.f.seek(0, 2)
+            if end > self.f.tell():
+                break
+            self.blocks.append(dict(offset=offset,
+                                    nrows=nrows,
+                                    npoints=npoints,
+                                    min_freq=min_freq,
+                                    deltaf=deltaf,
+                                    start_time=start_time,
+                                    end_time=end_time,
+                                    meta_len=meta_len,
+                                    data_len=data_len))
+            offset = end
+
+    def end(self, i):
+        """Return the offset of the end of block i."""
+        block = self.blocks[i]
+        return (block['offset'] + BLOCK_HEADER.size + block['meta_len'] +
+                block['data_len'])
+
+    def read(self, i):
+        """Return the (meta, traces) of block i."""
+        block = self.blocks[i]
+        self.f.seek(block['offset'] + BLOCK_HEADER.size)
+        meta = np.frombuffer(zlib.decompress(self.f.read(block['meta_len'])),
+                             dtype=TRACE_META_DTYPE)
+        traces = decode(self.f.read(block['data_len']),
+                        block['nrows'],
+                        block['npoints'])
+        return meta, traces
+
+    def close(self):
+        self.f.close()
+
+
+def query_archive(path, time_range=None, freq_range=None):
+    """Return the numbers of the blocks of the archive at path with traces
+    overlapping time_range and freq_range, found from the tiles."""
+    reader = archive_reader(path)
+    nblocks = len(reader.blocks)
+    reader.close()
+    return select_chunks(read_tiles(path + TILES_SUFFIX), range(nblocks),
+                         time_range, freq_range)
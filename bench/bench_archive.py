@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+"""Measure the compression ratio and speed of the trace archive.
+
+For each encoding, reports:
+  - ratio: size of the float32 traces over their encoded size
+  - encode, decode: MB/s of float32 traces in and out
+
+Encodings, each adding one step of archive.encode:
+  - zlib: the float32 traces, compressed
+  - int16: quantized to 0.1 dB, compressed
+  - delta: quantized and delta coded against the previous trace
+  - archive: quantized, delta and zigzag coded and byte shuffled
+    (archive.encode)
+
+Traces are synthetic unless a trace store recorded with --store is given,
+e.g.
+
+  bench/bench_archive.py --store /data/store --block 256
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import time
+import zlib
+import argparse
+
+import numpy as np
+
+TOPDIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, TOPDIR)
+
+import archive
+from tracestore import read_index
+
+
+def synthetic_traces(ntraces, npoints):
+    """Return averaged noise around -100 dBm with steady carriers, a
+    drifting signal and occasional bursts, like a busy band."""
+    rng = np.random.RandomState(0)
+    # averaging 30 frames leaves about 0.8 dB of noise on the log power
+    traces = rng.normal(-100, 0.8, (ntraces, npoints))
+    ripple = 3 * np.sin(np.linspace(0, 6 * np.pi, npoints))
+    traces += ripple
+    for center in rng.randint(0, npoints, 20):
+        width = rng.randint(5, 200)
+        traces[:, center:center + width] += rng.uniform(20, 60)
+    for i in xrange(ntraces):
+        if rng.rand() < 0.1:
+            center = rng.randint(0, npoints - 500)
+            traces[i, center:center + 500] += 40
+        drift = (i * 7) % npoints
+        traces[i, drift:drift + 50] += 30
+    return traces.astype(np.float32)
+
+
+def stored_traces(path, ntraces):
+    """Return up to ntraces traces of the first axis in a trace store."""
+    entries = read_index(path)
+    if not entries:
+        sys.exit("no traces in store {}".format(path))
+    npoints = entries[0]['npoints']
+    chunks = []
+    for entry in entries:
+        if entry['npoints'] == npoints:
+            chunks.append(np.load(os.path.join(path, entry['data'])))
+        if sum(len(c) for c in chunks) >= ntraces:
+            break
+    return np.concatenate(chunks)[:ntraces]
+
+
+def zlib_float(block):
+    return zlib.compress(block.tostring(), archive.LEVEL)
+
+
+def zlib_int16(block):
+    return zlib.compress(archive.quantize(block).tostring(), archive.LEVEL)
+
+
+def zlib_delta(block):
+    codes = archive.quantize(block)
+    deltas = codes.copy()
+    deltas[1:] -= codes[:-1]
+    return zlib.compress(deltas.tostring(), archive.LEVEL)
+
+
+def measure(encode, decode, blocks):
+    """Return ratio, encode MB/s and decode MB/s over blocks."""
+    raw = sum(block.nbytes for block in blocks)
+    start = time.time()
+    encoded = [encode(block) for block in blocks]
+    encode_time = time.time() - start
+    size = sum(len(data) for data in encoded)
+
+    decode_rate = None
+    if decode is not None:
+        start = time.time()
+        for data, block in zip(encoded, blocks):
+            decode(data, *block.shape)
+        decode_rate = raw / 1e6 / (time.time() - start)
+
+    return raw / float(size), raw / 1e6 / encode_time, decode_rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--store", type=str, default=None,
+                        help="trace store to take traces from" +
+                             " [default=synthetic traces]")
+    parser.add_argument("--traces", type=int, default=1024,
+                        help="traces to encode [default=%(default)s]")
+    parser.add_argument("--bins", type=int, default=100000,
+                        help="points per synthetic trace" +
+                             " [default=%(default)s]")
+    parser.add_argument("--block", type=int, default=256,
+                        help="traces per archive block [default=%(default)s]")
+    args = parser.parse_args()
+
+    if args.store:
+        traces = stored_traces(args.store, args.traces)
+    else:
+        traces = synthetic_traces(args.traces, args.bins)
+    blocks = [traces[i:i + args.block]
+              for i in xrange(0, len(traces), args.block)]
+
+    # check the round trip before timing it
+    decoded = archive.decode(archive.encode(blocks[0]), *blocks[0].shape)
+    error = np.nanmax(np.abs(decoded - blocks[0]))
+    print("{} traces of {} points, max quantization error {:.3f} dB".format(
+        len(traces), traces.shape[1], error))
+
+    encodings = [("zlib", zlib_float, None),
+                 ("int16", zlib_int16, None),
+                 ("delta", zlib_delta, None),
+                 ("archive", archive.encode, archive.decode)]
+    print("{:>10} {:>8} {:>12} {:>12}".format("encoding", "ratio",
+                                               "encode MB/s", "decode MB/s"))
+    for name, encode, decode in encodings:
+        ratio, encode_rate, decode_rate = measure(encode, decode, blocks)
+        decoded = "-" if decode_rate is None else "{:.1f}".format(decode_rate)
+        print("{:>10} {:>8.2f} {:>12.1f} {:>12}".format(name, ratio,
+                                                        encode_rate,
+                                                        decoded))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+"""Soak test full-rate I/Q recording (--iq-record) without a radio.
+
+Feeds an iq_recorder_s sc16 samples at each sample rate in real time, in
+calls to work of the size the flowgraph would make, for --duration seconds,
+and reports:
+  - drops: writes dropped because the disk fell behind (must be 0)
+  - max queue: most buffers waiting for the disk, of the pool
+  - MB/s: rate written to the recordings
+  - work ms: slowest call to work, against the time its samples last
+  - lag ms: furthest work fell behind the samples arriving, which the
+    radio and flowgraph buffers must absorb (must stay under LAG_LIMIT)
+
+The recordings go to --dir, so point it at the disk that will record, and
+are deleted afterwards unless --keep is given, e.g.
+
+  bench/bench_iq_record.py --dir /data --rates 10M 25M 50M --duration 60
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+
+TOPDIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, TOPDIR)
+
+from cli_parser import eng_float
+
+LAG_LIMIT = 0.1 # seconds, about what the USRP and flowgraph buffers hold
+
+
+def soak(directory, rate, duration, items, segment_len, max_bytes):
+    from analyzer import iq_recorder_s
+
+    recorder = iq_recorder_s(rate, segment_len, [1e9, 2e9, 3e9], directory,
+                             max_bytes=max_bytes)
+    shorts = np.random.randint(-2**15, 2**15, 2 * items).astype(np.int16)
+    period = items / rate   # seconds of samples per call
+
+    max_queue = 0
+    worst = 0.0
+    lag = 0.0
+    start = time.time()
+    ncalls = 0
+    while ncalls * period < duration:
+        # pace the calls as the radio would, falling behind if work can't
+        # keep up
+        delay = start + ncalls * period - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            lag = max(lag, -delay)
+        t0 = time.time()
+        recorder.work([shorts], [])
+        worst = max(worst, time.time() - t0)
+        ncalls += 1
+
+        stats = recorder.stats()
+        max_queue = max(max_queue, stats['queue_depth'])
+    elapsed = time.time() - start
+
+    recorder.stop()
+    recorder.close()
+    stats = recorder.stats() # totals over every recording
+    return {
+        'drops': stats['dropped_writes'],
+        'max_queue': max_queue,
+        'queue_capacity': stats['queue_capacity'],
+        'write_rate': ncalls * shorts.nbytes / 1e6 / elapsed,
+        'worst': worst,
+        'period': period,
+        'lag': lag,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--dir", type=str, default=None,
+                        help="directory to record to [default=a temporary" +
+                             " directory]")
+    parser.add_argument("--rates", type=eng_float, nargs="+",
+                        default=[10e6, 25e6, 50e6],
+                        help="sample rates to soak [default=%(default)s]")
+    parser.add_argument("--duration", type=float, default=30,
+                        help="seconds per rate [default=%(default)s]")
+    parser.add_argument("--items", type=int, default=8192,
+                        help="samples per call to work [default=%(default)s]")
+    parser.add_argument("--segment-len", type=int, default=1024 * 15,
+                        help="samples per segment [default=%(default)s]")
+    parser.add_argument("--max-mb", type=int, default=1024,
+                        help="rotate recordings at this size" +
+                             " [default=%(default)s]")
+    parser.add_argument("--keep", action="store_true",
+                        help="keep the recordings")
+    args = parser.parse_args()
+
+    print("{:>8} {:>6} {:>10} {:>8} {:>16} {:>8}".format(
+        "MS/s", "drops", "max queue", "MB/s", "work ms", "lag ms"))
+    failed = False
+    for rate in args.rates:
+        directory = tempfile.mkdtemp(prefix="bench-iq-", dir=args.dir)
+        try:
+            r = soak(directory, rate, args.duration, args.items,
+                     args.segment_len, args.max_mb * 10**6)
+        finally:
+            if not args.keep:
+                shutil.rmtree(directory)
+        failed |= r['drops'] > 0 or r['lag'] > LAG_LIMIT
+        print("{:>8.1f} {:>6} {:>10} {:>8.1f} {:>7.3f} of {:>6.3f} {:>8.1f}"
+              .format(rate / 1e6, r['drops'],
+                      "{}/{}".format(r['max_queue'], r['queue_capacity']),
+                      r['write_rate'], r['worst'] * 1e3, r['period'] * 1e3,
+                      r['lag'] * 1e3))
+
+    if failed:
+        print("overflow: writes dropped, or work fell behind the samples")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
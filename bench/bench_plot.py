@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+"""Measure how many frames per second each plot backend can draw.
+
+For each trace length, reports frames per second of:
+  - mpl full:      matplotlib drawing every point, as before decimation
+  - mpl decimated: matplotlib drawing min/max pairs per pixel column
+  - raster:        numpy rasterization into an RGB buffer (gui.raster_backend
+                   without the final copy to the screen)
+
+Decimation is timed separately, since it runs in the flowgraph's thread,
+as is building the min/max pyramid of a trace (decimate.minmax_pyramid) and
+redecimating from it while zooming into a tenth of the trace.
+matplotlib uses the Agg backend, so no display is needed, e.g.
+
+  bench/bench_plot.py --points 10000 100000 1000000
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+TOPDIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, TOPDIR)
+
+import raster
+from decimate import decimate_view, minmax_pyramid
+
+
+# same size as the data area of the 700x600 plot panel
+WIDTH, HEIGHT = 600, 500
+YLIM = (-119, -1)
+
+
+def rate(func, frames):
+    """Return calls per second of func over frames calls."""
+    func(0) # warm up caches
+    start = time.time()
+    for i in xrange(frames):
+        func(i)
+    return frames / (time.time() - start)
+
+
+def mpl_fps(x, traces, frames, decimate):
+    figure = Figure(figsize=(7, 6), dpi=100)
+    canvas = FigureCanvasAgg(figure)
+    ax = figure.add_subplot(111)
+    ax.set_xlim(x[0], x[-1])
+    ax.set_ylim(*YLIM)
+    line, = ax.plot([], [], animated=True, antialiased=True, color='b')
+    canvas.draw()
+    background = canvas.copy_from_bbox(ax.bbox)
+    view = (x[0], x[-1], int(ax.bbox.width))
+
+    def draw(i):
+        y = traces[i % len(traces)]
+        if decimate:
+            line.set_data(*decimate_view(x, y, view))
+        else:
+            line.set_data(x, y)
+        canvas.restore_region(background)
+        ax.draw_artist(line)
+        canvas.blit(ax.bbox)
+
+    return rate(draw, frames)
+
+
+def raster_fps(x, traces, frames):
+    background = np.empty((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    background[...] = 255
+    pixels = background.copy()
+    view = (x[0], x[-1], WIDTH)
+    decimated = [decimate_view(x, y, view) for y in traces]
+    xlim = (x[0], x[-1])
+
+    def draw(i):
+        xd, yd = decimated[i % len(decimated)]
+        np.copyto(pixels, background)
+        top, bottom = raster.trace_spans(xd, yd, xlim, YLIM, WIDTH, HEIGHT)
+        raster.draw_spans(pixels, top, bottom, (0, 0, 255))
+
+    return rate(draw, frames)
+
+
+def decimate_rate(x, traces, frames):
+    view = (x[0], x[-1], WIDTH)
+
+    def decimate(i):
+        decimate_view(x, traces[i % len(traces)], view)
+
+    return rate(decimate, frames)
+
+
+def pyramid_rates(x, traces, frames):
+    """Return pyramid builds/s, and zoomed redecimations/s without and
+    with the pyramid."""
+    pyramids = [minmax_pyramid(y) for y in traces]
+    span = x[-1] - x[0]
+    views = [(x[0] + f * span, x[0] + (f + 0.1) * span, WIDTH)
+             for f in np.linspace(0, 0.9, frames)]
+
+    def build(i):
+        minmax_pyramid(traces[i % len(traces)])
+
+    def zoom(i):
+        decimate_view(x, traces[i % len(traces)], views[i % len(views)])
+
+    def zoom_pyramid(i):
+        n = i % len(traces)
+        pyramids[n].decimate(x, traces[n], views[i % len(views)])
+
+    return rate(build, frames), rate(zoom, frames), rate(zoom_pyramid, frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, nargs='+',
+                        default=[10000, 100000, 1000000],
+                        help="trace lengths to measure [default=%(default)s]")
+    parser.add_argument("--frames", type=int, default=50,
+                        help="frames per measurement [default=%(default)s]")
+    parser.add_argument("--skip-full", action="store_true",
+                        help="skip undecimated matplotlib, which is slow on" +
+                             " long traces")
+    args = parser.parse_args()
+
+    header = "{:>10} {:>12} {:>14} {:>10} {:>14} {:>10} {:>10} {:>10}"
+    row = ("{:>10} {:>12} {:>14.1f} {:>10.1f} {:>14.1f} {:>10.1f}" +
+           " {:>10.1f} {:>10.1f}")
+    print(header.format("points", "mpl full", "mpl decimated", "raster",
+                        "decimations/s", "pyramids/s", "zooms/s",
+                        "pyr zooms/s"))
+    for npoints in args.points:
+        x = np.linspace(690e6, 710e6, npoints)
+        traces = np.random.uniform(-110, -20, (4, npoints)).astype(np.float32)
+
+        if args.skip_full:
+            full = "-"
+        else:
+            full = "{:.1f}".format(mpl_fps(x, traces, args.frames, False))
+        print(row.format(npoints,
+                         full,
+                         mpl_fps(x, traces, args.frames, True),
+                         raster_fps(x, traces, args.frames),
+                         decimate_rate(x, traces, args.frames),
+                         *pyramid_rates(x, traces, args.frames)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+"""Measure how fast the processing chain runs on a recorded sweep.
+
+Replays a SigMF recording (--replay) through the full flowgraph, headless,
+so results don't depend on a radio and can be compared run to run. Reports:
+  - sweeps/s: traces produced per second
+  - MS/s: I/Q samples processed per second
+
+Takes the same arguments as gr_analyzer.py, so processing settings can be
+compared on the same recording, e.g.
+
+  bench/bench_replay.py 700M --span 100M --replay sweep.sigmf-meta -F 2048
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+TOPDIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, TOPDIR)
+
+from cli_parser import init_parser
+
+
+def main():
+    parser = init_parser()
+    parser.add_argument("--sweeps", type=int, default=20,
+                        help="sweeps to time [default=%(default)s]")
+    args = parser.parse_args()
+    if not args.replay:
+        parser.error("--replay is required")
+
+    from configuration import configuration
+    from gr_analyzer import top_block
+    from sinks import callback_sink
+
+    traces = []
+
+    def on_trace(points, info):
+        traces.append(time.time())
+
+    # Single runs of one sweep each, headless so the wx main loop can't
+    # skew the timing
+    args.continuous_run = False
+    args.headless = True
+    cfg = configuration(args)
+    tb = top_block(cfg, sink=callback_sink(on_trace))
+    tb.run()  # warm up
+
+    start = time.time()
+    for _ in xrange(args.sweeps):
+        tb.run()
+        tb.timedata_sink.reset()
+        tb.freqdata_sink.reset()
+    elapsed = time.time() - start
+
+    cfg = tb.cfg
+    samples = cfg.n_segments * cfg.fft_size * cfg.nframes * args.sweeps
+    print("{} sweeps of {} segments, {} bins, {} frames".format(
+        args.sweeps, cfg.n_segments, cfg.fft_size, cfg.nframes))
+    print("{:<10} {:>10.1f}".format("sweeps/s", args.sweeps / elapsed))
+    print("{:<10} {:>10.1f}".format("MS/s", samples / 1e6 / elapsed))
+
+
+if __name__ == '__main__':
+    main()
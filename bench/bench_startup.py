@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""Measure gr-analyzer startup time.
+
+Reports, in order:
+  - import time of the processing core and of the gui, each in a fresh
+    interpreter so that nothing is already cached in sys.modules
+  - UHD device discovery
+  - time from building the top_block to the end of the first sweep
+
+Takes the same arguments as gr_analyzer.py, e.g.
+
+  bench/bench_startup.py 700M --span 100M
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import time
+import subprocess
+
+TOPDIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, TOPDIR)
+
+from cli_parser import init_parser
+
+
+IMPORT_TIMER = "import time; t = time.time(); import {}; print(time.time() - t)"
+
+
+def time_import(module, repeat):
+    """Return the best time to import module in a fresh interpreter."""
+    times = []
+    for _ in range(repeat):
+        cmd = [sys.executable, "-c", IMPORT_TIMER.format(module)]
+        out = subprocess.check_output(cmd, cwd=TOPDIR)
+        times.append(float(out.strip().splitlines()[-1]))
+
+    return min(times)
+
+
+def report(label, seconds):
+    print("{:<30} {:>10.1f} ms".format(label, seconds * 1e3))
+
+
+def main():
+    parser = init_parser()
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="import timing repetitions [default=%(default)s]")
+    args = parser.parse_args()
+
+    report("import processing core", time_import("gr_analyzer", args.repeat))
+    report("import gui", time_import("gui", args.repeat))
+
+    from gnuradio import uhd
+
+    start = time.time()
+    uhd.find_devices(uhd.device_addr_t(args.device_addr))
+    report("device discovery", time.time() - start)
+
+    from configuration import configuration
+    from gr_analyzer import top_block
+    from sinks import callback_sink
+
+    first_trace = []
+
+    def on_trace(points, info):
+        if not first_trace:
+            first_trace.append(time.time())
+
+    # Headless, so the timing isn't skewed by the wx main loop
+    args.continuous_run = False
+    args.headless = True
+    start = time.time()
+    cfg = configuration(args)
+    tb = top_block(cfg, sink=callback_sink(on_trace))
+    built = time.time()
+    tb.run()  # single run mode returns at the end of the first sweep
+
+    report("build top_block", built - start)
+    report("first sweep", first_trace[0] - built)
+    report("time to first trace", first_trace[0] - start)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""Measure how fast the waterfall can take and draw traces.
+
+For each history depth, reports:
+  - push: traces per second reduced and written into the ring buffer, as
+    done in the flowgraph's thread
+  - draw: frames per second of the gui thread's update (set_data, restore
+    background, draw_artist, blit) at the default window size
+
+Uses the Agg backend, so no display is needed, e.g.
+
+  bench/bench_waterfall.py --bins 100000 --depths 100 500 1000
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+TOPDIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, TOPDIR)
+
+from decimate import column_max
+from ringbuffer import trace_ring
+
+
+def rate(func, frames):
+    """Return calls per second of func over frames calls."""
+    start = time.time()
+    for i in xrange(frames):
+        func(i)
+    return frames / (time.time() - start)
+
+
+def bench(depth, traces, width, frames):
+    ring = trace_ring(depth, width)
+
+    def push(i):
+        ring.push(column_max(traces[i % len(traces)], width))
+
+    push_rate = rate(push, frames)
+
+    # same geometry as gui.waterfall
+    figure = Figure(figsize=(7, 2.5), dpi=100)
+    figure.subplots_adjust(right=.95, bottom=.2)
+    canvas = FigureCanvasAgg(figure)
+    ax = figure.add_subplot(111)
+    image = ax.imshow(ring.view(), animated=True, aspect='auto',
+                      origin='lower', interpolation='nearest',
+                      vmin=-120, vmax=0)
+    canvas.draw()
+    background = canvas.copy_from_bbox(ax.bbox)
+
+    def draw(i):
+        push(i)
+        image.set_data(ring.view())
+        canvas.restore_region(background)
+        ax.draw_artist(image)
+        canvas.blit(ax.bbox)
+
+    draw_rate = rate(draw, frames)
+
+    return push_rate, draw_rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bins", type=int, default=100000,
+                        help="points per trace [default=%(default)s]")
+    parser.add_argument("--width", type=int, default=620,
+                        help="image width in pixels [default=%(default)s]")
+    parser.add_argument("--depths", type=int, nargs='+',
+                        default=[50, 200, 500, 1000],
+                        help="history depths to measure [default=%(default)s]")
+    parser.add_argument("--frames", type=int, default=200,
+                        help="frames per measurement [default=%(default)s]")
+    args = parser.parse_args()
+
+    traces = np.random.uniform(-110, -20, (8, args.bins)).astype(np.float32)
+
+    print("{:>8} {:>14} {:>14}".format("depth", "push/s", "draw fps"))
+    for depth in args.depths:
+        push_rate, draw_rate = bench(depth, traces, args.width, args.frames)
+        print("{:>8} {:>14.1f} {:>14.1f}".format(depth, push_rate, draw_rate))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+import math
+
+from gnuradio import gr
+from gnuradio import blocks
+from gnuradio import fft
+
+from analyzer import (usrp_controller_cc,
+                      bin_statistics_ff,
+                      stitch_fft_segments_ff,
+                      plotter_f,
+                      segment_plotter_f,
+                      sigmf_sink_c,
+                      iq_ring_sink_c,
+                      fft_spool_sink_c,
+                      iq_recorder_s,
+                      SC16_FULL_SCALE,
+                      replay_source_c)
+
+
+def chain_key(cfg):
+    """Return a hashable summary of every setting baked into a chain."""
+    return (cfg.sample_rate,
+            tuple(cfg.center_freqs),
+            cfg.lo_offset,
+            cfg.skip_initial,
+            cfg.tune_delay,
+            cfg.fft_size,
+            cfg.nframes,
+            int(cfg.detector),
+            cfg.window,
+            cfg.overlap,
+            cfg.scale,
+            cfg.continuous_run,
+            cfg.max_plotted_bin,
+            cfg.progressive,
+            cfg.iq_ring,
+            cfg.replay,
+            cfg.iq_record,
+            cfg.iq_record_size,
+            cfg.iq_record_time)
+
+
+class processing_chain(gr.hier_block2):
+    """Everything downstream of the USRP source for a single configuration.
+
+    The chain owns its own usrp_controller_cc, so the top block only has one
+    edge (USRP > chain). A fully built chain can therefore be kept around and
+    swapped back in behind the radio by reconnecting that edge alone.
+
+    With --replay the chain has no input, a replay_source_c takes the place
+    of both the USRP and the controller.
+    """
+    def __init__(self, tb, cfg):
+        if cfg.replay:
+            in_sig = gr.io_signature(0, 0, 0)
+        else:
+            in_sig = gr.io_signature(1, 1, gr.sizeof_gr_complex)
+        gr.hier_block2.__init__(self,
+                                "processing_chain",
+                                in_sig,
+                                gr.io_signature(0, 0, 0))
+
+        self.cfg = cfg
+        self.key = chain_key(cfg)
+
+        if cfg.replay:
+            self.ctrl = replay_source_c(tb.usrp.base,
+                                        cfg.center_freqs,
+                                        cfg.fft_size * cfg.nframes,
+                                        tune_callback=tb.usrp.tune)
+        else:
+            self.ctrl = usrp_controller_cc(tb.usrp.uhd,
+                                           cfg.center_freqs,
+                                           cfg.lo_offset,
+                                           cfg.skip_initial,
+                                           cfg.tune_delay,
+                                           cfg.fft_size * cfg.nframes)
+
+        self.scaleV = blocks.multiply_const_cc(cfg.scale)
+
+        # I/Q of single runs streams to disk, see save_time_data_to_file
+        self.timedata_sink = sigmf_sink_c(cfg.sample_rate,
+                                          cfg.fft_size * cfg.nframes,
+                                          cfg.center_freqs,
+                                          get_gain=tb.usrp.get_gain,
+                                          spool_dir=cfg.spool_dir,
+                                          description="gr-analyzer sweep")
+
+        # With --iq-ring the I/Q of the last sweeps is always kept instead
+        self.iq_ring = None
+        if cfg.iq_ring:
+            self.iq_ring = iq_ring_sink_c(cfg.sample_rate,
+                                          cfg.fft_size * cfg.nframes,
+                                          cfg.center_freqs,
+                                          cfg.iq_ring,
+                                          get_gain=tb.usrp.get_gain,
+                                          spool_dir=cfg.spool_dir)
+
+        # With --iq-record every sample the controller outputs in continuous
+        # runs is recorded
+        self.iq_recorder = None
+        if cfg.iq_record and cfg.continuous_run:
+            # UHD's fc32 is within +-1.0, so the shorts can't overflow
+            to_full_scale = blocks.multiply_const_cc(SC16_FULL_SCALE)
+            to_sc16 = blocks.complex_to_interleaved_short()
+            max_bytes = None
+            if cfg.iq_record_size:
+                max_bytes = int(cfg.iq_record_size * 1e6)
+            self.iq_recorder = iq_recorder_s(cfg.sample_rate,
+                                             cfg.fft_size * cfg.nframes,
+                                             cfg.center_freqs,
+                                             cfg.iq_record,
+                                             max_bytes=max_bytes,
+                                             max_seconds=cfg.iq_record_time,
+                                             get_gain=tb.usrp.get_gain)
+
+        stream_to_fft_vec = blocks.stream_to_vector(gr.sizeof_gr_complex,
+                                                    cfg.fft_size)
+
+        forward = True
+        shift = True
+        self.fft = fft.fft_vcc(cfg.fft_size,
+                               forward,
+                               cfg.window_coefficients,
+                               shift)
+
+        # FFT data of single runs is spooled, see save_freq_data_to_file
+        self.freqdata_sink = fft_spool_sink_c(cfg.fft_size,
+                                              spool_dir=cfg.spool_dir)
+
+        c2mag_sq = blocks.complex_to_mag_squared(cfg.fft_size)
+
+        stats = bin_statistics_ff(cfg.fft_size, cfg.nframes, cfg.detector)
+
+        power = sum(tap * tap for tap in cfg.window_coefficients)
+
+        # Divide magnitude-square by a constant to obtain power
+        # in Watts. Assumes unit of USRP source is volts.
+        impedance = 50.0  # ohms
+        Vsq2W_dB = -10.0 * math.log10(cfg.fft_size * power * impedance)
+        # Convert from Watts to dBm.
+        W2dBm = blocks.nlog10_ff(10.0, cfg.fft_size, 30 + Vsq2W_dB)
+
+        if cfg.progressive:
+            # publishes each segment as it comes, and stitches the trace
+            self.plot = segment_plotter_f(tb.sink,
+                                          cfg.fft_size,
+                                          cfg.n_segments,
+                                          cfg.overlap,
+                                          cfg.max_plotted_bin)
+        else:
+            stitch = stitch_fft_segments_ff(cfg.fft_size,
+                                            cfg.n_segments,
+                                            cfg.overlap)
+
+            fft_vec_to_stream = blocks.vector_to_stream(gr.sizeof_float,
+                                                        cfg.fft_size)
+            n_valid_bins = (cfg.fft_size -
+                            (cfg.fft_size * (cfg.overlap / 2) * 2))
+            # FIXME: think about whether to cast to int vs round vs...
+            stitch_vec_len = int(cfg.n_segments * cfg.fft_size)
+            stream_to_stitch_vec = blocks.stream_to_vector(gr.sizeof_float,
+                                                           stitch_vec_len)
+
+            plot_vec_len = int(cfg.n_segments * n_valid_bins)
+
+            self.plot = plotter_f(tb, plot_vec_len)
+
+        # Create the chain:
+        #
+        # ctrl   - copy N samples then call retune callback and loop
+        # scaleV - scale voltage by scalar to get calibrated output
+        # fft    - compute forward FFT, complex in complex out
+        # mag^2  - convert vectors from complex to real by taking mag squared
+        # stats  - linear average or peak detect vectors if nframes > 1
+        # W2dBm  - convert volt to dBm
+        # stitch - overlap FFT segments by a certain number of bins
+        # plot   - plot data
+        #
+        # ctrl > fft > mag^2 > stats > W2dBm > stitch > plot
+        #
+        # or with --progressive, where plot does the stitching:
+        #
+        # ctrl > fft > mag^2 > stats > W2dBm > plot
+
+        single_run = not cfg.continuous_run
+
+        if cfg.replay:
+            self.connect(self.ctrl, self.scaleV)
+        else:
+            self.connect(self, self.ctrl, self.scaleV)
+        if self.iq_recorder is not None:
+            self.connect((self.ctrl, 0), to_full_scale, to_sc16,
+                         self.iq_recorder)
+        if self.iq_ring is not None:
+            self.connect((self.scaleV, 0), self.iq_ring)
+        elif single_run:
+            self.connect((self.scaleV, 0), self.timedata_sink)
+        self.connect((self.scaleV, 0), stream_to_fft_vec, self.fft)
+        if single_run:
+            self.connect((self.fft, 0), self.freqdata_sink)
+        self.connect((self.fft, 0), c2mag_sq, stats, W2dBm)
+        if cfg.progressive:
+            self.connect(W2dBm, self.plot)
+        else:
+            self.connect(W2dBm, fft_vec_to_stream, stream_to_stitch_vec,
+                         stitch, self.plot)
+
+    def reset_sinks(self):
+        """Release any data held by the chain's sinks."""
+        self.timedata_sink.reset()
+        self.freqdata_sink.reset()
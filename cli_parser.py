@@ -126,5 +126,92 @@ def init_parser():
                              "[default=%(default)s]")
     parser.add_argument("--realtime", action="store_true", default=False,
                         help="Attempt to enable realtime scheduling")
+    parser.add_argument("--reconfigure-delay", type=float, default=0.5,
+                        metavar="seconds",
+                        help="coalesce settings changed within this window" +
+                             " into one rebuild [default=%(default)s]")
+    parser.add_argument("--manual-apply", action="store_true", default=False,
+                        help="only apply changed settings when Apply," +
+                             " Single or Continuous is pressed")
+    parser.add_argument("--headless", action="store_true", default=False,
+                        help="Run without the GUI")
+    parser.add_argument("--gui-process", action="store_true", default=False,
+                        help="Run the GUI in its own process so drawing" +
+                             " can't slow down acquisition")
+    parser.add_argument("--record", type=str, default=None, metavar="path",
+                        help="append every trace to a file")
+    parser.add_argument("--store", type=str, default=None, metavar="path",
+                        help="record every trace to a chunked trace store" +
+                             " directory, written in the background")
+    parser.add_argument("--archive", type=str, default=None, metavar="path",
+                        help="append every trace to a compressed archive" +
+                             " file, quantized to 0.1 dB")
+    parser.add_argument("--spool-dir", type=str, default=None,
+                        metavar="path",
+                        help="directory I/Q is streamed to until exported;" +
+                             " exporting is a rename if it's on the same" +
+                             " filesystem [default=system temp directory]")
+    parser.add_argument("--iq-ring", type=pos_int, default=None,
+                        metavar="sweeps",
+                        help="always keep the I/Q of the last n sweeps in a" +
+                             " memory-mapped ring file in the spool" +
+                             " directory, so the Time export can save the" +
+                             " latest sweep at any time")
+    parser.add_argument("--replay", type=str, default=None, metavar="path",
+                        help="process a SigMF recording exported by the" +
+                             " Time export instead of the USRP, as fast as" +
+                             " possible; give the center_freq and span it" +
+                             " was recorded with")
+    parser.add_argument("--iq-record", type=str, default=None,
+                        metavar="dir",
+                        help="record every sample of a continuous run as" +
+                             " sc16 SigMF recordings in dir")
+    parser.add_argument("--iq-record-size", type=pos_int, default=1024,
+                        metavar="MB",
+                        help="start a new I/Q recording once one reaches" +
+                             " this size [default=%(default)s]")
+    parser.add_argument("--iq-record-time", type=float, default=None,
+                        metavar="seconds",
+                        help="start a new I/Q recording once one lasts this" +
+                             " long [default=%(default)s]")
+    parser.add_argument("--publish", type=pos_int, default=None,
+                        metavar="port",
+                        help="publish every trace to TCP clients on port")
+    parser.add_argument("--preset", type=str, default=None,
+                        help="start with a saved preset")
+    parser.add_argument("--presets-file", type=str,
+                        default=consts.PRESETS_FILE, metavar="path",
+                        help="file to load and save presets" +
+                             " [default=%(default)s]")
+    parser.add_argument("--preset-pool-size", type=pos_int, default=4,
+                        metavar="presets",
+                        help="number of recently used presets to keep" +
+                             " pre-built [default=%(default)s]")
+    parser.add_argument("--waterfall", type=pos_int, default=None,
+                        metavar="traces",
+                        help="show a waterfall of the last n traces")
+    parser.add_argument("--persistence", type=pos_int, default=None,
+                        metavar="traces",
+                        help="start with a persistence display that decays" +
+                             " by half every n traces")
+    parser.add_argument("--progressive", action="store_true", default=False,
+                        help="show each segment of a sweep as soon as it's" +
+                             " measured, rather than once per sweep")
+    parser.add_argument("--plot-backend", choices=("raster", "mpl"),
+                        default="raster",
+                        help="draw the spectrum with numpy rasterization or" +
+                             " matplotlib [default=%(default)s]")
+    parser.add_argument("--threshold-hysteresis", type=float, default=3.0,
+                        metavar="dB",
+                        help="a threshold event ends once power drops this" +
+                             " far below the threshold [default=%(default)s]")
+    parser.add_argument("--event-rate", type=float, default=5.0,
+                        metavar="events/s",
+                        help="most threshold events reported per second" +
+                             " [default=%(default)s]")
+    parser.add_argument("--events-file", type=str, default=None,
+                        metavar="path",
+                        help="also append threshold events to a file as" +
+                             " JSON lines")
 
     return parser
@@ -4,9 +4,8 @@ import math
 import logging
 import numpy as np
 
-from gnuradio.filter import window
-
 import consts
+import matfile
 import utils
 
 
@@ -50,6 +49,9 @@ class configuration(object):
         self.max_plotted_bin = None    # absolute max bin in bin_freqs to plot
         self.update()
 
+        # imported here so that --help doesn't wait on the gr-filter library
+        from gnuradio.filter import window
+
         # commented-out windows require extra parameters that we're not set up
         # to handle at this time
         self.windows = {
@@ -181,8 +183,6 @@ class configuration(object):
         ratio_valid_bins = 1.0 - overlap
         return int(round((samp_rate * ratio_valid_bins) / deltaf) * deltaf)
 
-    def export_to_matlab(self):
-        """Export current configuration settings to .settings.mat"""
-        e = """TODO: Export config and raw bin data, then use octave script to
-               translate it into matlab format"""
-        raise NotImplementedError(e)
+    def export_to_matlab(self, path):
+        """Export current configuration settings to a MAT-file"""
+        matfile.save_config(path, self)
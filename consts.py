@@ -3,6 +3,7 @@ from enum import IntEnum
 WIRE_FORMATS = ("sc8", "sc16")
 CPU_FORMATS = ("fc32", "sc16")
 FFT_SIZES = [2**n for n in range(5, 14)] # 32 - 8192
+PRESETS_FILE = "~/.gr-analyzer/presets.json"
 
 class Detector(IntEnum):
     AVG = 0
@@ -0,0 +1,152 @@
+"""Reduce traces to what a plot of a given width in pixels can show."""
+
+import numpy as np
+
+
+def minmax_indices(y, ncols):
+    """Return the indices of the min and max of y in each of ncols columns.
+
+    The indices are in ascending order, so drawing a line through them
+    traces the same envelope as drawing every point: peaks are never lost.
+    If y has no more than 2*ncols points, every index is returned.
+
+    NaN (bins not swept yet) is ignored, except in columns that are all NaN.
+    """
+    n = len(y)
+    if n <= 2 * ncols:
+        return np.arange(n)
+
+    width = -(-n // ncols) # points per column, rounded up
+    nfull = n // width
+    split = nfull * width
+
+    # reshaping the full columns is a view, only the ragged tail is sliced
+    cols = y[:split].reshape(nfull, width)
+    offsets = np.arange(nfull) * width
+    imin, imax = _nanargminmax(cols, axis=1)
+    imin += offsets
+    imax += offsets
+    if split < n:
+        tail_min, tail_max = _nanargminmax(y[split:])
+        imin = np.append(imin, tail_min + split)
+        imax = np.append(imax, tail_max + split)
+
+    idx = np.empty(2 * len(imin), dtype=np.intp)
+    idx[0::2] = np.minimum(imin, imax)
+    idx[1::2] = np.maximum(imin, imax)
+
+    return idx
+
+
+def _nanargminmax(a, axis=None):
+    """Return a.argmin(axis) and a.argmax(axis), ignoring NaN.
+
+    Unlike np.nanargmin, a slice that is all NaN doesn't raise but gives
+    the index of its first point.
+    """
+    nan = np.isnan(a)
+    if not nan.any():
+        return a.argmin(axis), a.argmax(axis)
+    return (np.where(nan, np.inf, a).argmin(axis),
+            np.where(nan, -np.inf, a).argmax(axis))
+
+
+def decimate_view(x, y, view):
+    """Decimate (x, y) to the visible part of a plot.
+
+    view is (xmin, xmax, width in pixels) or None for no decimation. The
+    first point beyond each edge of the view is kept so the line reaches
+    the edges.
+    """
+    if view is None:
+        return x, y
+
+    lo, hi = _view_bounds(x, view)
+    if hi <= lo:
+        return x[:0], y[:0]
+
+    idx = minmax_indices(y[lo:hi], view[2])
+    idx = np.concatenate(([0], idx, [hi - lo - 1])) + lo
+
+    return x[idx], y[idx]
+
+
+def _view_bounds(x, view):
+    """Return the [lo, hi) indices of x in view, plus one beyond each edge."""
+    xmin, xmax, _ = view
+    lo = max(np.searchsorted(x, xmin) - 1, 0)
+    hi = min(np.searchsorted(x, xmax) + 1, len(x))
+    return lo, hi
+
+
+class minmax_pyramid(object):
+    """The min and max of a trace over blocks of 2, 4, 8, ... points.
+
+    Built once per trace in O(N), after which any view of the trace can be
+    decimated in time proportional to the plot width, however many points
+    are in view. Level k of mins and maxs holds blocks of 2**(k+1) points.
+    """
+    def __init__(self, y):
+        self.mins = []
+        self.maxs = []
+        lo = hi = y
+        while len(lo) > 1:
+            n = len(lo)
+            pairs = n // 2
+            next_lo = np.empty(n - pairs, dtype=y.dtype)
+            next_hi = np.empty(n - pairs, dtype=y.dtype)
+            np.minimum(lo[0:2*pairs:2], lo[1::2], out=next_lo[:pairs])
+            np.maximum(hi[0:2*pairs:2], hi[1::2], out=next_hi[:pairs])
+            if n % 2:
+                # an odd point out is a block of its own
+                next_lo[-1] = lo[-1]
+                next_hi[-1] = hi[-1]
+            lo, hi = next_lo, next_hi
+            self.mins.append(lo)
+            self.maxs.append(hi)
+
+    def decimate(self, x, y, view):
+        """Decimate (x, y) to view, like decimate_view.
+
+        y must be the trace the pyramid was built from. Uses the coarsest
+        level that still has at least one block per pixel column, and draws
+        each block as a vertical line from its min to its max.
+        """
+        if view is None:
+            return x, y
+
+        lo, hi = _view_bounds(x, view)
+        blocks_per_col = (hi - lo) / float(max(view[2], 1))
+        if blocks_per_col < 2:
+            # few enough points to draw them all
+            return decimate_view(x, y, view)
+
+        level = min(int(np.log2(blocks_per_col)), len(self.mins))
+        first = lo >> level
+        stop = ((hi - 1) >> level) + 1
+        nblocks = stop - first
+
+        xb = x[np.arange(first, stop) << level]
+        xd = np.repeat(xb, 2)
+        yd = np.empty(2 * nblocks, dtype=y.dtype)
+        yd[0::2] = self.mins[level - 1][first:stop]
+        yd[1::2] = self.maxs[level - 1][first:stop]
+
+        return xd, yd
+
+
+def column_max(y, ncols):
+    """Return the max of y in each of ncols equal columns.
+
+    Used for image rows (waterfall, persistence) that need one value per pixel
+    column. If y is shorter than ncols, points are repeated.
+    """
+    n = len(y)
+    starts = (np.arange(ncols) * n) // ncols
+    return np.maximum.reduceat(y, starts)
+
+
+def view_slice(x, view):
+    """Return the slice of x that covers the view's frequency range."""
+    xmin, xmax, _ = view
+    return slice(np.searchsorted(x, xmin), np.searchsorted(x, xmax, 'right'))
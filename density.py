@@ -0,0 +1,55 @@
+"""Accumulate traces into a decaying power vs frequency histogram."""
+
+import numpy as np
+
+from decimate import view_slice
+
+
+class density_histogram(object):
+    """How often each pixel of a plot was hit by recent traces.
+
+    Each trace adds one hit to every (column, row) pixel its points fall in,
+    and older hits decay by half every half_life traces. Decay is lazy:
+    instead of scaling the whole histogram per trace, the weight of new hits
+    grows, so adding a trace costs O(bins) and not O(pixels).
+    """
+    # renormalize before the weight of new hits can overflow
+    MAX_WEIGHT = 1e30
+
+    def __init__(self, x, view, power_range, nrows, half_life):
+        self.view = view
+        self.power_range = power_range
+        self.nrows = nrows
+        self.ncols = ncols = view[2]
+
+        self.slice = view_slice(x, view)
+        nbins = len(x[self.slice])
+        # pixel column of every bin in view, computed once per view
+        self.cols = (np.arange(nbins) * ncols) // max(nbins, 1)
+        self.extent = (x[self.slice][0], x[self.slice][-1]) if nbins else None
+
+        min_power, max_power = power_range
+        self.row_scale = nrows / float(max_power - min_power)
+
+        self.decay = 0.5 ** (1.0 / half_life)
+        self.weight = 1.0
+        self.hist = np.zeros((nrows, ncols))
+
+    def add(self, y):
+        """Add the hits of trace y. y must have the same length as x."""
+        ys = y[self.slice]
+        rows = (ys - self.power_range[0]) * self.row_scale
+        rows = np.clip(rows, 0, self.nrows - 1).astype(np.intp)
+
+        if self.weight > self.MAX_WEIGHT:
+            self.hist /= self.weight
+            self.weight = 1.0
+        self.weight /= self.decay
+
+        # fancy index assignment counts a pixel hit by several bins of the
+        # same trace once, which is what a persistence display shows
+        self.hist[rows, self.cols] += self.weight
+
+    def density(self):
+        """Return the histogram scaled so a pixel hit by every trace is 1."""
+        return self.hist * ((1.0 - self.decay) / self.weight)
@@ -0,0 +1,347 @@
+"""Turn threshold crossings into a few structured events.
+
+Instead of one log line per bin above the threshold per trace, contiguous
+over-threshold bins are grouped into a single event. An event is reported
+once when it appears and once when it ends, however many sweeps it spans.
+"""
+
+import json
+import time
+import logging
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+from sinks import trace_sink
+
+
+EVENT_BURST = 10 # events delivered at once before the rate limit applies
+
+
+# kind is 'start' or 'end'. For 'end' events peak is the highest seen over
+# the event's lifetime, and duration is how long it lasted in seconds.
+threshold_event = namedtuple('threshold_event', ['kind',
+                                                 'time',
+                                                 'start_freq',
+                                                 'stop_freq',
+                                                 'peak',
+                                                 'peak_freq',
+                                                 'duration'])
+
+
+def find_runs(mask):
+    """Return start and stop (exclusive) indices of the runs of True."""
+    edges = np.diff(np.concatenate(([0], mask.view(np.int8), [0])))
+    starts, = np.nonzero(edges == 1)
+    stops, = np.nonzero(edges == -1)
+    return starts, stops
+
+
+def segment_argmax(values, seg_starts):
+    """Return the max of each segment of values and the index of its first
+    occurrence. Segments are contiguous and begin at seg_starts."""
+    maxes = np.maximum.reduceat(values, seg_starts)
+    lengths = np.diff(np.append(seg_starts, len(values)))
+    seg_ids = np.repeat(np.arange(len(seg_starts)), lengths)
+    at_max, = np.nonzero(values == maxes[seg_ids])
+    # at_max is sorted, so the first hit of each segment comes first
+    _, first = np.unique(seg_ids[at_max], return_index=True)
+    return maxes, at_max[first]
+
+
+class threshold_tracker(object):
+    """Group over-threshold bins into events and follow them across sweeps.
+
+    A bin goes over when it exceeds level, and stays over until it drops
+    below level - hysteresis, so a signal hovering around the threshold
+    doesn't start a new event every sweep. A run of bins that overlaps one
+    from the previous sweep continues that event. Every event that starts
+    also ends: when events merge, all but the oldest end, and reset ends
+    those still going.
+
+    Everything is vectorized over bins. Python only loops over the events
+    that start or end.
+    """
+    def __init__(self, level, hysteresis):
+        self.level = level
+        self.hysteresis = hysteresis
+        self.reset()
+
+    def reset(self, now=None):
+        """Forget the last trace. Return the 'end' events, at time now, of
+        the events that were still going."""
+        events = []
+        if now is not None:
+            events = self._end(np.arange(len(self.peak)), now)
+        self.over = None     # bins over the threshold in the last trace
+        self.labels = None   # event index of every bin, -1 if none
+        self.first_seen = np.empty(0)
+        self.peak = np.empty(0)
+        self.peak_freq = np.empty(0)
+        self.bounds = np.empty((0, 2))
+        return events
+
+    def _end(self, ended, now):
+        """Return the 'end' events of the events ended."""
+        events = []
+        for i in ended:
+            start_freq, stop_freq = self.bounds[i]
+            events.append(threshold_event('end',
+                                          now,
+                                          start_freq,
+                                          stop_freq,
+                                          self.peak[i],
+                                          self.peak_freq[i],
+                                          now - self.first_seen[i]))
+        return events
+
+    def _continue(self, bins, lengths, seg_starts):
+        """Return the event of the last sweep each run of this sweep
+        continues, -1 for none.
+
+        Every event is continued by at most one run, so every event ends
+        once: an event split in two is continued by its first part, and of
+        events merged into one run the oldest is continued and the others
+        end.
+        """
+        nruns = len(lengths)
+        inherit = np.full(nruns, -1, dtype=np.intp)
+        nold = len(self.peak)
+        if self.labels is None or not nold:
+            return inherit
+
+        old = self.labels[bins]
+        continued = old >= 0
+        runs = np.repeat(np.arange(nruns), lengths)[continued]
+        # the (run, event) pairs of overlaps, ordered by run
+        pairs = np.unique(runs * nold + old[continued])
+        pair_runs, pair_olds = pairs // nold, pairs % nold
+
+        # an event goes to the first run overlapping it...
+        _, first = np.unique(pair_olds, return_index=True)
+        pair_runs, pair_olds = pair_runs[first], pair_olds[first]
+        # ...and a run continues the oldest of the events it gets
+        order = np.lexsort((self.first_seen[pair_olds], pair_runs))
+        pair_runs, pair_olds = pair_runs[order], pair_olds[order]
+        _, first = np.unique(pair_runs, return_index=True)
+        inherit[pair_runs[first]] = pair_olds[first]
+        return inherit
+
+    def update(self, x, y, now):
+        """Return the events that started or ended with trace y."""
+        events = []
+        over = y > self.level
+        if self.over is not None and len(self.over) == len(y):
+            over |= self.over & (y > self.level - self.hysteresis)
+        else:
+            events.extend(self.reset(now))
+
+        starts, stops = find_runs(over)
+        bins, = np.nonzero(over) # run by run, since runs are ascending
+        lengths = stops - starts
+        seg_starts = np.cumsum(lengths) - lengths
+
+        # events from the last sweep that no run of this sweep continues
+        inherit = self._continue(bins, lengths, seg_starts)
+        ended = np.setdiff1d(np.arange(len(self.peak)), inherit)
+        events.extend(self._end(ended, now))
+
+        nruns = len(starts)
+        labels = np.full(len(y), -1, dtype=np.intp)
+        labels[bins] = np.repeat(np.arange(nruns), lengths)
+
+        if nruns:
+            peak, peak_idx = segment_argmax(y[bins], seg_starts)
+            peak_freq = x[bins[peak_idx]]
+            first_seen = np.full(nruns, now)
+
+            # carry over the history of the events the runs continue
+            is_new = inherit < 0
+            old = inherit[~is_new]
+            first_seen[~is_new] = self.first_seen[old]
+            keep_old = np.zeros(nruns, dtype=bool)
+            keep_old[~is_new] = self.peak[old] > peak[~is_new]
+            peak[keep_old] = self.peak[inherit[keep_old]]
+            peak_freq[keep_old] = self.peak_freq[inherit[keep_old]]
+
+            bounds = np.column_stack((x[starts], x[stops - 1]))
+            for i in np.flatnonzero(is_new):
+                events.append(threshold_event('start',
+                                              now,
+                                              bounds[i, 0],
+                                              bounds[i, 1],
+                                              peak[i],
+                                              peak_freq[i],
+                                              0.0))
+        else:
+            peak = peak_freq = first_seen = np.empty(0)
+            bounds = np.empty((0, 2))
+
+        self.over, self.labels = over, labels
+        self.first_seen = first_seen
+        self.peak, self.peak_freq = peak, peak_freq
+        self.bounds = bounds
+
+        return events
+
+
+class log_event_sink(object):
+    """Write events to the logging system, one line each."""
+    def __init__(self):
+        self.logger = logging.getLogger('gr-analyzer.events')
+
+    def emit(self, event):
+        if event.kind == 'start':
+            msg = ("Over threshold {:.3f}-{:.3f} MHz,"
+                   " peak {:.2f} dBm at {:.3f} MHz")
+            self.logger.warning(msg.format(event.start_freq / 1e6,
+                                           event.stop_freq / 1e6,
+                                           event.peak,
+                                           event.peak_freq / 1e6))
+        else:
+            msg = ("Back under threshold {:.3f}-{:.3f} MHz after {:.1f} s,"
+                   " peak {:.2f} dBm at {:.3f} MHz")
+            self.logger.info(msg.format(event.start_freq / 1e6,
+                                        event.stop_freq / 1e6,
+                                        event.duration,
+                                        event.peak,
+                                        event.peak_freq / 1e6))
+
+    def suppressed(self, count):
+        msg = "{} threshold events suppressed by rate limit"
+        self.logger.warning(msg.format(count))
+
+    def close(self):
+        pass
+
+
+class jsonl_event_sink(object):
+    """Append events to a file as one JSON object per line."""
+    def __init__(self, path):
+        self.f = open(path, 'a')
+
+    def emit(self, event):
+        record = dict((k, float(v) if k != 'kind' else v)
+                      for k, v in event._asdict().items())
+        self.f.write(json.dumps(record, sort_keys=True) + "\n")
+        self.f.flush()
+
+    def suppressed(self, count):
+        record = {'kind': 'suppressed', 'time': time.time(), 'count': count}
+        self.f.write(json.dumps(record, sort_keys=True) + "\n")
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+class event_dispatcher(object):
+    """Deliver events to sinks at no more than rate per second on average,
+    with bursts of up to burst events (a token bucket). Events over the limit
+    are counted and reported once delivery resumes."""
+    def __init__(self, sinks, rate, burst):
+        self.sinks = sinks
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = self.burst
+        self.last = time.time()
+        self.dropped = 0
+
+    def emit(self, event):
+        now = time.time()
+        self.tokens = min(self.burst,
+                          self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        if self.tokens < 1:
+            self.dropped += 1
+            return
+
+        self.tokens -= 1
+        for sink in self.sinks:
+            if self.dropped:
+                sink.suppressed(self.dropped)
+            sink.emit(event)
+        self.dropped = 0
+
+    def close(self):
+        # report the events suppressed since the last one delivered
+        for sink in self.sinks:
+            if self.dropped:
+                sink.suppressed(self.dropped)
+            sink.close()
+        self.dropped = 0
+
+
+class threshold_monitor(trace_sink):
+    """Watch traces for threshold crossings and dispatch them as events.
+
+    The level is None (off) until set_level is called.
+    """
+    def __init__(self, dispatcher, hysteresis):
+        trace_sink.__init__(self)
+        self.dispatcher = dispatcher
+        self.hysteresis = hysteresis
+        self.lock = threading.Lock()
+        self.tracker = None
+        self.x = None
+        self.generation = None # configuration generation of self.x
+        self.last_time = None  # end time of the last trace's sweep
+
+    @property
+    def level(self):
+        tracker = self.tracker
+        return None if tracker is None else tracker.level
+
+    def set_level(self, level):
+        with self.lock:
+            events = self._end_events()
+            if level is None:
+                self.tracker = None
+            else:
+                self.tracker = threshold_tracker(level, self.hysteresis)
+        self._dispatch(events)
+
+    def configure(self, cfg):
+        with self.lock:
+            events = self._end_events()
+            self.x = cfg.bin_freqs[:cfg.max_plotted_bin]
+            self.generation = cfg.generation
+        self._dispatch(events)
+
+    def _end_events(self):
+        """End the events being tracked, which the next trace can't
+        continue, and return their 'end' events, at the end time of the
+        last trace they were seen in."""
+        if self.tracker is None:
+            return []
+        return self.tracker.reset(self.last_time)
+
+    def _dispatch(self, events):
+        for event in events:
+            self.dispatcher.emit(event)
+
+    def update(self, points, info):
+        with self.lock:
+            tracker = self.tracker
+            if tracker is None or info.generation != self.generation:
+                return True
+            events = tracker.update(self.x, points, info.end_time)
+            self.last_time = info.end_time
+        self._dispatch(events)
+        return True
+
+    def close(self):
+        with self.lock:
+            events = self._end_events()
+        self._dispatch(events)
+        self.dispatcher.close()
+
+
+def create_threshold_monitor(cfg):
+    """Return a threshold_monitor set up from the command line options."""
+    sinks = [log_event_sink()]
+    if cfg.events_file:
+        sinks.append(jsonl_event_sink(cfg.events_file))
+    dispatcher = event_dispatcher(sinks, cfg.event_rate, EVENT_BURST)
+    return threshold_monitor(dispatcher, cfg.threshold_hysteresis)
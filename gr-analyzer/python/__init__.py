@@ -46,6 +46,15 @@ from analyzer_swig import *
 
 # import any pure python here
 from plotter_f import plotter_f
+from segment_plotter_f import segment_plotter_f
+from sweep_counter import sweep_counter, trace_info
+from async_writer import async_writer
+from sigmf_sink_c import sigmf_sink_c
+from iq_ring_sink_c import iq_ring_sink_c
+from fft_spool_sink_c import fft_spool_sink_c
+from iq_recorder_s import iq_recorder_s, SC16_FULL_SCALE
+from replay_source_c import (replay_source_c, recorded_segments,
+                             open_recording)
 #
 
 # ----------------------------------------------------------------
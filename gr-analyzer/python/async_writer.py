@@ -0,0 +1,207 @@
+import os
+import mmap
+import time
+import logging
+import threading
+from Queue import Queue, Empty
+
+import numpy as np
+
+
+class async_writer(object):
+    """Write a stream to a file from a thread of its own.
+
+    write only copies into a pool of buffers allocated up front, so the
+    thread calling it, usually a flowgraph's, never waits for the disk. Full
+    buffers are written by the writer thread in large sequential writes of
+    buffer_size (a multiple of the page size), and the file is fsynced at
+    most every fsync_interval seconds rather than after every write.
+
+    When the disk falls behind and the pool runs out, a write is dropped
+    whole and counted. With keep_offsets, the dropped bytes are left as a
+    hole in the file instead, reading back as zeros, so the offsets of
+    everything written after stay right, as a recording of samples needs.
+
+    stats returns the telemetry: queue depth, write rate and drops.
+    """
+    BUFFER_SIZE = 4 * 2**20   # bytes
+    NBUFFERS = 16
+    FSYNC_INTERVAL = 1.0      # seconds
+
+    def __init__(self, path, append=False, keep_offsets=False,
+                 buffer_size=BUFFER_SIZE, nbuffers=NBUFFERS,
+                 fsync_interval=FSYNC_INTERVAL):
+        self.logger = logging.getLogger('gr-analyzer.async_writer')
+        self.path = path
+        self.keep_offsets = keep_offsets
+        self.buffer_size = max(buffer_size - buffer_size % mmap.PAGESIZE,
+                               mmap.PAGESIZE)
+        self.nbuffers = nbuffers
+        self.fsync_interval = fsync_interval
+
+        flags = os.O_WRONLY | os.O_CREAT
+        flags |= os.O_APPEND if append else os.O_TRUNC
+        self.fd = os.open(path, flags, 0o644)
+
+        self.free = Queue() # buffers ready to be filled
+        for _ in xrange(nbuffers):
+            self.free.put(np.empty(self.buffer_size, dtype=np.uint8))
+        # (gap, buffer, nbytes, flushed, sync) items to write: skip gap
+        # bytes, write nbytes of buffer, if any, then, if there's a flushed
+        # Event, extend the file over any gap, fsync if sync and set it.
+        # None stops the writer.
+        self.full = Queue()
+
+        # producer side, guarded by lock
+        self.lock = threading.Lock()
+        self.buf = None     # buffer being filled
+        self.fill = 0       # bytes in it
+        self.gap = 0        # bytes dropped since the last buffer queued
+        self.dropped_writes = 0
+        self.dropped_bytes = 0
+
+        # writer side
+        self.written_bytes = 0
+        self.write_rate = 0.0 # MB/s over the last fsync_interval
+        self.fsyncs = 0
+
+        self.writer = threading.Thread(target=self._write)
+        self.writer.daemon = True
+        self.writer.start()
+
+    def write(self, data):
+        """Queue data, a string or an array, to be written. Return False if
+        it was dropped."""
+        if isinstance(data, str):
+            data = np.frombuffer(data, dtype=np.uint8)
+        else:
+            data = np.ascontiguousarray(data).reshape(-1).view(np.uint8)
+        nbytes = len(data)
+
+        with self.lock:
+            room = self.free.qsize() * self.buffer_size
+            if self.buf is not None:
+                room += self.buffer_size - self.fill
+            if nbytes > room:
+                self.dropped_writes += 1
+                self.dropped_bytes += nbytes
+                if self.keep_offsets:
+                    self._queue_buffer()
+                    self.gap += nbytes
+                return False
+
+            done = 0
+            while done < nbytes:
+                if self.buf is None:
+                    self.buf = self.free.get_nowait()
+                count = min(nbytes - done, self.buffer_size - self.fill)
+                end = self.fill + count
+                self.buf[self.fill:end] = data[done:done + count]
+                self.fill = end
+                done += count
+                if self.fill == self.buffer_size:
+                    self._queue_buffer()
+        return True
+
+    def _queue_buffer(self):
+        if self.fill:
+            self.full.put((self.gap, self.buf, self.fill, None, False))
+            self.gap = 0
+            self.buf = None
+            self.fill = 0
+
+    def _queue_all(self, flushed, sync):
+        """Queue everything written so far, including a trailing gap."""
+        self._queue_buffer()
+        self.full.put((self.gap, None, 0, flushed, sync))
+        self.gap = 0
+
+    def flush(self, sync=False):
+        """Return once everything written so far is in the file, and with
+        sync on disk too."""
+        flushed = threading.Event()
+        with self.lock:
+            self._queue_all(flushed, sync)
+        flushed.wait()
+
+    def close(self, sync=True):
+        """Write out everything and close the file. A file about to be
+        deleted needn't be synced."""
+        with self.lock:
+            self._queue_all(threading.Event(), sync)
+            self.full.put(None)
+        self.writer.join()
+        os.close(self.fd)
+
+    def stats(self):
+        """Return the writer's telemetry as a dict."""
+        return {
+            'queue_depth': self.full.qsize(),   # buffers waiting
+            'queue_capacity': self.nbuffers,
+            'written_mb': self.written_bytes / 1e6,
+            'write_rate': self.write_rate,      # MB/s
+            'dropped_writes': self.dropped_writes,
+            'dropped_mb': self.dropped_bytes / 1e6,
+            'fsyncs': self.fsyncs,
+        }
+
+    def _extend(self):
+        # a trailing gap is only a seek until the file is extended over it
+        pos = os.lseek(self.fd, 0, os.SEEK_CUR)
+        if pos > os.fstat(self.fd).st_size:
+            os.ftruncate(self.fd, pos)
+
+    def _sync(self):
+        os.fsync(self.fd)
+        self.fsyncs += 1
+
+    def _write(self):
+        last_sync = time.time()
+        synced_bytes = 0
+        reported_drops = 0
+        dirty = False
+
+        while True:
+            try:
+                item = self.full.get(timeout=self.fsync_interval)
+            except Empty:
+                item = ()
+
+            if item is None:
+                return
+            if item:
+                gap, buf, nbytes, flushed, sync = item
+                if gap:
+                    os.lseek(self.fd, gap, os.SEEK_CUR)
+                done = 0
+                while done < nbytes:
+                    done += os.write(self.fd, buf[done:nbytes])
+                if buf is not None:
+                    self.free.put(buf)
+                self.written_bytes += nbytes
+                dirty = True
+                if flushed is not None:
+                    self._extend()
+                    if sync:
+                        self._sync()
+                        dirty = False
+                    flushed.set()
+
+            now = time.time()
+            if now - last_sync >= self.fsync_interval:
+                if dirty:
+                    self._sync()
+                    dirty = False
+                elapsed = now - last_sync
+                self.write_rate = ((self.written_bytes - synced_bytes) /
+                                   1e6 / elapsed)
+                synced_bytes = self.written_bytes
+                last_sync = now
+
+                if self.dropped_writes > reported_drops:
+                    msg = "dropped {} writes ({:.1f} MB) to {}, the disk"
+                    msg += " can't keep up"
+                    self.logger.warn(msg.format(self.dropped_writes,
+                                                self.dropped_bytes / 1e6,
+                                                self.path))
+                    reported_drops = self.dropped_writes
@@ -0,0 +1,84 @@
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+from gnuradio import gr
+
+from async_writer import async_writer
+
+
+class fft_spool_sink_c(gr.sync_block):
+    """Spool the complex FFT vectors of a sweep to disk as they arrive.
+
+    Like sigmf_sink_c, this keeps a single run of any length out of RAM,
+    where a vector_sink_c would hold every vector in a Python list, and
+    writes through an async_writer so the flowgraph never waits. The
+    vectors are read back memory-mapped, as an (nvectors, fft_size) array,
+    so an export can walk them a chunk at a time.
+    """
+    def __init__(self, fft_size, spool_dir=None):
+        gr.sync_block.__init__(
+            self,
+            name="fft_spool_sink_c",
+            in_sig=[(np.complex64, fft_size)],
+            out_sig=None
+        )
+
+        self.fft_size = fft_size
+        self.spool_dir = spool_dir
+
+        # vectors and reset are called from other threads
+        self.lock = threading.Lock()
+        self.writer = None  # async_writer of the spool, made on first use
+        self.path = None
+        self.nvectors = 0   # vectors spooled
+
+    def work(self, input_items, output_items):
+        in0 = input_items[0]
+
+        with self.lock:
+            if self.writer is None:
+                fd, self.path = tempfile.mkstemp(prefix="gr-analyzer-fft-",
+                                                 dir=self.spool_dir)
+                os.close(fd)
+                self.writer = async_writer(self.path, keep_offsets=True)
+            self.writer.write(in0)
+            self.nvectors += len(in0)
+
+        return len(in0)
+
+    def stop(self):
+        with self.lock:
+            if self.writer is not None:
+                self.writer.flush()
+        return True
+
+    def stats(self):
+        """Return the telemetry of the spool's async_writer, or None."""
+        writer = self.writer
+        return None if writer is None else writer.stats()
+
+    def has_data(self):
+        return self.nvectors > 0
+
+    def vectors(self):
+        """Return the spooled vectors as a read-only memory-mapped
+        (nvectors, fft_size) array, or None if there are none."""
+        with self.lock:
+            if not self.nvectors:
+                return None
+            self.writer.flush()
+            return np.memmap(self.path, np.complex64, 'r',
+                             shape=(self.nvectors, self.fft_size))
+
+    def reset(self):
+        """Discard the spooled vectors."""
+        with self.lock:
+            if self.writer is not None:
+                self.writer.close(sync=False)
+                os.unlink(self.path)
+            self.writer = None
+            self.path = None
+            self.nvectors = 0
@@ -0,0 +1,199 @@
+import os
+import time
+import logging
+import threading
+
+import numpy as np
+
+from gnuradio import gr
+
+from async_writer import async_writer
+from sigmf_sink_c import sigmf_capture, write_sigmf_meta
+
+
+SC16_FULL_SCALE = 32767.0 # the short of a sample of 1.0
+
+# async_writer telemetry summed over every recording
+TOTAL_STATS = ('written_mb', 'dropped_writes', 'dropped_mb', 'fsyncs')
+
+
+class iq_recorder_s(gr.sync_block):
+    """Record every sample of continuous sweeps as sc16 SigMF recordings.
+
+    Takes the controller's output scaled by SC16_FULL_SCALE and converted
+    to interleaved shorts, so the conversion runs in C++
+    (blocks.complex_to_interleaved_short) and the recording is half the
+    size of fc32. Here the shorts are only copied into an async_writer's
+    buffers, so the flowgraph never waits for the disk.
+
+    Every segment_len samples start a SigMF capture with the segment's
+    number, center frequency and host time. A new recording starts at a
+    segment boundary once the current one reaches max_bytes or lasts
+    max_seconds, and every run of the flowgraph starts a new recording,
+    so each file holds whole segments of a single configuration; a segment
+    cut short by a stop is left out. The
+    recordings are named iq_<time>_<n> in directory. A finished recording
+    is closed and its metadata written from a thread of its own.
+    """
+    def __init__(self, sample_rate, segment_len, center_freqs, directory,
+                 max_bytes=None, max_seconds=None, get_gain=None):
+        gr.sync_block.__init__(
+            self,
+            name="iq_recorder_s",
+            in_sig=[np.int16],
+            out_sig=None
+        )
+
+        self.logger = logging.getLogger('gr-analyzer.iq_recorder_s')
+        self.sample_rate = sample_rate
+        self.segment_shorts = 2 * segment_len # I and Q of every sample
+        self.center_freqs = list(center_freqs)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.get_gain = get_gain
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        self.nshorts = 0        # shorts recorded since the recorder was made
+        self.nrecordings = 0
+        self.writer = None      # async_writer of the current recording
+        self.base = None
+        self.captures = []
+        self.file_start = 0     # self.nshorts when the recording started
+        self.start_time = None
+        self.finishing = []     # threads closing finished recordings
+
+        # totals over recordings, which stats is called for from other
+        # threads
+        self.lock = threading.Lock()
+        self.closing = []       # writers of finished recordings being closed
+        self.totals = dict.fromkeys(TOTAL_STATS, 0)
+
+    def _start(self):
+        stamp = time.strftime("%Y%m%dT%H%M%S")
+        self.base = os.path.join(self.directory, "iq_{}_{:04d}".format(
+            stamp, self.nrecordings))
+        self.nrecordings += 1
+        self.writer = async_writer(self.base + ".sigmf-data",
+                                   keep_offsets=True)
+        self.captures = []
+        self.file_start = self.nshorts
+        self.start_time = time.time()
+
+    def _finish(self):
+        """Close the current recording, if any, in the background."""
+        if self.writer is None:
+            return
+        # a segment cut short by a stop is left out of the recording
+        nbytes = 2 * (self.nshorts - self.file_start)
+        partial = nbytes % (2 * self.segment_shorts)
+        if partial:
+            self.captures.pop()
+        with self.lock:
+            writer = self.writer
+            self.closing.append(writer)
+            self.writer = None
+        args = (writer, self.base, self.captures, nbytes - partial)
+        finisher = threading.Thread(target=self._close_recording, args=args)
+        finisher.start()
+        self.finishing = [t for t in self.finishing if t.is_alive()]
+        self.finishing.append(finisher)
+
+    def _close_recording(self, writer, base, captures, nbytes):
+        writer.close()
+        stats = writer.stats()
+        with self.lock:
+            self.closing.remove(writer)
+            for key in TOTAL_STATS:
+                self.totals[key] += stats[key]
+        data_path = base + ".sigmf-data"
+        if not captures:
+            os.unlink(data_path)
+            return
+        if os.path.getsize(data_path) > nbytes:
+            with open(data_path, 'r+b') as f:
+                f.truncate(nbytes)
+        write_sigmf_meta(base + ".sigmf-meta", self.sample_rate, captures,
+                         "gr-analyzer continuous I/Q recording", "ci16_le")
+        msg = "Recorded {:.1f} MB of I/Q to {}"
+        if stats['dropped_writes']:
+            msg += ", {:.1f} MB lost (zeros) as the disk couldn't keep up"
+        self.logger.info(msg.format(nbytes / 1e6, data_path,
+                                    stats['dropped_mb']))
+
+    def _rotate_due(self):
+        if self.max_bytes is not None:
+            if (self.nshorts - self.file_start) * 2 >= self.max_bytes:
+                return True
+        if self.max_seconds is not None:
+            if time.time() - self.start_time >= self.max_seconds:
+                return True
+        return False
+
+    def work(self, input_items, output_items):
+        in0 = input_items[0]
+        ninput_items = len(in0)
+
+        done = 0
+        while done < ninput_items:
+            offset = self.nshorts % self.segment_shorts
+            if offset == 0:
+                if self.writer is not None and self._rotate_due():
+                    self._finish()
+                if self.writer is None:
+                    self._start()
+                segment = self.nshorts // self.segment_shorts
+                freq = self.center_freqs[segment % len(self.center_freqs)]
+                gain = self.get_gain() if self.get_gain is not None else None
+                capture = sigmf_capture((self.nshorts - self.file_start) // 2,
+                                        freq, time.time(), gain)
+                capture["analyzer:segment"] = segment
+                self.captures.append(capture)
+
+            count = min(ninput_items - done, self.segment_shorts - offset)
+            self.writer.write(in0[done:done + count])
+            done += count
+            self.nshorts += count
+
+        return ninput_items
+
+    def stop(self):
+        # the controller starts the next run with a new sweep, so does the
+        # count of segments, in a new recording
+        self._finish()
+        sweep_shorts = self.segment_shorts * len(self.center_freqs)
+        self.nshorts += -self.nshorts % sweep_shorts
+        return True
+
+    def stats(self):
+        """Return the telemetry of the async_writers of every recording so
+        far, as that of one, or None before the first."""
+        if not self.nrecordings:
+            return None
+        with self.lock:
+            writer = self.writer
+            writers = list(self.closing)
+            stats = dict(self.totals)
+        if writer is not None:
+            writers.append(writer)
+        for each in writers:
+            each_stats = each.stats()
+            for key in TOTAL_STATS:
+                stats[key] += each_stats[key]
+
+        # the queue and rate are those of the recording being written
+        current = writer.stats() if writer is not None else {}
+        stats['queue_depth'] = current.get('queue_depth', 0)
+        stats['queue_capacity'] = current.get('queue_capacity',
+                                              async_writer.NBUFFERS)
+        stats['write_rate'] = current.get('write_rate', 0.0)
+        stats['recordings'] = self.nrecordings
+        return stats
+
+    def close(self):
+        """Finish the current recording and wait for all to be written."""
+        self._finish()
+        for finisher in self.finishing:
+            finisher.join()
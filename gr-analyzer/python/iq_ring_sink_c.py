@@ -0,0 +1,150 @@
+import os
+import mmap
+import time
+import tempfile
+
+import numpy as np
+
+from gnuradio import gr
+
+from sigmf_sink_c import sigmf_capture, write_sigmf_meta
+
+
+# what's known of the segment in each slot of the ring
+INDEX_DTYPE = np.dtype([
+    ('segment', np.int64),      # number of the segment, -1 while torn
+    ('center_freq', np.float64),
+    ('time', np.float64),       # host time its first sample arrived
+    ('gain', np.float64),       # NaN if unknown
+])
+
+
+class iq_ring_sink_c(gr.sync_block):
+    """Keep the raw I/Q of the last nsweeps sweeps in a memory-mapped ring.
+
+    The ring holds one slot of segment_len samples per segment, indexed by
+    segment number and center frequency, and is always recording. A sweep
+    seen on screen can then be exported after the fact with export, which
+    writes its slots straight from the mapping to a SigMF recording, with
+    no re-acquisition.
+
+    The writer never waits for an export. A slot is marked torn while it's
+    written, and the export checks every slot again after copying it, so a
+    segment overwritten during the export is left out rather than corrupt.
+    """
+    def __init__(self, sample_rate, segment_len, center_freqs, nsweeps,
+                 get_gain=None, spool_dir=None):
+        gr.sync_block.__init__(
+            self,
+            name="iq_ring_sink_c",
+            in_sig=[np.complex64],
+            out_sig=None
+        )
+
+        self.sample_rate = sample_rate
+        self.segment_len = segment_len
+        self.center_freqs = list(center_freqs)
+        self.n_segments = len(self.center_freqs)
+        self.nslots = nsweeps * self.n_segments
+        self.get_gain = get_gain
+
+        fd, path = tempfile.mkstemp(prefix="gr-analyzer-ring-",
+                                    dir=spool_dir)
+        size = self.nslots * segment_len * np.dtype(np.complex64).itemsize
+        with os.fdopen(fd, 'w+b') as f:
+            f.truncate(size)
+            self.mm = mmap.mmap(f.fileno(), size)
+        os.unlink(path) # the space is freed with the mapping
+
+        self.data = np.frombuffer(self.mm, np.complex64).reshape(
+            self.nslots, segment_len)
+        self.index = np.zeros(self.nslots, dtype=INDEX_DTYPE)
+        self.index['segment'] = -1
+        self.nitems = 0 # samples written since the ring was created
+
+    def work(self, input_items, output_items):
+        in0 = input_items[0]
+        ninput_items = len(in0)
+
+        done = 0
+        while done < ninput_items:
+            segment, offset = divmod(self.nitems, self.segment_len)
+            slot = segment % self.nslots
+            if offset == 0:
+                gain = None if self.get_gain is None else self.get_gain()
+                if gain is None:
+                    gain = np.nan
+                freq = self.center_freqs[segment % self.n_segments]
+                self.index[slot] = (-1, freq, time.time(), gain)
+
+            count = min(ninput_items - done, self.segment_len - offset)
+            self.data[slot, offset:offset + count] = in0[done:done + count]
+            done += count
+            self.nitems += count
+
+            if offset + count == self.segment_len:
+                self.index['segment'][slot] = segment
+
+        return ninput_items
+
+    def complete_sweeps(self):
+        """Return the number of sweeps completed since the ring was made."""
+        return self.nitems // self.segment_len // self.n_segments
+
+    def has_data(self):
+        return self.complete_sweeps() > 0
+
+    def sweep_segments(self, nsweeps=1, freq_range=None):
+        """Return the numbers of the segments of the last nsweeps complete
+        sweeps still in the ring, oldest first, optionally only those with
+        a center frequency within freq_range (min, max)."""
+        last = self.complete_sweeps() * self.n_segments
+        first = max(last - nsweeps * self.n_segments, 0)
+        segments = np.arange(first, last)
+        segments = segments[self.index['segment'][segments % self.nslots] ==
+                            segments]
+        if freq_range is not None:
+            freqs = self.index['center_freq'][segments % self.nslots]
+            lo, hi = freq_range
+            segments = segments[(freqs >= lo) & (freqs <= hi)]
+        return segments
+
+    def read_segments(self, nsweeps=1, freq_range=None):
+        """Yield the center frequency and a copy of the samples of each
+        segment picked by sweep_segments, as ([freq], samples) with samples
+        a 1 x segment_len array, leaving out any overwritten meanwhile."""
+        for segment in self.sweep_segments(nsweeps, freq_range):
+            slot = segment % self.nslots
+            freq = float(self.index['center_freq'][slot])
+            samples = self.data[slot:slot + 1].copy()
+            if self.index['segment'][slot] == segment:
+                yield [freq], samples
+
+    def export(self, base, nsweeps=1, freq_range=None):
+        """Write the segments picked by sweep_segments to a SigMF recording,
+        base.sigmf-meta and base.sigmf-data. Return the number of segments
+        written."""
+        captures = []
+        with open(base + ".sigmf-data", 'wb') as f:
+            for segment in self.sweep_segments(nsweeps, freq_range):
+                slot = segment % self.nslots
+                entry = self.index[slot].copy()
+                if entry['segment'] != segment:
+                    continue # overwritten already
+                pos = f.tell()
+                self.data[slot].tofile(f)
+                if self.index['segment'][slot] != segment:
+                    # overwritten while being written out
+                    f.seek(pos)
+                    f.truncate()
+                    continue
+                gain = float(entry['gain'])
+                captures.append(sigmf_capture(
+                    len(captures) * self.segment_len,
+                    float(entry['center_freq']),
+                    float(entry['time']),
+                    None if np.isnan(gain) else gain))
+
+        write_sigmf_meta(base + ".sigmf-meta", self.sample_rate, captures,
+                         "gr-analyzer sweep, from the I/Q ring")
+        return len(captures)
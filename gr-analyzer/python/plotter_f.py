@@ -1,7 +1,8 @@
 import numpy as np
 
 from gnuradio import gr
-import pmt
+
+from sweep_counter import sweep_counter
 
 
 class plotter_f(gr.sync_block):
@@ -13,25 +14,30 @@ class plotter_f(gr.sync_block):
             out_sig=None
         )
 
-        self.tb = tb
         self.max_bin = tb.cfg.max_plotted_bin # crop plotted data to span
-        self.plot_iface = tb.plot_iface
-        self.plot_iface.redraw_plot.set()
+        self.sink = tb.sink
+        self.sink.redraw_plot.set()
+        self.sweeps = sweep_counter()
+
+    def set_generation(self, generation):
+        """Tag the traces that follow with configuration generation."""
+        self.sweeps.set_generation(generation)
 
-        self.signal = pmt.from_bool(False)
-        self.port_name = pmt.intern("gui_busy_notifier")
-        self.message_port_register_out(self.port_name)
+    def start(self):
+        # the first sweep of a run starts with the flowgraph
+        self.sweeps.begin()
+        return True
 
     def work(self, input_items, output_items):
         in0 = input_items[0]
         ninput_items = len(in0)
 
-        gui_alive = self.plot_iface.update(in0[0][:self.max_bin])
-        if not gui_alive:
-            return -1
-
-        if self.tb.continuous_run.is_set():
-            # only protect the gui thread in continuous mode
-            self.message_port_pub(self.port_name, self.signal)
+        # Sinks never block: the gui only keeps the latest trace (see
+        # handoff.trace_mailbox), so every trace can be handed on
+        for points in in0:
+            info = self.sweeps.finish()
+            sink_alive = self.sink.update(points[:self.max_bin], info)
+            if not sink_alive:
+                return -1
 
         return ninput_items
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from gnuradio import gr_unittest
+
+import qa_fixtures
+
+from archive import (TILES_SUFFIX, archive_writer, archive_reader,
+                     query_archive)
+from tracestore import read_tiles
+
+class qa_archive(gr_unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "archive")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_append_after_truncated_block(self):
+        first = qa_fixtures.traces(10, 0, decimals=1)
+        lost = qa_fixtures.traces(10, 10, decimals=1)
+        writer = archive_writer(self.path)
+        writer.append((1e6, 1e3), *first)
+        writer.flush()
+        end = os.path.getsize(self.path)
+        writer.append((1e6, 1e3), *lost)
+        writer.close()
+
+        # a crash in the middle of writing the second block
+        with open(self.path, 'r+b') as f:
+            f.truncate(end + (os.path.getsize(self.path) - end) // 2)
+
+        last = qa_fixtures.traces(5, 20, decimals=1)
+        writer = archive_writer(self.path)
+        writer.append((1e6, 1e3), *last)
+        writer.close()
+
+        self.assertEqual(writer.stats()['dropped_writes'], 0)
+
+        reader = archive_reader(self.path)
+        self.assertEqual(len(reader.blocks), 2)
+        for i, (traces, meta) in enumerate((first, last)):
+            read_meta, read_traces = reader.read(i)
+            self.assertTrue(np.array_equal(read_meta, meta))
+            self.assertTrue(np.allclose(read_traces, traces, atol=0.051))
+        reader.close()
+
+    def test_query(self):
+        writer = archive_writer(self.path)
+        writer.append((1e6, 1e3), *qa_fixtures.traces(10, 0, decimals=1))
+        writer.append((2e6, 1e3), *qa_fixtures.traces(10, 10, decimals=1))
+        writer.append((3e6, 1e3), *qa_fixtures.traces(10, 20, decimals=1))
+        writer.close()
+
+        self.assertEqual(query_archive(self.path), [0, 1, 2])
+        self.assertEqual(query_archive(self.path, freq_range=(2e6, 2.05e6)),
+                         [1])
+        self.assertEqual(query_archive(self.path, time_range=(12, 25)),
+                         [1, 2])
+
+        # with the last block's tiles lost it can't be ruled out
+        tiles = self.path + TILES_SUFFIX
+        with open(tiles, 'r+b') as f:
+            f.truncate(os.path.getsize(tiles) * 2 // 3)
+        self.assertEqual(query_archive(self.path, freq_range=(2e6, 2.05e6)),
+                         [1, 2])
+
+    def test_drop_tiles_of_truncated_block(self):
+        writer = archive_writer(self.path)
+        writer.append((1e6, 1e3), *qa_fixtures.traces(10, 0, decimals=1))
+        writer.flush()
+        end = os.path.getsize(self.path)
+        writer.append((2e6, 1e3), *qa_fixtures.traces(10, 10, decimals=1))
+        writer.close()
+
+        # a crash in the middle of the second block, after its tiles
+        with open(self.path, 'r+b') as f:
+            f.truncate(end + 10)
+
+        writer = archive_writer(self.path)
+        writer.append((3e6, 1e3), *qa_fixtures.traces(10, 20, decimals=1))
+        writer.close()
+        self.assertEqual(read_tiles(self.path + TILES_SUFFIX)['chunk']
+                         .tolist(), [0, 1])
+        self.assertEqual(query_archive(self.path, freq_range=(2e6, 2.05e6)),
+                         [])
+        self.assertEqual(query_archive(self.path, freq_range=(3e6, 3.05e6)),
+                         [1])
+
+    def test_dropped_block(self):
+        writer = archive_writer(self.path)
+        writer.append((1e6, 1e3), *qa_fixtures.traces(10, 0, decimals=1))
+        # a block the disk can't take gets no tiles and no block number
+        write = writer.writer.write
+        writer.writer.write = lambda data: False
+        writer.append((2e6, 1e3), *qa_fixtures.traces(10, 10, decimals=1))
+        writer.writer.write = write
+        writer.append((3e6, 1e3), *qa_fixtures.traces(10, 20, decimals=1))
+        writer.close()
+
+        reader = archive_reader(self.path)
+        self.assertEqual([b['min_freq'] for b in reader.blocks], [1e6, 3e6])
+        reader.close()
+        self.assertEqual(read_tiles(self.path + TILES_SUFFIX)['chunk']
+                         .tolist(), [0, 1])
+        self.assertEqual(query_archive(self.path, freq_range=(3e6, 3.05e6)),
+                         [1])
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_archive, "qa_archive.xml")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from gnuradio import gr_unittest
+from async_writer import async_writer
+
+class qa_async_writer(gr_unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "out")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_write(self):
+        data = np.arange(100000, dtype=np.float32)
+        writer = async_writer(self.path, buffer_size=4096, nbuffers=128)
+        for chunk in np.split(data, 10):
+            self.assertTrue(writer.write(chunk))
+        writer.write("end")
+        writer.close()
+
+        with open(self.path, 'rb') as f:
+            written = f.read()
+        self.assertEqual(written[-3:], "end")
+        self.assertFloatTuplesAlmostEqual(
+            np.frombuffer(written[:-3], dtype=np.float32), data)
+        self.assertEqual(writer.stats()['written_mb'], len(written) / 1e6)
+        self.assertEqual(writer.stats()['dropped_writes'], 0)
+
+    def test_drop(self):
+        # the pool holds 2 pages, so a write of 3 can never fit
+        page = os.sysconf('SC_PAGESIZE')
+        writer = async_writer(self.path, buffer_size=page, nbuffers=2)
+        self.assertFalse(writer.write(np.ones(3 * page, dtype=np.uint8)))
+        self.assertTrue(writer.write("ab"))
+        writer.close()
+
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), "ab")
+        self.assertEqual(writer.stats()['dropped_writes'], 1)
+
+    def test_drop_keep_offsets(self):
+        page = os.sysconf('SC_PAGESIZE')
+        writer = async_writer(self.path, keep_offsets=True,
+                              buffer_size=page, nbuffers=2)
+        writer.write("ab")
+        self.assertFalse(writer.write(np.ones(3 * page, dtype=np.uint8)))
+        writer.write("cd")
+        writer.flush()
+        # the dropped bytes are a hole, reading back as zeros
+        self.assertEqual(os.path.getsize(self.path), 3 * page + 4)
+        self.assertFalse(writer.write(np.ones(3 * page, dtype=np.uint8)))
+        writer.close()
+
+        with open(self.path, 'rb') as f:
+            written = f.read()
+        self.assertEqual(written[:2], "ab")
+        self.assertEqual(written[2:3 * page + 2], "\0" * 3 * page)
+        self.assertEqual(written[3 * page + 2:3 * page + 4], "cd")
+        # a trailing hole extends the file
+        self.assertEqual(len(written), 6 * page + 4)
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_async_writer, "qa_async_writer.xml")
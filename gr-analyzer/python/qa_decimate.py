@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from gnuradio import gr_unittest
+
+import qa_fixtures
+
+from decimate import decimate_view, minmax_indices, minmax_pyramid
+
+def envelope(y, ncols):
+    """The nanmin and nanmax of each of minmax_indices' columns, by brute
+    force."""
+    width = -(-len(y) // ncols)
+    cols = [y[i:i+width] for i in xrange(0, len(y), width)]
+    return ([np.nanmin(c) if np.isfinite(c).any() else np.nan for c in cols],
+            [np.nanmax(c) if np.isfinite(c).any() else np.nan for c in cols])
+
+class qa_decimate(gr_unittest.TestCase):
+    def assertEnvelope(self, y, ncols):
+        idx = minmax_indices(y, ncols)
+        self.assertTrue(np.all(np.diff(idx) >= 0))
+        pairs = y[idx].reshape(-1, 2)
+        mins, maxs = envelope(y, ncols)
+        np.testing.assert_array_equal(np.fmin(pairs[:, 0], pairs[:, 1]), mins)
+        np.testing.assert_array_equal(np.fmax(pairs[:, 0], pairs[:, 1]), maxs)
+
+    def test_few_points(self):
+        y = np.random.uniform(-120, -20, 20).astype(np.float32)
+        self.assertTrue(np.array_equal(minmax_indices(y, 10), np.arange(20)))
+
+    def test_envelope(self):
+        y = np.random.uniform(-120, -20, 1000).astype(np.float32)
+        self.assertEnvelope(y, 100)  # full columns only
+        self.assertEnvelope(y, 7)    # and a ragged tail
+
+    def test_partial_trace(self):
+        y = np.random.uniform(-120, -20, 1000).astype(np.float32)
+        # swept up to the middle of a column, and a stray NaN in another
+        y[605:] = np.nan
+        y[3] = np.nan
+        self.assertEnvelope(y, 7)
+        self.assertEnvelope(y, 100)
+
+        # a column that is all NaN stays a gap
+        idx = minmax_indices(y, 100)
+        self.assertTrue(np.isnan(y[idx[-2:]]).all())
+
+    def test_decimate_view(self):
+        x = np.arange(1000, dtype=np.float64)
+        y = np.random.uniform(-120, -20, 1000).astype(np.float32)
+        y[605:] = np.nan
+
+        xd, yd = decimate_view(x, y, (100.5, 799.5, 10))
+        # one point beyond each edge, then min/max pairs of what's in view
+        self.assertEqual((xd[0], xd[-1]), (100, 800))
+        self.assertEqual(len(xd), 2 + 2 * 10)
+        self.assertEqual(np.nanmax(yd), np.nanmax(y[100:801]))
+        self.assertEqual(np.nanmin(yd), np.nanmin(y[100:801]))
+
+        # past the end of the trace only its last point is left
+        xd, yd = decimate_view(x, y, (2000, 3000, 10))
+        self.assertTrue(np.all(xd == 999))
+        xd, yd = decimate_view(x, y, None)
+        self.assertIs(xd, x)
+
+    def assertPyramid(self, y, view):
+        x = np.arange(len(y), dtype=np.float64)
+        xd, yd = minmax_pyramid(y).decimate(x, y, view)
+
+        # the points in view and one beyond each edge
+        xmin, xmax, width = view
+        lo = max(int(np.ceil(xmin)) - 1, 0)
+        hi = min(int(np.ceil(xmax)) + 1, len(y))
+        if hi - lo < 2 * width:
+            # few enough points to draw them all
+            xv, yv = decimate_view(x, y, view)
+            self.assertTrue(np.array_equal(xd, xv))
+            self.assertTrue(np.array_equal(yd, yv))
+            return None
+
+        # the biggest blocks that still give a block per pixel column, up
+        # to the single block of the whole trace
+        level = 0
+        while (2 << level) * width <= hi - lo and (1 << level) < len(y):
+            level += 1
+        size = 1 << level
+
+        starts = np.arange(lo // size * size, hi, size)
+        self.assertTrue(np.array_equal(xd, np.repeat(starts, 2)))
+        blocks = [y[start:start + size] for start in starts]
+        self.assertTrue(np.array_equal(yd[0::2], [b.min() for b in blocks]))
+        self.assertTrue(np.array_equal(yd[1::2], [b.max() for b in blocks]))
+        return level
+
+    def test_pyramid(self):
+        y = np.random.uniform(-120, -20, 1000).astype(np.float32)
+        self.assertEqual(self.assertPyramid(y, (0, 999, 10)), 6)
+        self.assertEqual(self.assertPyramid(y, (100.5, 300.2, 10)), 4)
+        self.assertEqual(self.assertPyramid(y, (0, 999, 1)), 9)
+
+    def test_pyramid_odd_block_out(self):
+        # the last block of every level is short, down to a single point
+        y = np.random.uniform(-120, -20, 1001).astype(np.float32)
+        y[-1] = 0
+        for width in (1, 3, 10, 100, 250):
+            self.assertPyramid(y, (0, 1000, width))
+            self.assertPyramid(y, (990.5, 1000, width))
+
+    def test_pyramid_coarsest_level(self):
+        y = np.random.uniform(-120, -20, 1024).astype(np.float32)
+        self.assertEqual(self.assertPyramid(y, (0, 1023, 1)), 10)
+
+    def test_pyramid_few_points(self):
+        y = np.random.uniform(-120, -20, 100).astype(np.float32)
+        self.assertIsNone(self.assertPyramid(y, (10.5, 60.5, 40)))
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_decimate, "qa_decimate.xml")
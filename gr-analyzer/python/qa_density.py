@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from gnuradio import gr_unittest
+
+import qa_fixtures
+
+from density import density_histogram
+
+NBINS = 100
+NCOLS = 10
+NROWS = 20
+POWER_RANGE = (-120, -20)
+
+class qa_density(gr_unittest.TestCase):
+    def setUp(self):
+        self.x = np.arange(NBINS, dtype=np.float64)
+        self.view = (0, NBINS - 1, NCOLS)
+
+    def histogram(self, half_life):
+        return density_histogram(self.x, self.view, POWER_RANGE, NROWS,
+                                 half_life)
+
+    def hits(self, y):
+        """The pixels hit by trace y, each once, by brute force."""
+        hits = np.zeros((NROWS, NCOLS))
+        for i, power in enumerate(y):
+            row = int((power - POWER_RANGE[0]) * NROWS /
+                      float(POWER_RANGE[1] - POWER_RANGE[0]))
+            hits[min(max(row, 0), NROWS - 1), i * NCOLS // NBINS] = 1
+        return hits
+
+    def assertDecayed(self, hist, traces, half_life):
+        decay = 0.5 ** (1.0 / half_life)
+        expected = np.zeros((NROWS, NCOLS))
+        for y in traces:
+            expected = expected * decay + self.hits(y)
+        self.assertTrue(np.allclose(hist.density(),
+                                    expected * (1 - decay)))
+
+    def test_decay(self):
+        hist = self.histogram(4)
+        traces = np.random.uniform(-130, -10, (30, NBINS))
+        for y in traces:
+            hist.add(y)
+        self.assertDecayed(hist, traces, 4)
+
+    def test_renormalize(self):
+        hist = self.histogram(2)
+        hist.MAX_WEIGHT = 10.0
+        traces = np.random.uniform(-130, -10, (50, NBINS))
+        for y in traces:
+            hist.add(y)
+            self.assertTrue(hist.weight <= 10.0 / hist.decay)
+        self.assertDecayed(hist, traces, 2)
+
+    def test_one_hit_per_pixel(self):
+        hist = self.histogram(1)
+        # the 10 bins of each column all fall in the same pixel
+        y = np.full(NBINS, -50.0)
+        hist.add(y)
+        density = hist.density()
+        self.assertEqual(np.count_nonzero(density), NCOLS)
+        self.assertTrue(np.allclose(density[density > 0], 0.5))
+
+        # a pixel hit by every trace tends to 1
+        for _ in xrange(60):
+            hist.add(y)
+        self.assertTrue(np.allclose(hist.density()[density > 0], 1))
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_density, "qa_density.xml")
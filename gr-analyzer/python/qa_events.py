@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from collections import namedtuple
+
+import numpy as np
+
+from gnuradio import gr_unittest
+
+import qa_fixtures
+
+from events import threshold_tracker, threshold_monitor, event_dispatcher
+
+cfg = namedtuple('cfg', 'bin_freqs max_plotted_bin generation')
+info = namedtuple('info', 'generation end_time')
+
+class list_sink(object):
+    def __init__(self):
+        self.events = []
+        self.suppressed_counts = []
+
+    def emit(self, event):
+        self.events.append(event)
+
+    def suppressed(self, count):
+        self.suppressed_counts.append(count)
+
+    def close(self):
+        pass
+
+class qa_events(gr_unittest.TestCase):
+    def setUp(self):
+        self.x = np.arange(10) * 1e6
+        self.tracker = threshold_tracker(-50, 0)
+
+    def trace(self, *over):
+        y = np.full(10, -100.0)
+        for lo, hi in over:
+            y[lo:hi] = -40
+        return y
+
+    def update(self, now, *over):
+        return self.tracker.update(self.x, self.trace(*over), now)
+
+    def test_merge(self):
+        events = self.update(0, (1, 3), (5, 7))
+        self.assertEqual([e.kind for e in events], ['start', 'start'])
+
+        # the two join, so one carries on and the other ends
+        events = self.update(1, (1, 7))
+        self.assertEqual([e.kind for e in events], ['end'])
+        self.assertEqual(events[0].start_freq, 5e6)
+
+        events = self.update(2)
+        self.assertEqual([e.kind for e in events], ['end'])
+        self.assertEqual(events[0].duration, 2)
+
+    def test_split(self):
+        self.update(0, (1, 7))
+        # the second part is a new event, ended like any other
+        events = self.update(1, (1, 3), (5, 7))
+        self.assertEqual([(e.kind, e.start_freq) for e in events],
+                         [('start', 5e6)])
+        events = self.update(2)
+        self.assertEqual([e.kind for e in events], ['end', 'end'])
+
+    def test_reset(self):
+        self.update(0, (1, 3), (5, 7))
+        events = self.tracker.reset(1)
+        self.assertEqual([e.kind for e in events], ['end', 'end'])
+        self.assertEqual(self.update(2), [])
+
+    def monitor(self, sink):
+        monitor = threshold_monitor(event_dispatcher([sink], 100, 100), 0)
+        monitor.configure(cfg(self.x, 10, 1))
+        monitor.set_level(-50)
+        monitor.update(self.trace((1, 3)), info(1, 3))
+        monitor.update(self.trace((1, 3)), info(1, 5))
+        return monitor
+
+    def assertEndedAtLastSweep(self, sink):
+        self.assertEqual([e.kind for e in sink.events], ['start', 'end'])
+        # ended on the clock of the sweeps, at the last one it was seen in
+        self.assertEqual(sink.events[0].time, 3)
+        self.assertEqual(sink.events[1].time, 5)
+        self.assertEqual(sink.events[1].duration, 2)
+
+    def test_reconfigure(self):
+        sink = list_sink()
+        self.monitor(sink).configure(cfg(self.x, 10, 2))
+        self.assertEndedAtLastSweep(sink)
+
+    def test_set_level(self):
+        sink = list_sink()
+        self.monitor(sink).set_level(-30)
+        self.assertEndedAtLastSweep(sink)
+
+    def test_close(self):
+        sink = list_sink()
+        self.monitor(sink).close()
+        self.assertEndedAtLastSweep(sink)
+
+    def test_close_reports_suppressed(self):
+        sink = list_sink()
+        dispatcher = event_dispatcher([sink], 1e-6, 1)
+        for now in xrange(3):
+            for event in self.update(now, (now, now + 1)):
+                dispatcher.emit(event)
+        dispatcher.close()
+        self.assertEqual(len(sink.events), 1)
+        self.assertEqual(sink.suppressed_counts, [4])
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_events, "qa_events.xml")
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from gnuradio import gr, gr_unittest
+from gnuradio import blocks
+from fft_spool_sink_c import fft_spool_sink_c
+
+class qa_fft_spool_sink_c(gr_unittest.TestCase):
+    def setUp(self):
+        self.tb = gr.top_block()
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.tb = None
+        shutil.rmtree(self.dir)
+
+    def test_vectors(self):
+        src_data = (np.arange(32 * 10) * (1 - 1j)).astype(np.complex64)
+        src = blocks.vector_source_c(src_data, vlen=32)
+        sink = fft_spool_sink_c(32, spool_dir=self.dir)
+        self.tb.connect(src, sink)
+        self.tb.run()
+
+        self.assertTrue(sink.has_data())
+        vectors = sink.vectors()
+        self.assertEqual(vectors.shape, (10, 32))
+        self.assertComplexTuplesAlmostEqual(vectors.ravel(), src_data)
+
+    def test_reset(self):
+        src = blocks.vector_source_c(np.zeros(64, dtype=np.complex64),
+                                     vlen=32)
+        sink = fft_spool_sink_c(32, spool_dir=self.dir)
+        self.tb.connect(src, sink)
+        self.tb.run()
+
+        sink.reset()
+        self.assertFalse(sink.has_data())
+        self.assertEqual(sink.vectors(), None)
+        self.assertEqual(len(os.listdir(self.dir)), 0)
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_fft_spool_sink_c, "qa_fft_spool_sink_c.xml")
@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Setup shared by the qa tests of the modules at the top of the source tree.
+
+Importing this module makes those modules (tracestore, archive, events, the
+top block, ...) importable from the qa tests.
+"""
+
+import os
+import sys
+
+import numpy as np
+
+TOPDIR = os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir))
+if TOPDIR not in sys.path:
+    sys.path.insert(0, TOPDIR)
+
+def traces(nrows, start_time, nbins=100, decimals=None):
+    """Return nrows random float32 traces of nbins and their metadata, one
+    sweep a second from start_time, each taking half a second.
+
+    With decimals, the levels are rounded to survive lossy storage.
+    """
+    from tracestore import TRACE_META_DTYPE
+
+    levels = np.random.uniform(-120, -20, (nrows, nbins))
+    if decimals is not None:
+        levels = np.round(levels, decimals)
+    meta = np.zeros(nrows, dtype=TRACE_META_DTYPE)
+    meta['seq'] = np.arange(nrows)
+    meta['start_time'] = start_time + np.arange(nrows)
+    meta['end_time'] = meta['start_time'] + 0.5
+    return levels.astype(np.float32), meta
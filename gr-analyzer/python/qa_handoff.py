@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from gnuradio import gr_unittest
+
+import qa_fixtures
+
+from handoff import trace_mailbox
+
+class qa_handoff(gr_unittest.TestCase):
+    def write(self, mailbox, value, redraw=False, size=4):
+        slot = mailbox.back_slot(size)
+        slot.points[:] = value
+        slot.redraw = redraw
+        mailbox.publish()
+        return slot
+
+    def test_latest_wins(self):
+        mailbox = trace_mailbox()
+        self.assertIsNone(mailbox.take())
+
+        self.write(mailbox, 1)
+        self.assertEqual(mailbox.take().points[0], 1)
+        self.assertIsNone(mailbox.take())
+
+        for value in (2, 3, 4):
+            self.write(mailbox, value)
+        self.assertEqual(mailbox.take().points[0], 4)
+        self.assertEqual(mailbox.counts(),
+                         dict(written=4, rendered=2, dropped=2))
+
+    def test_reader_slot_is_never_written(self):
+        mailbox = trace_mailbox()
+        self.write(mailbox, 1)
+        front = mailbox.take()
+        for value in xrange(2, 10):
+            self.assertIsNot(self.write(mailbox, value), front)
+            self.assertEqual(front.points[0], 1)
+
+        # the three slots each hold a different trace
+        latest = mailbox.take()
+        self.assertEqual(latest.points[0], 9)
+        self.assertEqual(len(set(map(id, mailbox.slots))), 3)
+
+    def test_redraw_carries_over(self):
+        mailbox = trace_mailbox()
+        self.write(mailbox, 1, redraw=True)
+        self.write(mailbox, 2)
+        self.write(mailbox, 3)
+        slot = mailbox.take()
+        self.assertEqual(slot.points[0], 3)
+        self.assertTrue(slot.redraw)
+
+        # a taken redraw doesn't carry over
+        self.write(mailbox, 4)
+        self.assertFalse(mailbox.take().redraw)
+
+    def test_resize(self):
+        mailbox = trace_mailbox()
+        self.write(mailbox, 1, size=4)
+        self.write(mailbox, 2, size=8)
+        self.assertEqual(len(mailbox.take().points), 8)
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_handoff, "qa_handoff.xml")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import glob
+import json
+import shutil
+import tempfile
+
+import numpy as np
+
+from gnuradio import gr, gr_unittest
+from gnuradio import blocks
+from iq_recorder_s import iq_recorder_s, SC16_FULL_SCALE
+from replay_source_c import open_recording, replay_source_c
+
+class qa_iq_recorder_s(gr_unittest.TestCase):
+    def setUp(self):
+        self.tb = gr.top_block()
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.tb = None
+        shutil.rmtree(self.dir)
+
+    def record(self, shorts, segment_len, center_freqs, **kwargs):
+        src = blocks.vector_source_s(shorts)
+        recorder = iq_recorder_s(1e6, segment_len, center_freqs, self.dir,
+                                 **kwargs)
+        self.tb.connect(src, recorder)
+        self.tb.run()
+        recorder.close()
+        self.recorder = recorder
+        metas = glob.glob(os.path.join(self.dir, "*.sigmf-meta"))
+        # iq_<time>_<n>, in the order recorded
+        metas.sort(key=lambda path: path.rsplit("_", 1)[1])
+        return [os.path.splitext(path)[0] for path in metas]
+
+    def test_record(self):
+        # two sweeps of two segments of 100 samples, then half a segment
+        shorts = np.arange(900, dtype=np.int16)
+        bases = self.record(shorts, 100, [1e9, 2e9])
+        self.assertEqual(len(bases), 1)
+
+        with open(bases[0] + ".sigmf-meta") as f:
+            meta = json.load(f)
+        self.assertEqual(meta["global"]["core:datatype"], "ci16_le")
+        self.assertEqual([c["analyzer:segment"] for c in meta["captures"]],
+                         [0, 1, 2, 3])
+
+        sample_rate, segments, samples = open_recording(bases[0])
+        self.assertEqual([s['start'] for s in segments], [0, 100, 200, 300])
+        self.assertEqual([s['frequency'] for s in segments],
+                         [1e9, 2e9, 1e9, 2e9])
+        # the half segment is left out
+        self.assertTrue(np.array_equal(samples.reshape(-1), shorts[:800]))
+
+    def test_rotate(self):
+        # a new recording every two segments, of 400 bytes each
+        shorts = np.arange(1200, dtype=np.int16)
+        bases = self.record(shorts, 100, [1e9, 2e9, 3e9], max_bytes=800)
+        self.assertEqual(len(bases), 3)
+
+        freqs = []
+        data = []
+        for base in bases:
+            sample_rate, segments, samples = open_recording(base)
+            self.assertEqual(len(segments), 2)
+            freqs.extend(s['frequency'] for s in segments)
+            data.append(np.array(samples).reshape(-1))
+        self.assertEqual(freqs, [1e9, 2e9, 3e9, 1e9, 2e9, 3e9])
+        self.assertTrue(np.array_equal(np.concatenate(data), shorts))
+
+        # the telemetry covers every recording, not just the last
+        stats = self.recorder.stats()
+        self.assertEqual(stats['recordings'], 3)
+        self.assertAlmostEqual(stats['written_mb'], 2400 / 1e6)
+        self.assertEqual(stats['dropped_writes'], 0)
+
+    def test_replay(self):
+        shorts = np.arange(-200, 200, dtype=np.int16)
+        base, = self.record(shorts, 100, [1e9, 2e9])
+
+        src = replay_source_c(base, [1e9, 2e9], 100)
+        src.set_exit_after_complete()
+        sink = blocks.vector_sink_c()
+        tb = gr.top_block()
+        tb.connect(src, sink)
+        tb.run()
+
+        expected = (shorts[0::2] + 1j * shorts[1::2]) / SC16_FULL_SCALE
+        self.assertComplexTuplesAlmostEqual(sink.data(), expected, 6)
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_iq_recorder_s, "qa_iq_recorder_s.xml")
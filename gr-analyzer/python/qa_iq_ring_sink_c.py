@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import shutil
+import tempfile
+
+import numpy as np
+
+from gnuradio import gr, gr_unittest
+from gnuradio import blocks
+from iq_ring_sink_c import iq_ring_sink_c
+
+class qa_iq_ring_sink_c(gr_unittest.TestCase):
+    def setUp(self):
+        self.tb = gr.top_block()
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.tb = None
+        shutil.rmtree(self.dir)
+
+    def record(self, src_data, segment_len, center_freqs, nsweeps):
+        src = blocks.vector_source_c(src_data)
+        ring = iq_ring_sink_c(1e6, segment_len, center_freqs, nsweeps,
+                              spool_dir=self.dir)
+        self.tb.connect(src, ring)
+        self.tb.run()
+        return ring
+
+    def test_keeps_last_sweeps(self):
+        # 3 sweeps of 3 segments and part of a fourth, in a 2 sweep ring
+        src_data = np.arange(100 * 3 * 3 + 50).astype(np.complex64)
+        ring = self.record(src_data, 100, [1e9, 2e9, 3e9], 2)
+        self.assertEqual(ring.complete_sweeps(), 3)
+        self.assertEqual(list(ring.sweep_segments()), [6, 7, 8])
+        # segment 3 was overwritten by the sweep in progress
+        self.assertEqual(list(ring.sweep_segments(2)), [4, 5, 6, 7, 8])
+        self.assertEqual(list(ring.sweep_segments(1, (1.5e9, 3e9))), [7, 8])
+
+    def test_export(self):
+        src_data = np.arange(100 * 3 * 3 + 50).astype(np.complex64)
+        ring = self.record(src_data, 100, [1e9, 2e9, 3e9], 2)
+        base = os.path.join(self.dir, "sweep")
+        self.assertEqual(ring.export(base), 3)
+
+        data = np.fromfile(base + ".sigmf-data", dtype=np.complex64)
+        self.assertComplexTuplesAlmostEqual(src_data[600:900], data)
+        with open(base + ".sigmf-meta") as f:
+            captures = json.load(f)["captures"]
+        self.assertEqual([c["core:sample_start"] for c in captures],
+                         [0, 100, 200])
+        self.assertEqual([c["core:frequency"] for c in captures],
+                         [1e9, 2e9, 3e9])
+
+    def test_no_complete_sweep(self):
+        ring = self.record(np.zeros(250, dtype=np.complex64), 100,
+                           [1e9, 2e9, 3e9], 1)
+        self.assertFalse(ring.has_data())
+        self.assertEqual(len(ring.sweep_segments()), 0)
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_iq_ring_sink_c, "qa_iq_ring_sink_c.xml")
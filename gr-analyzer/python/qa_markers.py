@@ -0,0 +1,32 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+import numpy as np
+
+from gnuradio import gr_unittest
+
+import qa_fixtures
+
+from markers import marker_set, PEAK
+
+class qa_markers(gr_unittest.TestCase):
+    def test_peak_partial_trace(self):
+        markers = marker_set()
+        id_ = markers.add(PEAK, 0)
+
+        # a progressive trace with only its first segment swept
+        y = np.array([-90, -40, -80, np.nan, np.nan, np.nan], np.float32)
+        readings = markers.read(y)
+        self.assertEqual(markers.bin_of(id_), 1)
+        self.assertEqual(readings.powers[0], -40)
+
+        # a window not swept yet keeps the peak found before
+        window = markers.add(PEAK, 4, window=(3, 6))
+        markers.move(window, 4)
+        readings = markers.read(y)
+        self.assertEqual(markers.bin_of(window), 4)
+        self.assertEqual(markers.bin_of(id_), 1)
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_markers, "qa_markers.xml")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from gnuradio import gr_unittest
+
+import qa_fixtures
+
+import matfile
+from cli_parser import init_parser
+from configuration import configuration
+
+try:
+    import h5py
+except ImportError:
+    h5py = None
+
+def complex_of(data):
+    """The complex values of a dataset in MATLAB's (real, imag) layout."""
+    return data['real'] + 1j * data['imag']
+
+def chars_of(data):
+    return "".join(chr(c) for c in data[:, 0])
+
+@unittest.skipIf(h5py is None, "MATLAB export needs h5py")
+class qa_matfile(gr_unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "export.mat")
+        args = init_parser().parse_args(["100M", "-F", "256",
+                                         "--nframes", "2"])
+        self.cfg = configuration(args)
+        self.block_bytes = matfile.BLOCK_BYTES
+
+    def tearDown(self):
+        matfile.BLOCK_BYTES = self.block_bytes
+        shutil.rmtree(self.dir)
+
+    def test_header(self):
+        matfile.save_config(self.path, self.cfg)
+        with open(self.path, 'rb') as f:
+            header = f.read(matfile.USERBLOCK_SIZE)
+        self.assertTrue(header.startswith("MATLAB 7.3 MAT-file"))
+        self.assertIn("HDF5 schema 1.00 .", header[:116])
+        # version 0x0200 and the endian indicator, after 8 bytes of no
+        # subsystem data
+        self.assertEqual(header[116:128], "\0" * 8 + "\0\x02IM")
+
+        with h5py.File(self.path, 'r') as f:
+            self.assertEqual(f.userblock_size, matfile.USERBLOCK_SIZE)
+
+    def test_config(self):
+        matfile.save_config(self.path, self.cfg)
+        with h5py.File(self.path, 'r') as f:
+            config = f['config']
+            self.assertEqual(config.attrs['MATLAB_class'], "struct")
+            self.assertEqual(sorted(config.keys()),
+                             sorted(matfile.config_fields(self.cfg)))
+            self.assertEqual(config['fft_size'][0, 0], 256)
+            self.assertEqual(config['nframes'][0, 0], 2)
+            self.assertEqual(chars_of(config['detector']),
+                             self.cfg.detector.name)
+            self.assertEqual(config['detector'].attrs['MATLAB_class'],
+                             "char")
+            self.assertEqual(config['continuous_run'].attrs['MATLAB_class'],
+                             "logical")
+            # a vector is one row, which MATLAB loads as a column
+            self.assertEqual(config['center_freqs'].shape,
+                             (1, len(self.cfg.center_freqs)))
+
+    def test_time_data(self):
+        nsegments, segment_len = 10, 16
+        samples = (np.random.randn(nsegments * segment_len + 5) +
+                   1j * np.random.randn(nsegments * segment_len + 5))
+        samples = samples.astype(np.complex64)
+        center_freqs = 100e6 + np.arange(nsegments) * 1e6
+        # blocks of 3 segments, and a last one of 1
+        matfile.BLOCK_BYTES = 3 * segment_len * samples.itemsize
+        blocks = list(matfile.segment_blocks(center_freqs, samples,
+                                             segment_len))
+        self.assertEqual([len(b) for _, b in blocks], [3, 3, 3, 1])
+
+        self.assertEqual(matfile.save_time_data(self.path, self.cfg,
+                                                iter(blocks)), nsegments)
+        with h5py.File(self.path, 'r') as f:
+            time_data = f['time_data']
+            self.assertEqual(time_data['samples'].attrs['MATLAB_class'],
+                             "single")
+            # the partial segment at the end is left out
+            self.assertTrue(np.array_equal(
+                complex_of(time_data['samples'][:]),
+                samples[:nsegments * segment_len].reshape(nsegments, -1)))
+            self.assertTrue(np.array_equal(
+                time_data['center_frequency'][:, 0], center_freqs))
+            self.assertIn('config', f)
+
+    def test_fft_data(self):
+        cfg = self.cfg
+        nsegments = 2 * len(cfg.center_freqs)
+        vectors = (np.random.randn(nsegments * cfg.nframes, cfg.fft_size) +
+                   1j * np.random.randn(nsegments * cfg.nframes,
+                                        cfg.fft_size)).astype(np.complex64)
+
+        self.assertEqual(matfile.save_fft_data(self.path, cfg, vectors),
+                         nsegments)
+        nbins = cfg.bin_stop - cfg.bin_start
+        with h5py.File(self.path, 'r') as f:
+            fft_data = f['fft_data']
+            samples = complex_of(fft_data['samples'][:])
+            freqs = fft_data['bin_frequency'][:, 0]
+        self.assertEqual(samples.shape, (nsegments * nbins, cfg.nframes))
+        for segment in xrange(nsegments):
+            frames = vectors[segment * cfg.nframes:
+                             (segment + 1) * cfg.nframes,
+                             cfg.bin_start:cfg.bin_stop]
+            rows = slice(segment * nbins, (segment + 1) * nbins)
+            self.assertTrue(np.array_equal(samples[rows], frames.T))
+            fc = cfg.center_freqs[segment % len(cfg.center_freqs)]
+            offsets = (np.arange(cfg.bin_start, cfg.bin_stop) -
+                       cfg.fft_size // 2) * cfg.deltaf
+            self.assertTrue(np.allclose(freqs[rows], fc + offsets))
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_matfile, "qa_matfile.xml")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from gnuradio import gr_unittest
+
+import qa_fixtures
+
+from raster import draw_diamonds, draw_spans, trace_spans
+
+RED = (255, 0, 0)
+
+class qa_raster(gr_unittest.TestCase):
+    def painted(self, img):
+        """Which pixels of img are painted, as a (rows, cols) 0/1 array."""
+        return img.any(axis=2).astype(int)
+
+    def test_spans_of_a_line(self):
+        # fewer points than columns: each column spans its edge crossings,
+        # one row per column down a 45 degree line
+        top, bottom = trace_spans(np.array([0., 10.]), np.array([0., 10.]),
+                                  (0, 10), (0, 10), 10, 10)
+        self.assertTrue(np.array_equal(top, 8 - np.arange(10)))
+        self.assertTrue(np.array_equal(bottom, 9 - np.arange(10)))
+
+    def test_spans_of_points_in_a_column(self):
+        # more points than columns: the column spans all of them
+        top, bottom = trace_spans(np.array([0.2, 0.5, 0.8]),
+                                  np.array([1., 7., 3.]),
+                                  (0, 1), (0, 10), 1, 10)
+        self.assertEqual((top[0], bottom[0]), (2, 8))
+
+    def test_spans_outside_the_line(self):
+        top, bottom = trace_spans(np.array([4.5, 10.]), np.array([5., 5.]),
+                                  (0, 10), (0, 10), 10, 10)
+        self.assertTrue(np.isnan(top[:4]).all())
+        self.assertTrue(np.isnan(bottom[:4]).all())
+        self.assertTrue(np.array_equal(top[4:], np.full(6, 4)))
+
+        top, bottom = trace_spans(np.array([]), np.array([]),
+                                  (0, 10), (0, 10), 10, 10)
+        self.assertTrue(np.isnan(top).all())
+
+    def test_draw_spans(self):
+        img = np.zeros((5, 3, 3), dtype=np.uint8)
+        draw_spans(img, np.array([1, np.nan, 0.5]),
+                   np.array([2, np.nan, 3.2]), RED)
+        self.assertTrue(np.array_equal(self.painted(img),
+                                       [[0, 0, 1],
+                                        [1, 0, 1],
+                                        [1, 0, 1],
+                                        [0, 0, 1],
+                                        [0, 0, 1]]))
+        self.assertTrue(np.array_equal(img[1, 0], RED))
+
+    def test_draw_diamonds(self):
+        img = np.zeros((5, 6, 3), dtype=np.uint8)
+        # one rounded to (2, 3), one clipped by the top left corner
+        draw_diamonds(img, [1.6, 0], [3.4, 0], 1, RED)
+        self.assertTrue(np.array_equal(self.painted(img),
+                                       [[1, 1, 0, 0, 0, 0],
+                                        [1, 0, 0, 1, 0, 0],
+                                        [0, 0, 1, 1, 1, 0],
+                                        [0, 0, 0, 1, 0, 0],
+                                        [0, 0, 0, 0, 0, 0]]))
+        self.assertTrue(np.array_equal(img[2, 3], RED))
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_raster, "qa_raster.xml")
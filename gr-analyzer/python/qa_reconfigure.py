@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from gnuradio import gr_unittest
+from sigmf_sink_c import sigmf_capture, write_sigmf_meta
+
+import qa_fixtures
+
+from cli_parser import init_parser
+from configuration import configuration
+from gr_analyzer import top_block
+from sinks import callback_sink
+
+class qa_reconfigure(gr_unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        # a recording of one segment at 100 MHz stands in for the USRP
+        self.recording = os.path.join(self.dir, "recording")
+        np.zeros(4096, dtype=np.complex64).tofile(
+            self.recording + ".sigmf-data")
+        write_sigmf_meta(self.recording + ".sigmf-meta", 1e6,
+                         [sigmf_capture(0, 100e6, 0)])
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def top_block(self, *args):
+        args = init_parser().parse_args([
+            "100M", "--replay", self.recording, "--continuous",
+            "--headless", "-F", "256", "--nframes", "2",
+            "--presets-file", os.path.join(self.dir, "presets.json")] +
+            list(args))
+        return top_block(configuration(args),
+                         sink=callback_sink(lambda points, info: None))
+
+    def edit(self, tb, nedits):
+        for i in xrange(nedits):
+            tb.pending_cfg.nframes = 3 + i
+            tb.reconfigure(redraw_plot=(i == 1))
+
+    def assertCommitted(self, tb, ncommits):
+        self.assertEqual(tb.stats['reconfigure_commits'], ncommits)
+        self.assertEqual(tb.rebuild_flowgraph, ncommits > 0)
+        self.assertEqual(tb.ctrl.get_exit_after_complete(), ncommits > 0)
+
+    def test_edits_within_delay(self):
+        tb = self.top_block("--reconfigure-delay", "0.1")
+        self.edit(tb, 5)
+        self.assertEqual(tb.stats['reconfigure_requests'], 5)
+        self.assertCommitted(tb, 0)
+
+        # each edit restarts the delay, so only the last one's timer fires
+        tb.reconfigure_timer.join(5)
+        self.assertCommitted(tb, 1)
+        self.assertTrue(tb.sink.redraw_plot.is_set())
+
+        tb.configure()
+        self.assertEqual(tb.stats['rebuilds'], 1)
+        self.assertEqual(tb.cfg.nframes, 7)
+        self.assertFalse(tb.rebuild_flowgraph)
+
+    def test_manual_apply(self):
+        tb = self.top_block("--reconfigure-delay", "0", "--manual-apply")
+        self.edit(tb, 3)
+        self.assertIsNone(tb.reconfigure_timer)
+        self.assertCommitted(tb, 0)
+        self.assertFalse(tb.sink.redraw_plot.is_set())
+
+        tb.apply_reconfigure()
+        self.assertCommitted(tb, 1)
+        self.assertTrue(tb.sink.redraw_plot.is_set())
+
+        # nothing left to apply
+        tb.apply_reconfigure()
+        self.assertEqual(tb.stats['reconfigure_commits'], 1)
+        self.assertEqual(tb.stats['reconfigure_requests'], 3)
+
+    def test_no_delay(self):
+        tb = self.top_block("--reconfigure-delay", "0")
+        self.edit(tb, 3)
+        self.assertEqual(tb.stats['reconfigure_requests'], 3)
+        self.assertCommitted(tb, 3)
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_reconfigure, "qa_reconfigure.xml")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+import pmt
+from gnuradio import gr, gr_unittest
+from gnuradio import blocks
+from sigmf_sink_c import sigmf_capture, write_sigmf_meta
+from replay_source_c import replay_source_c, recorded_segments
+
+class qa_replay_source_c(gr_unittest.TestCase):
+    def setUp(self):
+        self.tb = gr.top_block()
+        self.dir = tempfile.mkdtemp()
+        self.base = os.path.join(self.dir, "recording")
+
+    def tearDown(self):
+        self.tb = None
+        shutil.rmtree(self.dir)
+
+    def write_recording(self, data, segment_len, center_freqs):
+        np.asarray(data, dtype=np.complex64).tofile(
+            self.base + ".sigmf-data")
+        captures = []
+        for start in xrange(0, len(data), segment_len):
+            freq = center_freqs[start // segment_len % len(center_freqs)]
+            captures.append(sigmf_capture(start, freq, 0, gain=10.0))
+        write_sigmf_meta(self.base + ".sigmf-meta", 1e6, captures)
+
+    def replay(self, center_freqs, ncopy, tuned=None):
+        callback = None
+        if tuned is not None:
+            callback = lambda freq, gain: tuned.append(freq)
+        src = replay_source_c(self.base, center_freqs, ncopy, callback)
+        src.set_exit_after_complete()
+        sink = blocks.vector_sink_c()
+        self.tb.connect(src, sink)
+        self.tb.run()
+        return src, sink
+
+    def test_recorded_segments(self):
+        self.write_recording(np.zeros(250), 100, [1e9, 2e9, 3e9])
+        sample_rate, segments = recorded_segments(self.base)
+        self.assertEqual(sample_rate, 1e6)
+        self.assertEqual([s['length'] for s in segments], [100, 100, 50])
+        self.assertEqual(segments[1]['frequency'], 2e9)
+        self.assertEqual(segments[1]['gain'], 10.0)
+
+    def test_one_sweep(self):
+        # segments of 100 samples, replayed 60 at a time
+        data = np.arange(300)
+        self.write_recording(data, 100, [1e9, 2e9, 3e9])
+        tuned = []
+        src, sink = self.replay([1e9, 2e9, 3e9], 60, tuned)
+
+        expected = np.concatenate([data[0:60], data[100:160], data[200:260]])
+        self.assertComplexTuplesAlmostEqual(sink.data(), expected)
+        self.assertEqual(tuned, [1e9, 2e9, 3e9])
+
+        tags = sink.tags()
+        self.assertEqual([tag.offset for tag in tags], [0, 60, 120])
+        self.assertEqual([pmt.to_python(tag.value) for tag in tags],
+                         [1e9, 2e9, 3e9])
+
+    def test_nearest_and_next_sweep(self):
+        # two recorded sweeps, replayed from a slightly different tuning
+        data = np.arange(400)
+        self.write_recording(data, 100, [1e9, 2e9])
+        src, sink = self.replay([1e9 + 10, 2e9 - 10], 100)
+        self.assertComplexTuplesAlmostEqual(sink.data(), data[:200])
+
+        # the next run replays the second sweep
+        sink.reset()
+        self.tb.run()
+        self.assertComplexTuplesAlmostEqual(sink.data(), data[200:])
+
+    def test_short_segments(self):
+        self.write_recording(np.zeros(200), 100, [1e9, 2e9])
+        self.assertRaises(ValueError, replay_source_c,
+                          self.base, [1e9, 2e9], 101)
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_replay_source_c, "qa_replay_source_c.xml")
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from gnuradio import gr_unittest
+
+import qa_fixtures
+
+from ringbuffer import trace_ring
+
+class qa_ringbuffer(gr_unittest.TestCase):
+    def rows(self, first, stop, width):
+        return np.repeat(np.arange(first, stop, dtype=np.float32),
+                         width).reshape(-1, width)
+
+    def test_fill(self):
+        ring = trace_ring(4, 3)
+        self.assertTrue(np.isnan(ring.view()).all())
+
+        for row in self.rows(0, 2, 3):
+            ring.push(row)
+        view = ring.view()
+        self.assertEqual(view.shape, (4, 3))
+        # empty rows are oldest
+        self.assertTrue(np.isnan(view[:2]).all())
+        self.assertTrue(np.array_equal(view[2:], self.rows(0, 2, 3)))
+
+    def test_wraparound(self):
+        ring = trace_ring(4, 3)
+        for n in xrange(1, 11):
+            ring.push(self.rows(n - 1, n, 3)[0])
+            if n >= 4:
+                self.assertTrue(np.array_equal(ring.view(),
+                                               self.rows(n - 4, n, 3)))
+
+    def test_view_is_not_a_copy(self):
+        ring = trace_ring(4, 3)
+        for row in self.rows(0, 6, 3):
+            ring.push(row)
+            view = ring.view()
+            self.assertTrue(view.base is ring.buf)
+            self.assertTrue(view.flags['C_CONTIGUOUS'])
+
+    def test_clear(self):
+        ring = trace_ring(4, 3)
+        for row in self.rows(0, 5, 3):
+            ring.push(row)
+        ring.clear()
+        self.assertTrue(np.isnan(ring.view()).all())
+        ring.push(self.rows(7, 8, 3)[0])
+        self.assertTrue(np.array_equal(ring.view()[-1], [7, 7, 7]))
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_ringbuffer, "qa_ringbuffer.xml")
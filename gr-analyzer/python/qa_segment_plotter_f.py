@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import threading
+
+import numpy as np
+
+from gnuradio import gr, gr_unittest
+from gnuradio import blocks
+import analyzer_swig as analyzer
+from segment_plotter_f import segment_plotter_f
+
+class recording_sink(object):
+    def __init__(self):
+        self.redraw_plot = threading.Event()
+        self.segments = []
+        self.traces = []
+        self.segment_infos = []
+        self.infos = []
+
+    def update_segment(self, offset, points, info):
+        self.segments.append((offset, np.array(points)))
+        self.segment_infos.append(info)
+        return True
+
+    def update(self, points, info):
+        self.traces.append(np.array(points))
+        self.infos.append(info)
+        return True
+
+class qa_segment_plotter_f(gr_unittest.TestCase):
+    def setUp(self):
+        self.tb = gr.top_block()
+
+    def tearDown(self):
+        self.tb = None
+
+    def run_segments(self, src_data, fft_size, n_segments, overlap, max_bin,
+                     generation=0):
+        sink = recording_sink()
+        src = blocks.vector_source_f(src_data)
+        s2v = blocks.stream_to_vector(gr.sizeof_float, fft_size)
+        plot = segment_plotter_f(sink, fft_size, n_segments, overlap, max_bin)
+        plot.set_generation(generation)
+        self.tb.connect(src, s2v, plot)
+        self.tb.run()
+        return sink
+
+    def test_segments(self):
+        overlap = 0.25
+        fft_size = 32
+        n_segments = 3
+        src_data = np.arange(fft_size * n_segments)
+        sink = self.run_segments(src_data, fft_size, n_segments, overlap, 72)
+        self.assertTrue(sink.redraw_plot.is_set())
+        self.assertEqual([offset for offset, _ in sink.segments], [0, 24, 48])
+        for n, (offset, points) in enumerate(sink.segments):
+            start = n * fft_size + 4
+            self.assertFloatTuplesAlmostEqual(np.arange(start, start + 24),
+                                              points, 6)
+        self.assertEqual(len(sink.traces), 1)
+
+    def test_matches_stitch(self):
+        overlap = 0.25
+        fft_size = 512
+        n_segments = 4
+        max_bin = 1000
+        src_data = np.random.uniform(-100, 0, fft_size * n_segments * 2)
+        sink = self.run_segments(src_data, fft_size, n_segments, overlap,
+                                 max_bin)
+
+        stitched = blocks.vector_sink_f(384 * n_segments)
+        src = blocks.vector_source_f(src_data)
+        s2v = blocks.stream_to_vector(gr.sizeof_float, fft_size * n_segments)
+        stitch = analyzer.stitch_fft_segments_ff(fft_size, n_segments, overlap)
+        tb = gr.top_block()
+        tb.connect(src, s2v, stitch, stitched)
+        tb.run()
+        expected = np.reshape(stitched.data(), (2, -1))[:, :max_bin]
+
+        self.assertEqual(len(sink.traces), 2)
+        for trace, expected_trace in zip(sink.traces, expected):
+            self.assertFloatTuplesAlmostEqual(expected_trace, trace, 4)
+
+    def test_crop(self):
+        overlap = 0.25
+        fft_size = 32
+        n_segments = 3
+        src_data = np.arange(fft_size * n_segments)
+        sink = self.run_segments(src_data, fft_size, n_segments, overlap, 30)
+        # the third segment is beyond max_bin, the second is cropped
+        self.assertEqual([offset for offset, _ in sink.segments], [0, 24])
+        self.assertEqual(len(sink.segments[1][1]), 6)
+        self.assertEqual(len(sink.traces[0]), 30)
+
+    def test_sweep_info(self):
+        overlap = 0.25
+        fft_size = 32
+        n_segments = 3
+        src_data = np.arange(fft_size * n_segments * 3)
+        sink = self.run_segments(src_data, fft_size, n_segments, overlap, 72,
+                                 generation=7)
+        self.assertEqual([info.seq for info in sink.infos], [0, 1, 2])
+        self.assertEqual(set(info.generation for info in sink.infos), set([7]))
+        for info in sink.infos:
+            self.assertTrue(info.start_time <= info.end_time)
+        # segments carry the info of the sweep they belong to, unfinished
+        self.assertEqual([info.seq for info in sink.segment_infos],
+                         [0, 0, 0, 1, 1, 1, 2, 2, 2])
+        for info in sink.segment_infos:
+            self.assertEqual(info.end_time, None)
+        self.assertEqual(sink.segment_infos[3].start_time,
+                         sink.infos[1].start_time)
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_segment_plotter_f, "qa_segment_plotter_f.xml")
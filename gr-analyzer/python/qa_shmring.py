@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from gnuradio import gr_unittest
+from sweep_counter import trace_info
+
+import qa_fixtures
+
+import shmring
+from shmring import shared_trace_ring
+
+class tearing_data(object):
+    """Stands in for a reader's data, calling tear as the first slot is
+    copied."""
+    def __init__(self, data, tear):
+        self.data = data
+        self.tear = tear
+
+    def __getitem__(self, key):
+        if self.tear is not None:
+            self.tear()
+            self.tear = None
+        return self.data[key]
+
+class qa_shmring(gr_unittest.TestCase):
+    def setUp(self):
+        self.writer = shared_trace_ring.create(4, 16)
+        # the reader maps the same file, as the gui process does
+        self.reader = shared_trace_ring(self.writer.path, 4, 16)
+
+    def tearDown(self):
+        self.reader.close()
+        self.writer.close(unlink=True)
+
+    def write(self, first, stop):
+        for sweep in xrange(first, stop):
+            info = trace_info(1, sweep, 100.0 + sweep, 100.5 + sweep)
+            self.writer.write(np.full(8, sweep, dtype=np.float32), info,
+                              redraw=(sweep == 0))
+
+    def read(self, last_seq):
+        return [seq for seq, _, _, _, _ in self.reader.read_since(last_seq)]
+
+    def test_round_trip(self):
+        self.write(0, 2)
+        self.writer.write(np.arange(3, dtype=np.float32),
+                          trace_info(2, 0, 200.0, None), False, partial=True)
+        traces = list(self.reader.read_since(0))
+        self.assertEqual([t[0] for t in traces], [1, 2, 3])
+
+        seq, info, redraw, partial, points = traces[0]
+        self.assertEqual(info, (1, 0, 100.0, 100.5))
+        self.assertTrue(redraw)
+        self.assertFalse(partial)
+        self.assertTrue(np.array_equal(points, np.zeros(8)))
+
+        seq, info, redraw, partial, points = traces[2]
+        self.assertEqual(info, (2, 0, 200.0, None))
+        self.assertFalse(redraw)
+        self.assertTrue(partial)
+        self.assertTrue(np.array_equal(points, np.arange(3)))
+
+        self.assertEqual(self.read(3), [])
+
+    def test_wraparound(self):
+        self.write(0, 10)
+        # only the last 4 are left
+        self.assertEqual(self.read(0), [7, 8, 9, 10])
+        self.assertEqual(self.read(8), [9, 10])
+        for seq, info, _, _, points in self.reader.read_since(6):
+            self.assertEqual(info[1], seq - 1)
+            self.assertTrue(np.array_equal(points, np.full(8, seq - 1)))
+
+    def test_overwritten_while_reading(self):
+        self.write(0, 6)
+        traces = self.reader.read_since(0)
+        self.assertEqual(next(traces)[0], 3)
+        # seqs 7 and 8 take the slots of 3 and 4 before 4 is read
+        self.write(6, 8)
+        self.assertEqual([t[0] for t in traces], [5, 6])
+        self.assertEqual(self.read(6), [7, 8])
+
+    def test_torn_slot(self):
+        self.write(0, 4)
+        # the writer is part way through overwriting seq 2's slot
+        self.writer.meta[2 % 4][shmring._SEQ] = 0
+        self.assertEqual(self.read(0), [1, 3, 4])
+
+    def test_torn_while_copying(self):
+        self.write(0, 4)
+        # seq 5 overwrites seq 1's slot as it is being copied
+        self.reader.data = tearing_data(self.reader.data,
+                                        lambda: self.write(4, 5))
+        traces = list(self.reader.read_since(0))
+        self.assertEqual([t[0] for t in traces], [2, 3, 4])
+        for seq, info, _, _, points in traces:
+            self.assertTrue(np.array_equal(points, np.full(8, seq - 1)))
+
+    def test_run_state(self):
+        self.writer.set_run_state(False, True)
+        self.assertEqual(self.reader.run_state(), (False, True))
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_shmring, "qa_shmring.xml")
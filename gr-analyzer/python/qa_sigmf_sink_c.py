@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import shutil
+import tempfile
+
+import numpy as np
+
+from gnuradio import gr, gr_unittest
+from gnuradio import blocks
+from sigmf_sink_c import sigmf_sink_c
+
+class qa_sigmf_sink_c(gr_unittest.TestCase):
+    def setUp(self):
+        self.tb = gr.top_block()
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.tb = None
+        shutil.rmtree(self.dir)
+
+    def record(self, src_data, segment_len, center_freqs):
+        src = blocks.vector_source_c(src_data)
+        sink = sigmf_sink_c(1e6, segment_len, center_freqs,
+                            get_gain=lambda: 10.0, spool_dir=self.dir)
+        self.tb.connect(src, sink)
+        self.tb.run()
+        return sink
+
+    def test_export(self):
+        src_data = (np.arange(3000) * (1 + 1j)).astype(np.complex64)
+        sink = self.record(src_data, 1000, [1e9, 2e9, 3e9])
+        self.assertTrue(sink.has_data())
+
+        base = os.path.join(self.dir, "recording")
+        self.assertTrue(sink.export(base))
+        self.assertFalse(sink.has_data())
+        self.assertFalse(sink.export(base))
+
+        data = np.fromfile(base + ".sigmf-data", dtype=np.complex64)
+        self.assertComplexTuplesAlmostEqual(src_data, data)
+
+        with open(base + ".sigmf-meta") as f:
+            meta = json.load(f)
+        self.assertEqual(meta["global"]["core:datatype"], "cf32_le")
+        self.assertEqual(meta["global"]["core:sample_rate"], 1e6)
+        captures = meta["captures"]
+        self.assertEqual([c["core:sample_start"] for c in captures],
+                         [0, 1000, 2000])
+        self.assertEqual([c["core:frequency"] for c in captures],
+                         [1e9, 2e9, 3e9])
+        self.assertEqual(captures[0]["analyzer:gain"], 10.0)
+
+    def test_sweeps_wrap(self):
+        src_data = np.zeros(5 * 100 + 50, dtype=np.complex64)
+        sink = self.record(src_data, 100, [1e9, 2e9])
+        freqs = [c["core:frequency"] for c in sink.captures]
+        self.assertEqual(freqs, [1e9, 2e9, 1e9, 2e9, 1e9, 2e9])
+
+    def test_reset(self):
+        sink = self.record(np.zeros(100, dtype=np.complex64), 10, [1e9])
+        path = sink.path
+        self.assertTrue(os.path.exists(path))
+        sink.reset()
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(sink.has_data())
+        self.assertEqual(sink.captures, [])
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_sigmf_sink_c, "qa_sigmf_sink_c.xml")
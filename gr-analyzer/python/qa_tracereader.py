@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import shutil
+import argparse
+import tempfile
+from collections import namedtuple
+
+import numpy as np
+
+from gnuradio import gr_unittest
+
+import qa_fixtures
+
+from archive import archive_writer
+from sinks import RECORD_HEADER, pack_record_header
+from tracestore import TILES_FILE, store_writer
+from tracereader import (archive_blocks, iter_blocks, open_traces,
+                         parse_time, read_traces, record_reader,
+                         store_reader, trace_block)
+
+cfg = namedtuple('cfg', 'min_freq deltaf')
+info = namedtuple('info', 'generation seq start_time end_time')
+
+class qa_tracereader(gr_unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write_store(self):
+        path = os.path.join(self.dir, "store")
+        chunks = [((1e6, 1e3), qa_fixtures.traces(10, 0)),
+                  ((2e6, 1e3), qa_fixtures.traces(10, 10))]
+        writer = store_writer(path)
+        for axis, (traces, meta) in chunks:
+            writer.append(axis, traces, meta)
+        writer.close()
+        return path, chunks
+
+    def write_archive(self):
+        path = os.path.join(self.dir, "archive")
+        blocks = [((1e6, 1e3), qa_fixtures.traces(10, 0, decimals=1)),
+                  ((2e6, 1e3), qa_fixtures.traces(10, 10, decimals=1)),
+                  ((3e6, 1e3), qa_fixtures.traces(10, 20, decimals=1))]
+        writer = archive_writer(path)
+        for axis, (traces, meta) in blocks:
+            writer.append(axis, traces, meta)
+        writer.close()
+        return path, blocks
+
+    def write_records(self, f, axis, traces, meta):
+        for points, m in zip(traces, meta):
+            f.write(pack_record_header(len(points), info(*m), cfg(*axis)))
+            f.write(points.astype('<f4').tostring())
+
+    def assertBlocks(self, blocks, expected, atol=0):
+        self.assertEqual(len(blocks), len(expected))
+        for block, (axis, (traces, meta)) in zip(blocks, expected):
+            self.assertEqual(block.axis, axis)
+            self.assertTrue(np.allclose(block.traces, traces, atol=atol))
+            for field in meta.dtype.names:
+                self.assertTrue(np.array_equal(block.meta[field],
+                                               meta[field]))
+
+    def test_store(self):
+        path, chunks = self.write_store()
+        reader = open_traces(path)
+        self.assertIsInstance(reader, store_reader)
+        self.assertBlocks(list(reader.blocks()), chunks)
+        # memory mapped, not read
+        self.assertIsInstance(list(reader.blocks())[0].traces, np.memmap)
+
+    def test_store_tiles(self):
+        path, chunks = self.write_store()
+        blocks = read_traces(path, freq_range=(2e6, 2.05e6))
+        self.assertEqual([(b.axis, b.traces.shape) for b in blocks],
+                         [((2e6, 1e3), (10, 51))])
+        blocks = read_traces(path, time_range=(0, 5))
+        self.assertEqual([(b.axis, b.traces.shape) for b in blocks],
+                         [((1e6, 1e3), (6, 100))])
+
+        # a chunk the tiles rule out is never opened
+        reader = store_reader(path)
+        os.remove(os.path.join(path, reader.entries[0]['data']))
+        self.assertEqual(len(read_traces(path, freq_range=(2e6, 2.05e6))), 1)
+
+    def test_store_chunk_without_tiles(self):
+        path, chunks = self.write_store()
+        # the second chunk's tiles lost: it's read, and cut down to nothing
+        # by the ranges
+        tiles = os.path.join(path, TILES_FILE)
+        with open(tiles, 'r+b') as f:
+            f.truncate(os.path.getsize(tiles) // 2)
+        blocks = read_traces(path, freq_range=(2e6, 2.05e6))
+        self.assertEqual([(b.axis, b.traces.shape) for b in blocks],
+                         [((2e6, 1e3), (10, 51))])
+        blocks = read_traces(path, freq_range=(1e6, 1.05e6))
+        self.assertEqual([(b.axis, b.traces.shape) for b in blocks],
+                         [((1e6, 1e3), (10, 51))])
+
+    def test_archive(self):
+        path, expected = self.write_archive()
+        reader = open_traces(path)
+        self.assertIsInstance(reader, archive_blocks)
+        self.assertBlocks(list(reader.blocks()), expected, atol=0.051)
+
+        # only the blocks the tiles say overlap are decoded
+        decoded = []
+        read = reader.reader.read
+        reader.reader.read = lambda i: decoded.append(i) or read(i)
+        blocks = list(reader.blocks(freq_range=(2e6, 2.05e6),
+                                    time_range=(12, 25)))
+        self.assertEqual(decoded, [1])
+        self.assertEqual([(b.axis, b.traces.shape) for b in blocks],
+                         [((2e6, 1e3), (8, 51))])
+        reader.close()
+
+    def test_records(self):
+        path = os.path.join(self.dir, "records")
+        # a change of axis at the same length, a change of length, then a
+        # record cut short
+        runs = [((1e6, 1e3), qa_fixtures.traces(3, 0)),
+                ((2e6, 1e3), qa_fixtures.traces(2, 3)),
+                ((2e6, 1e3), qa_fixtures.traces(4, 5, nbins=50))]
+        with open(path, 'wb') as f:
+            for axis, (traces, meta) in runs:
+                self.write_records(f, axis, traces, meta)
+            self.write_records(f, (2e6, 1e3), *qa_fixtures.traces(1, 9,
+                                                                  nbins=50))
+            f.truncate(f.tell() - 10)
+
+        reader = open_traces(path)
+        self.assertIsInstance(reader, record_reader)
+        record_size = RECORD_HEADER.size + 4 * 100
+        self.assertEqual(reader.runs,
+                         [(0, 3, 100, 1e6, 1e3),
+                          (3 * record_size, 2, 100, 2e6, 1e3),
+                          (5 * record_size, 4, 50, 2e6, 1e3)])
+        self.assertBlocks(list(reader.blocks()), runs)
+
+        blocks = list(reader.blocks(freq_range=(2.01e6, 2.06e6),
+                                    time_range=(4, 6)))
+        self.assertEqual([(b.axis, b.start_time, b.traces.shape)
+                          for b in blocks],
+                         [((2.01e6, 1e3), 4, (1, 51)),
+                          ((2.01e6, 1e3), 5, (2, 40))])
+        reader.close()
+
+    def test_records_cut_short(self):
+        path = os.path.join(self.dir, "records")
+        open(path, 'wb').close()
+        self.assertEqual(read_traces(path), [])
+
+        # not even a whole header
+        with open(path, 'wb') as f:
+            self.write_records(f, (1e6, 1e3), *qa_fixtures.traces(2, 0))
+            f.write(b"\0" * (RECORD_HEADER.size - 1))
+        self.assertEqual(record_reader(path).runs,
+                         [(0, 2, 100, 1e6, 1e3)])
+
+    def test_select(self):
+        traces, meta = qa_fixtures.traces(10, 0)
+        block = trace_block((1e6, 1e3), traces, meta)
+
+        def bins(freq_range):
+            selected = block.select(freq_range=freq_range)
+            if selected is None:
+                return None
+            first = int(round((selected.axis[0] - 1e6) / 1e3))
+            self.assertTrue(np.array_equal(
+                selected.traces,
+                traces[:, first:first + selected.traces.shape[1]]))
+            return first, selected.traces.shape[1]
+
+        # edges on bins are included, edges between bins round inwards
+        self.assertEqual(bins((1.01e6, 1.02e6)), (10, 11))
+        self.assertEqual(bins((1.0105e6, 1.0195e6)), (11, 9))
+        self.assertEqual(bins((0, 5e6)), (0, 100))
+        self.assertEqual(bins((1.099e6, 5e6)), (99, 1))
+        self.assertIsNone(bins((1.0101e6, 1.0109e6)))
+        self.assertIsNone(bins((2e6, 3e6)))
+
+        def rows(time_range):
+            selected = block.select(time_range=time_range)
+            if selected is None:
+                return None
+            return selected.meta['seq'].tolist()
+
+        # sweeps 0.5 s long, a second apart: a sweep ending as the range
+        # starts, or starting as it ends, is in it
+        self.assertEqual(rows((2.5, 4)), [2, 3, 4])
+        self.assertEqual(rows((2.6, 4.4)), [3, 4])
+        self.assertEqual(rows((-10, 100)), range(10))
+        self.assertIsNone(rows((2.6, 2.9)))
+        self.assertIsNone(rows((9.6, 100)))
+
+        selected = block.select((1.01e6, 1.02e6), (2.5, 4))
+        self.assertTrue(np.may_share_memory(selected.traces, traces))
+        self.assertEqual((selected.start_time, selected.end_time), (2, 4.5))
+
+    def test_open_traces(self):
+        path = os.path.join(self.dir, "empty")
+        os.mkdir(path)
+        self.assertRaises(ValueError, open_traces, path)
+
+        store, chunks = self.write_store()
+        archive, blocks = self.write_archive()
+        self.assertEqual(len(list(iter_blocks(store))), 2)
+        self.assertEqual(len(list(iter_blocks([store, archive]))), 5)
+
+    def test_parse_time(self):
+        self.assertEqual(parse_time("1700000000.5"), 1700000000.5)
+        local = time.mktime((2024, 5, 1, 12, 30, 15, 0, 0, -1))
+        self.assertEqual(parse_time("2024-05-01T12:30:15"), local)
+        self.assertEqual(parse_time("2024-05-01T12:30"), local - 15)
+        self.assertEqual(parse_time("2024-05-01"),
+                         time.mktime((2024, 5, 1, 0, 0, 0, 0, 0, -1)))
+        self.assertRaises(argparse.ArgumentTypeError, parse_time, "May 1")
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_tracereader, "qa_tracereader.xml")
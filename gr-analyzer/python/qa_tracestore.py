@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+from collections import namedtuple
+
+import numpy as np
+
+from gnuradio import gr_unittest
+
+import qa_fixtures
+
+from tracestore import (INDEX_FILE, TILES_FILE, TILE_BINS, query_store,
+                        read_index, read_tiles, store_writer, summarize_tiles,
+                        trace_recorder)
+
+cfg = namedtuple('cfg', 'min_freq deltaf')
+info = namedtuple('info', 'generation seq start_time end_time')
+
+class qa_tracestore(gr_unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def load(self, entry):
+        return (np.load(os.path.join(self.path, entry['data'])),
+                np.load(os.path.join(self.path, entry['meta'])))
+
+    def chunks(self, entries):
+        return [entry['chunk'] for entry in entries]
+
+    def test_round_trip(self):
+        chunks = [qa_fixtures.traces(10, 0), qa_fixtures.traces(5, 10)]
+        writer = store_writer(self.path)
+        writer.append((1e6, 1e3), *chunks[0])
+        writer.append((2e6, 2e3), *chunks[1])
+        writer.close()
+
+        entries = read_index(self.path)
+        self.assertEqual([e['chunk'] for e in entries], [0, 1])
+        self.assertEqual([(e['min_freq'], e['deltaf'], e['rows'])
+                          for e in entries],
+                         [(1e6, 1e3, 10), (2e6, 2e3, 5)])
+        self.assertEqual((entries[1]['start_time'], entries[1]['end_time']),
+                         (10, 14.5))
+        for entry, (traces, meta) in zip(entries, chunks):
+            read_traces, read_meta = self.load(entry)
+            self.assertTrue(np.array_equal(read_traces, traces))
+            self.assertTrue(np.array_equal(read_meta, meta))
+
+    def test_append_after_truncated_line(self):
+        writer = store_writer(self.path)
+        writer.append((1e6, 1e3), *qa_fixtures.traces(10, 0))
+        writer.close()
+        # a crash in the middle of the second chunk's index line
+        with open(os.path.join(self.path, INDEX_FILE), 'a') as f:
+            f.write('{"chunk": 1, "da')
+
+        self.assertEqual(len(read_index(self.path)), 1)
+        writer = store_writer(self.path)
+        writer.append((1e6, 1e3), *qa_fixtures.traces(5, 10))
+        writer.close()
+        self.assertEqual([e['chunk'] for e in read_index(self.path)], [0, 1])
+
+    def test_recorder(self):
+        recorder = trace_recorder(store_writer(self.path))
+        recorder.configure(cfg(1e6, 1e3))
+        for seq in xrange(3):
+            recorder.update(np.full(100, -seq, np.float32),
+                            info(1, seq, seq, seq + 0.5))
+        # a new axis starts a new chunk
+        recorder.configure(cfg(2e6, 1e3))
+        recorder.update(np.zeros(50, np.float32), info(2, 0, 3, 3.5))
+        recorder.close()
+
+        entries = read_index(self.path)
+        self.assertEqual([(e['min_freq'], e['rows'], e['npoints'])
+                          for e in entries],
+                         [(1e6, 3, 100), (2e6, 1, 50)])
+        traces, meta = self.load(entries[0])
+        self.assertTrue(np.array_equal(traces[:, 0], [0, -1, -2]))
+        self.assertEqual(meta['seq'].tolist(), [0, 1, 2])
+        self.assertEqual(recorder.written, 4)
+        self.assertEqual(recorder.dropped, 0)
+
+    def test_summarize_tiles(self):
+        # two whole tiles and a ragged tail of 10 bins
+        _, meta = qa_fixtures.traces(4, 0)
+        traces = np.random.uniform(-120, -20, (4, 2 * TILE_BINS + 10))
+        traces = traces.astype(np.float32)
+        traces[:, :TILE_BINS] = np.nan      # a tile never swept
+        traces[1:, TILE_BINS:-10] = np.nan  # a tile swept once
+
+        tiles = summarize_tiles(7, (1e6, 1e3), traces, meta)
+        self.assertEqual(tiles['chunk'].tolist(), [7, 7, 7])
+        self.assertEqual(tiles['min_freq'].tolist(),
+                         [1e6, 1e6 + TILE_BINS * 1e3,
+                          1e6 + 2 * TILE_BINS * 1e3])
+        self.assertEqual(tiles['max_freq'].tolist(),
+                         [1e6 + (TILE_BINS - 1) * 1e3,
+                          1e6 + (2 * TILE_BINS - 1) * 1e3,
+                          1e6 + (2 * TILE_BINS + 9) * 1e3])
+        self.assertEqual((tiles['start_time'][0], tiles['end_time'][0]),
+                         (0, 3.5))
+        self.assertTrue(np.isnan(tiles[0]['min']))
+        self.assertTrue(np.isnan(tiles[0]['max']))
+        self.assertTrue(np.isnan(tiles[0]['mean']))
+        for tile, bins in zip(tiles[1:], (traces[:, TILE_BINS:-10],
+                                          traces[:, -10:])):
+            self.assertEqual(tile['min'], np.nanmin(bins))
+            self.assertEqual(tile['max'], np.nanmax(bins))
+            self.assertAlmostEqual(tile['mean'], np.nanmean(bins), 4)
+
+    def test_query(self):
+        writer = store_writer(self.path)
+        writer.append((1e6, 1e3), *qa_fixtures.traces(10, 0))
+        writer.append((2e6, 1e3), *qa_fixtures.traces(10, 10))
+        writer.close()
+
+        self.assertEqual(self.chunks(query_store(self.path)), [0, 1])
+        self.assertEqual(self.chunks(query_store(self.path,
+                                                 freq_range=(2e6, 3e6))),
+                         [1])
+        self.assertEqual(self.chunks(query_store(self.path,
+                                                 time_range=(0, 5))),
+                         [0])
+        self.assertEqual(self.chunks(query_store(self.path,
+                                                 time_range=(0, 5),
+                                                 freq_range=(2e6, 3e6))),
+                         [])
+
+    def test_query_chunk_without_tiles(self):
+        writer = store_writer(self.path)
+        writer.append((1e6, 1e3), *qa_fixtures.traces(10, 0))
+        writer.append((2e6, 1e3), *qa_fixtures.traces(10, 10))
+        writer.close()
+
+        # the second chunk's tiles lost
+        tiles = os.path.join(self.path, TILES_FILE)
+        with open(tiles, 'r+b') as f:
+            f.truncate(os.path.getsize(tiles) // 2)
+
+        # its traces are outside these ranges, but with no tiles it can't
+        # be ruled out
+        self.assertEqual(self.chunks(query_store(self.path,
+                                                 freq_range=(1e6, 1.05e6))),
+                         [0, 1])
+        self.assertEqual(self.chunks(query_store(self.path,
+                                                 time_range=(0, 5))),
+                         [0, 1])
+
+    def test_drop_tiles_of_unindexed_chunk(self):
+        writer = store_writer(self.path)
+        writer.append((1e6, 1e3), *qa_fixtures.traces(10, 0))
+        writer.append((2e6, 1e3), *qa_fixtures.traces(10, 10))
+        writer.close()
+
+        # a crash after the second chunk's tiles, before its index line
+        index = os.path.join(self.path, INDEX_FILE)
+        with open(index) as f:
+            lines = f.readlines()
+        with open(index, 'w') as f:
+            f.write(lines[0])
+
+        writer = store_writer(self.path)
+        writer.append((3e6, 1e3), *qa_fixtures.traces(10, 20))
+        writer.close()
+
+        tiles = read_tiles(os.path.join(self.path, TILES_FILE))
+        self.assertEqual(tiles['chunk'].tolist(), [0, 1])
+        self.assertEqual(self.chunks(query_store(self.path,
+                                                 freq_range=(2e6, 2.05e6))),
+                         [])
+        self.assertEqual(self.chunks(query_store(self.path,
+                                                 freq_range=(3e6, 3.05e6))),
+                         [1])
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_tracestore, "qa_tracestore.xml")
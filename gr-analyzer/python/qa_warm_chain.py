@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from gnuradio import gr_unittest
+from sigmf_sink_c import sigmf_capture, write_sigmf_meta
+
+import qa_fixtures
+
+from cli_parser import init_parser
+from configuration import configuration
+from gr_analyzer import top_block
+from sinks import callback_sink
+
+class qa_warm_chain(gr_unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        # a recording of one segment at 100 MHz stands in for the USRP
+        base = os.path.join(self.dir, "recording")
+        np.zeros(4096, dtype=np.complex64).tofile(base + ".sigmf-data")
+        write_sigmf_meta(base + ".sigmf-meta", 1e6,
+                         [sigmf_capture(0, 100e6, 0)])
+
+        args = init_parser().parse_args([
+            "100M", "--replay", base, "--continuous", "--headless",
+            "-F", "256", "--nframes", "2", "--reconfigure-delay", "0",
+            "--presets-file", os.path.join(self.dir, "presets.json")])
+        self.tb = top_block(configuration(args),
+                            sink=callback_sink(lambda points, info: None))
+
+    def tearDown(self):
+        self.tb = None
+        shutil.rmtree(self.dir)
+
+    def swap(self, name):
+        self.tb.load_preset(name)
+        self.tb.configure()
+        self.assertEqual(self.tb.active_preset, name)
+
+    def test_continuous_swaps(self):
+        tb = self.tb
+        tb.save_preset("a")
+        tb.pending_cfg.nframes = 4
+        tb.save_preset("b")
+
+        # a's chain is kept warm from the start, b's from its first swap
+        for _ in xrange(2):
+            self.swap("b")
+            self.assertFalse(tb.ctrl.get_exit_after_complete())
+            self.swap("a")
+            self.assertFalse(tb.ctrl.get_exit_after_complete())
+        self.assertEqual(tb.stats['warm_swaps'], 3)
+
+    def test_single_swaps(self):
+        tb = self.tb
+        tb.set_single_run()
+        tb.configure()
+        tb.save_preset("a")
+        tb.pending_cfg.nframes = 4
+        tb.save_preset("b")
+
+        for _ in xrange(2):
+            self.swap("b")
+            self.assertTrue(tb.ctrl.get_exit_after_complete())
+            self.swap("a")
+            self.assertTrue(tb.ctrl.get_exit_after_complete())
+        self.assertEqual(tb.stats['warm_swaps'], 3)
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_warm_chain, "qa_warm_chain.xml")
@@ -0,0 +1,154 @@
+import json
+
+import numpy as np
+
+import pmt
+from gnuradio import gr
+
+from iq_recorder_s import SC16_FULL_SCALE
+
+
+def open_recording(base):
+    """Return the sample rate, segments and samples of the SigMF recording
+    at base, as written by sigmf_sink_c, iq_ring_sink_c (cf32_le) or
+    iq_recorder_s (ci16_le).
+
+    Every capture of the recording is a segment, a dict of start and length
+    in samples, center frequency and gain (None if not recorded). The
+    samples are memory mapped, complex64 or, for ci16_le, int16 I/Q pairs.
+    """
+    with open(base + ".sigmf-meta") as f:
+        meta = json.load(f)
+    datatype = meta["global"]["core:datatype"]
+    path = base + ".sigmf-data"
+    if datatype == "cf32_le":
+        samples = np.memmap(path, np.complex64, 'r')
+    elif datatype == "ci16_le":
+        samples = np.memmap(path, np.int16, 'r').reshape(-1, 2)
+    else:
+        msg = "{}: can't replay {} recordings, only cf32_le and ci16_le"
+        raise ValueError(msg.format(base, datatype))
+
+    nsamples = len(samples)
+    captures = sorted(meta["captures"], key=lambda c: c["core:sample_start"])
+    starts = [c["core:sample_start"] for c in captures] + [nsamples]
+    segments = []
+    for capture, start, end in zip(captures, starts, starts[1:]):
+        segments.append(dict(start=start,
+                             length=end - start,
+                             frequency=capture["core:frequency"],
+                             gain=capture.get("analyzer:gain")))
+
+    return meta["global"]["core:sample_rate"], segments, samples
+
+
+def recorded_segments(base):
+    """Return the sample rate and segments of the SigMF recording at base,
+    as open_recording does."""
+    sample_rate, segments, _ = open_recording(base)
+    return sample_rate, segments
+
+
+class replay_source_c(gr.sync_block):
+    """Replay a SigMF recording of sweeps in place of the USRP and its
+    usrp_controller_cc.
+
+    Outputs what the controller would: ncopy samples per center frequency,
+    in the order of center_freqs, each segment starting with an rx_freq tag
+    as the USRP sends after a retune, and tune_callback, if given, called
+    with the frequency and gain of the recorded segment. Each center
+    frequency is replayed from the recorded segment nearest to it, and if
+    the recording holds several sweeps, successive sweeps replay them in
+    turn.
+
+    Nothing throttles the output, so sweeps replay as fast as the flowgraph
+    can process them.
+    """
+    def __init__(self, base, center_freqs, ncopy, tune_callback=None):
+        gr.sync_block.__init__(
+            self,
+            name="replay_source_c",
+            in_sig=None,
+            out_sig=[np.complex64]
+        )
+
+        self.sample_rate, segments, self.data = open_recording(base)
+
+        recorded = {}
+        for segment in segments:
+            if segment['length'] < ncopy:
+                msg = "{}: segment at {} Hz has {} samples, {} needed"
+                raise ValueError(msg.format(base, segment['frequency'],
+                                            segment['length'], ncopy))
+            recorded.setdefault(segment['frequency'], []).append(segment)
+        if not recorded:
+            raise ValueError("{}: no segments recorded".format(base))
+
+        freqs = np.array(sorted(recorded))
+        nearest = [freqs[np.abs(freqs - fc).argmin()] for fc in center_freqs]
+        self.plan = [recorded[freq] for freq in nearest]
+
+        self.ncopy = ncopy
+        self.tune_callback = tune_callback
+        self.tag_key = pmt.intern("rx_freq")
+        self.srcid = pmt.intern(self.name())
+
+        self.sweep = 0
+        self.segment = 0    # index into center_freqs
+        self.ncopied = 0    # samples of the current segment output
+        self.exit_after_complete = False
+        self.exit_flowgraph = False
+
+    def set_exit_after_complete(self):
+        self.exit_after_complete = True
+
+    def clear_exit_after_complete(self):
+        self.exit_after_complete = False
+
+    def get_exit_after_complete(self):
+        return self.exit_after_complete
+
+    def work(self, input_items, output_items):
+        out = output_items[0]
+        noutput_items = len(out)
+
+        if self.exit_flowgraph:
+            # the last sweep is out, the next run starts with the next one
+            self.exit_flowgraph = False
+            return -1
+
+        done = 0
+        while done < noutput_items:
+            recordings = self.plan[self.segment]
+            segment = recordings[self.sweep % len(recordings)]
+            if self.ncopied == 0:
+                if self.tune_callback is not None:
+                    self.tune_callback(segment['frequency'], segment['gain'])
+                self.add_item_tag(0, self.nitems_written(0) + done,
+                                  self.tag_key,
+                                  pmt.from_double(segment['frequency']),
+                                  self.srcid)
+
+            count = min(noutput_items - done, self.ncopy - self.ncopied)
+            start = segment['start'] + self.ncopied
+            samples = self.data[start:start + count]
+            if samples.dtype == np.int16:
+                out[done:done + count].real = samples[:, 0]
+                out[done:done + count].imag = samples[:, 1]
+                out[done:done + count] /= SC16_FULL_SCALE
+            else:
+                out[done:done + count] = samples
+            done += count
+            self.ncopied += count
+
+            if self.ncopied == self.ncopy:
+                self.ncopied = 0
+                self.segment += 1
+                if self.segment == len(self.plan):
+                    self.segment = 0
+                    self.sweep += 1
+                    if self.exit_after_complete:
+                        self.exit_flowgraph = True
+                        return done
+
+        return done
@@ -0,0 +1,67 @@
+import numpy as np
+
+from gnuradio import gr
+
+from sweep_counter import sweep_counter
+
+
+class segment_plotter_f(gr.sync_block):
+    """Hand each FFT segment to a sink as soon as it has been measured.
+
+    Takes the per-segment power vectors that stitch_fft_segments_ff would
+    collect into a whole sweep. The valid bins of every segment are passed
+    to sink.update_segment(offset, bins, info) straight away, offset being
+    where they start in the stitched trace. Once the last segment of a sweep
+    is in, the complete trace goes to sink.update(points, info), which marks
+    the trace as consistent. info is the sweep_counter.trace_info of the
+    sweep; a sweep starts when its first segment arrives.
+    """
+    def __init__(self, sink, fft_size, n_segments, overlap, max_bin):
+        gr.sync_block.__init__(
+            self,
+            name="segment_plotter_f",
+            in_sig=[(np.float32, fft_size)],
+            out_sig=None
+        )
+
+        # same cropping as stitch_fft_segments_ff
+        self.n_valid_bins = int(fft_size * (1 - overlap))
+        self.bin_start = int(fft_size * (overlap / 2))
+        self.n_segments = n_segments
+
+        self.max_bin = max_bin # crop plotted data to span
+        self.trace = np.zeros(min(n_segments * self.n_valid_bins, max_bin),
+                              dtype=np.float32)
+        self.segment = 0 # index of the next segment in the sweep
+
+        self.sink = sink
+        self.sink.redraw_plot.set()
+        self.sweeps = sweep_counter()
+
+    def set_generation(self, generation):
+        """Tag the traces that follow with configuration generation."""
+        self.sweeps.set_generation(generation)
+
+    def work(self, input_items, output_items):
+        in0 = input_items[0]
+        ninput_items = len(in0)
+
+        for segment in in0:
+            if self.segment == 0:
+                self.sweeps.begin()
+            offset = self.segment * self.n_valid_bins
+            nbins = min(self.n_valid_bins, len(self.trace) - offset)
+            if nbins > 0:
+                bins = self.trace[offset:offset + nbins]
+                bins[:] = segment[self.bin_start:self.bin_start + nbins]
+                info = self.sweeps.current()
+                if not self.sink.update_segment(offset, bins, info):
+                    return -1
+
+            self.segment += 1
+            if self.segment == self.n_segments:
+                self.segment = 0
+                if not self.sink.update(self.trace, self.sweeps.finish()):
+                    return -1
+
+        return ninput_items
@@ -0,0 +1,177 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from gnuradio import gr
+
+from async_writer import async_writer
+
+
+SIGMF_VERSION = "0.0.2"
+
+
+def sigmf_datetime(timestamp):
+    """Format a unix timestamp as a SigMF (ISO 8601, UTC) datetime."""
+    return datetime.utcfromtimestamp(timestamp).isoformat() + "Z"
+
+
+def sigmf_capture(sample_start, frequency, timestamp, gain=None):
+    """Return the SigMF capture of a segment."""
+    capture = {
+        "core:sample_start": sample_start,
+        "core:frequency": frequency,
+        "core:datetime": sigmf_datetime(timestamp),
+    }
+    if gain is not None:
+        capture["analyzer:gain"] = gain
+    return capture
+
+
+def write_sigmf_meta(path, sample_rate, captures, description="",
+                     datatype="cf32_le"):
+    """Write the SigMF metadata of a recording to path."""
+    meta = {
+        "global": {
+            "core:datatype": datatype,
+            "core:sample_rate": sample_rate,
+            "core:version": SIGMF_VERSION,
+            "core:recorder": "gr-analyzer",
+            "core:description": description,
+        },
+        "captures": captures,
+        "annotations": [],
+    }
+    with open(path, 'w') as f:
+        json.dump(meta, f, indent=2, sort_keys=True)
+
+
+class sigmf_sink_c(gr.sync_block):
+    """Stream the I/Q of a sweep to a SigMF recording as it arrives.
+
+    Samples go to a spool file, through an async_writer so the flowgraph
+    never waits for the disk, rather than being kept in memory, so a sweep
+    of any length costs no more RAM than the flowgraph's and the writer's
+    buffers. Samples the disk couldn't take in time read back as zeros.
+    The controller outputs segment_len samples per center frequency, so
+    every segment_len samples start a SigMF capture holding the segment's
+    center frequency, the host time its first sample arrived and, if
+    get_gain is given, the gain at that time.
+
+    export(base) writes the metadata and moves the recording to
+    base.sigmf-meta and base.sigmf-data. That's a rename, so instant, when
+    spool_dir is on the same filesystem as base.
+    """
+    def __init__(self, sample_rate, segment_len, center_freqs,
+                 get_gain=None, spool_dir=None, description=""):
+        gr.sync_block.__init__(
+            self,
+            name="sigmf_sink_c",
+            in_sig=[np.complex64],
+            out_sig=None
+        )
+
+        self.sample_rate = sample_rate
+        self.segment_len = segment_len
+        self.center_freqs = list(center_freqs)
+        self.get_gain = get_gain
+        self.spool_dir = spool_dir
+        self.description = description
+
+        # export and reset are called from other threads
+        self.lock = threading.Lock()
+        self.writer = None  # async_writer of the spool, made on first use
+        self.path = None
+        self.captures = []
+        self.nitems = 0     # samples recorded
+
+    def _open(self):
+        fd, self.path = tempfile.mkstemp(prefix="gr-analyzer-iq-",
+                                         suffix=".sigmf-data",
+                                         dir=self.spool_dir)
+        os.close(fd)
+        self.writer = async_writer(self.path, keep_offsets=True)
+
+    def _add_capture(self, sample_start):
+        segment = sample_start // self.segment_len
+        freq = self.center_freqs[segment % len(self.center_freqs)]
+        gain = self.get_gain() if self.get_gain is not None else None
+        self.captures.append(sigmf_capture(sample_start, freq, time.time(),
+                                           gain))
+
+    def work(self, input_items, output_items):
+        in0 = input_items[0]
+        ninput_items = len(in0)
+
+        with self.lock:
+            if self.writer is None:
+                self._open()
+            # offsets into in0 of the segments that start in it
+            first = -self.nitems % self.segment_len
+            for start in xrange(first, ninput_items, self.segment_len):
+                self._add_capture(self.nitems + start)
+            self.writer.write(in0)
+            self.nitems += ninput_items
+
+        return ninput_items
+
+    def stop(self):
+        with self.lock:
+            if self.writer is not None:
+                self.writer.flush()
+        return True
+
+    def stats(self):
+        """Return the telemetry of the spool's async_writer, or None."""
+        writer = self.writer
+        return None if writer is None else writer.stats()
+
+    def has_data(self):
+        return self.nitems > 0
+
+    def recording(self):
+        """Return the center frequency of every segment recorded so far and
+        the samples, as a read-only memory-mapped array, or None if there
+        are none."""
+        with self.lock:
+            if not self.nitems:
+                return None
+            self.writer.flush()
+            freqs = [c["core:frequency"] for c in self.captures]
+            return freqs, np.memmap(self.path, np.complex64, 'r',
+                                    shape=(self.nitems,))
+
+    def export(self, base):
+        """Move the recording to base.sigmf-data, with its metadata in
+        base.sigmf-meta. Return False if there was nothing to export.
+
+        The recording is gone from the sink afterwards.
+        """
+        with self.lock:
+            if not self.nitems:
+                return False
+            self.writer.close()
+            write_sigmf_meta(base + ".sigmf-meta", self.sample_rate,
+                             self.captures, self.description)
+            shutil.move(self.path, base + ".sigmf-data")
+            self._forget()
+        return True
+
+    def reset(self):
+        """Discard the recording."""
+        with self.lock:
+            if self.writer is not None:
+                self.writer.close(sync=False)
+                os.unlink(self.path)
+            self._forget()
+
+    def _forget(self):
+        self.writer = None
+        self.path = None
+        self.captures = []
+        self.nitems = 0
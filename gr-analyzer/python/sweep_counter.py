@@ -0,0 +1,45 @@
+import time
+from collections import namedtuple
+
+
+# What a trace is, handed to the sink along with its points:
+#   generation  configuration it was produced under, bumped by the top_block
+#               every time the flowgraph is (re)configured
+#   seq         number of the sweep within its generation, from 0
+#   start_time  host time the sweep started
+#   end_time    host time the sweep ended, None while it's still being swept
+# A trace whose generation isn't the sink's latest is stale, and a gap in seq
+# means sweeps were lost.
+trace_info = namedtuple('trace_info', ['generation',
+                                       'seq',
+                                       'start_time',
+                                       'end_time'])
+
+
+class sweep_counter(object):
+    """Number and timestamp the sweeps of a plotter block."""
+    def __init__(self):
+        self.set_generation(0)
+
+    def set_generation(self, generation):
+        """Start numbering the sweeps of a new configuration from 0."""
+        self.generation = generation
+        self.seq = 0
+        self.start_time = time.time()
+
+    def begin(self):
+        """Mark the start of the next sweep."""
+        self.start_time = time.time()
+
+    def current(self):
+        """Return the trace_info of the sweep in progress."""
+        return trace_info(self.generation, self.seq, self.start_time, None)
+
+    def finish(self):
+        """Return the trace_info of the sweep just completed. The next sweep
+        starts now unless begin is called."""
+        now = time.time()
+        info = trace_info(self.generation, self.seq, self.start_time, now)
+        self.seq += 1
+        self.start_time = now
+        return info
@@ -4,29 +4,38 @@ from __future__ import print_function
 
 import os
 import sys
-import math
 import time
 import threading
 import logging
 from copy import copy
 
 from gnuradio import gr
-from gnuradio import blocks
-from gnuradio import fft
-
-from analyzer import (usrp_controller_cc,
-                      bin_statistics_ff,
-                      stitch_fft_segments_ff,
-                      plotter_f)
 
+from chain import chain_key, processing_chain
 from cli_parser import init_parser
 from configuration import configuration
-import gui
-from usrp import usrp
+from presets import chain_pool, preset_store
+from remote import remote_plot_interface
+from archive import archive_writer
+import matfile
+from tracestore import store_writer, trace_recorder
+import sinks
+
+# The gui (wx, matplotlib) and usrp (UHD) modules are slow to import and are
+# only needed once a top_block is built, so they are imported in
+# top_block.__init__. This keeps the processing core importable without wx or
+# matplotlib and lets argument parsing finish before any of them load.
 
 
 class top_block(gr.top_block):
-    def __init__(self, cfg):
+    def __init__(self, cfg, sink=None, plot_iface=None):
+        """Build the flowgraph.
+
+        Traces go to the GUI unless cfg.headless is set, to any sinks
+        requested by cfg (--record, --store, --archive, --publish), and to
+        sink if given. With cfg.gui_process, plot_iface is the GUI's
+        remote_plot_interface, made before the top_block (see remote).
+        """
         gr.top_block.__init__(self)
 
         self.logger = logging.getLogger("gr-analyzer.top_block")
@@ -36,26 +45,97 @@ class top_block(gr.top_block):
         # pending_cfg - requested config changes that will be applied during
         #               the next run of configure
         self.cfg = cfg
+
+        # Named presets, and pre-built chains for the most recently used ones
+        self.presets = preset_store(cfg.presets_file)
+        self.chain_pool = chain_pool(cfg.preset_pool_size)
+        self.active_preset = None   # preset the current chain was built for
+        self.pending_preset = None  # preset to switch to on next configure
+        if cfg.preset and self.presets.apply(cfg.preset, cfg):
+            self.pending_preset = cfg.preset
+
         self.pending_cfg = copy(self.cfg)
 
+        # Cost of (re)configuring, used to measure the savings of warm chains
+        self.stats = {
+            'rebuilds': 0,          # chains built from scratch after startup
+            'warm_swaps': 0,        # chains reused from the preset pool
+            'rebuild_time': 0.0,    # total seconds spent in cold configures
+            'warm_swap_time': 0.0,  # total seconds spent in warm configures
+            'reconfigure_requests': 0,  # calls to reconfigure()
+            'reconfigure_commits': 0,   # requests coalesced into one rebuild
+        }
+
         if cfg.realtime:
             # Attempt to enable realtime scheduling
             r = gr.enable_realtime_scheduling()
             if r != gr.RT_OK:
                 self.logger.warning("failed to enable realtime scheduling")
 
-        try:
-            self.usrp = usrp(cfg)
-        except RuntimeError as err:
-            print("Error initializing USRP." + str(err), file=sys.stderr)
-            sys.exit(0)
+        if cfg.replay:
+            from replay import replay
+
+            try:
+                self.usrp = replay(cfg)
+            except (IOError, ValueError, RuntimeError) as err:
+                print("Error opening recording. " + str(err), file=sys.stderr)
+                sys.exit(1)
+        else:
+            from usrp import usrp
+
+            try:
+                self.usrp = usrp(cfg)
+            except RuntimeError as err:
+                print("Error initializing USRP." + str(err), file=sys.stderr)
+                sys.exit(0)
 
         # The main loop blocks at the end of the loop until either continuous
         # or single run mode is set.
         self.continuous_run = threading.Event()
         self.single_run = threading.Event()
 
-        self.plot_iface = gui.plot_interface(self)
+        self.plot_iface = None
+        outputs = []
+        if cfg.gui_process and not cfg.headless:
+            if plot_iface is None:
+                plot_iface = remote_plot_interface(cfg)
+            self.plot_iface = plot_iface
+            self.plot_iface.attach(self)
+        elif not cfg.headless:
+            import gui
+            self.plot_iface = gui.plot_interface(self)
+        if self.plot_iface is not None:
+            outputs.append(self.plot_iface)
+        if cfg.record:
+            outputs.append(sinks.file_sink(cfg.record))
+        if cfg.store:
+            outputs.append(trace_recorder(store_writer(cfg.store)))
+        if cfg.archive:
+            outputs.append(trace_recorder(archive_writer(cfg.archive),
+                                          name="archive"))
+        if cfg.publish:
+            outputs.append(sinks.network_sink(cfg.publish))
+        if sink is not None:
+            outputs.append(sink)
+
+        if len(outputs) == 1:
+            self.sink = outputs[0]
+        else:
+            self.sink = sinks.multi_sink(outputs)
+
+        # Configuration edits are coalesced into a single rebuild. The
+        # reconfigure_lock guards the pending request, the configure_lock is
+        # held while a rebuild is being committed or applied.
+        self.reconfigure_lock = threading.Lock()
+        self.configure_lock = threading.Lock()
+        self.reconfigure_timer = None
+        self.reconfigure_pending = False
+        self.redraw_pending = False
+
+        # Bumped by every configure. Traces carry the generation they were
+        # produced under (see analyzer.trace_info), so sinks can tell traces
+        # of a replaced configuration from those of the current one.
+        self.generation = 0
 
         self.rebuild_flowgraph = False
         self.configure(initial=True)
@@ -90,126 +170,184 @@ class top_block(gr.top_block):
         self.ctrl.clear_exit_after_complete()
 
     def reconfigure(self, redraw_plot=False):
+        """Request a rebuild of the flowgraph to apply pending_cfg.
+
+        Requests are coalesced into one rebuild, committed
+        cfg.reconfigure_delay seconds after the last request (at once if 0),
+        or only by apply_reconfigure() if cfg.manual_apply is set.
+        """
         msg = "tb.reconfigure called - redraw_plot: {}"
         self.logger.debug(msg.format(redraw_plot))
-        self.rebuild_flowgraph = True
-        self.set_exit_after_complete()  # exit flowgraph to apply new config
-        if redraw_plot:
-            self.plot_iface.redraw_plot.set()
 
-    def configure(self, initial=False):
-        """Configure or reconfigure the flowgraph"""
+        with self.reconfigure_lock:
+            self.stats['reconfigure_requests'] += 1
+            self.reconfigure_pending = True
+            self.redraw_pending = self.redraw_pending or redraw_plot
 
-        self.lock()
+            if self.reconfigure_timer is not None:
+                self.reconfigure_timer.cancel()
+                self.reconfigure_timer = None
 
-        if self.usrp.apply_cfg(self.pending_cfg):
-            self.pending_cfg = copy(self.usrp.get_cfg())
+            if self.cfg.manual_apply:
+                return
 
-        # Apply any pending configuration changes
-        cfg = self.cfg = copy(self.pending_cfg)
+            if self.cfg.reconfigure_delay > 0:
+                self.reconfigure_timer = threading.Timer(
+                    self.cfg.reconfigure_delay, self.apply_reconfigure
+                )
+                self.reconfigure_timer.daemon = True
+                self.reconfigure_timer.start()
+                return
 
-        if not initial:
-            self.disconnect_all()
-            self.msg_disconnect(self.plot, "gui_busy_notifier",
-                                self.copy_if_gui_idle, "en")
+        self.apply_reconfigure()
 
-        self.ctrl = usrp_controller_cc(self.usrp.uhd,
-                                       cfg.center_freqs,
-                                       cfg.lo_offset,
-                                       cfg.skip_initial,
-                                       cfg.tune_delay,
-                                       cfg.fft_size * cfg.nframes)
+    def apply_reconfigure(self):
+        """Commit all pending configuration changes with a single rebuild"""
+        with self.configure_lock:
+            with self.reconfigure_lock:
+                if self.reconfigure_timer is not None:
+                    self.reconfigure_timer.cancel()
+                    self.reconfigure_timer = None
 
-        if cfg.continuous_run:
-            self.set_continuous_run()
-        else:
-            self.set_single_run()
+                if not self.reconfigure_pending:
+                    return
 
-        self.scaleV = blocks.multiply_const_cc(cfg.scale)
+                self.reconfigure_pending = False
+                redraw_plot = self.redraw_pending
+                self.redraw_pending = False
+                self.stats['reconfigure_commits'] += 1
 
-        timedata_vlen = 1
-        self.timedata_sink = blocks.vector_sink_c(timedata_vlen)
+            self.rebuild_flowgraph = True
+            self.set_exit_after_complete()  # exit flowgraph to apply new config
+            if redraw_plot:
+                self.sink.redraw_plot.set()
 
-        stream_to_fft_vec = blocks.stream_to_vector(gr.sizeof_gr_complex,
-                                                    cfg.fft_size)
+        msg = "committed reconfigure ({reconfigure_requests} requests, "
+        msg += "{reconfigure_commits} commits, {rebuilds} rebuilds so far)"
+        self.logger.debug(msg.format(**self.stats))
 
-        forward = True
-        shift = True
-        self.fft = fft.fft_vcc(cfg.fft_size,
-                               forward,
-                               cfg.window_coefficients,
-                               shift)
+    def configure(self, initial=False):
+        """Configure or reconfigure the flowgraph"""
 
-        freqdata_vlen = cfg.fft_size
-        self.freqdata_sink = blocks.vector_sink_c(freqdata_vlen)
+        # Hold back commits until the new controller is in place, so that
+        # their exit request isn't lost with the old one
+        with self.configure_lock:
+            self._configure(initial)
 
-        c2mag_sq = blocks.complex_to_mag_squared(cfg.fft_size)
+    def _configure(self, initial):
+        start_time = time.time()
 
-        stats = bin_statistics_ff(cfg.fft_size, cfg.nframes, cfg.detector)
+        self.rebuild_flowgraph = False
 
-        power = sum(tap * tap for tap in cfg.window_coefficients)
+        self.lock()
 
-        # Divide magnitude-square by a constant to obtain power
-        # in Watts. Assumes unit of USRP source is volts.
-        impedance = 50.0  # ohms
-        Vsq2W_dB = -10.0 * math.log10(cfg.fft_size * power * impedance)
-        # Convert from Watts to dBm.
-        W2dBm = blocks.nlog10_ff(10.0, cfg.fft_size, 30 + Vsq2W_dB)
+        if self.usrp.apply_cfg(self.pending_cfg):
+            self.pending_cfg = copy(self.usrp.get_cfg())
 
-        stitch = stitch_fft_segments_ff(cfg.fft_size,
-                                        cfg.n_segments,
-                                        cfg.overlap)
+        # Apply any pending configuration changes
+        cfg = copy(self.pending_cfg)
+        self.generation += 1
+        cfg.generation = self.generation
+        self.cfg = cfg
 
-        fft_vec_to_stream = blocks.vector_to_stream(gr.sizeof_float,
-                                                    cfg.fft_size)
-        n_valid_bins = cfg.fft_size - (cfg.fft_size * (cfg.overlap / 2) * 2)
-        # FIXME: think about whether to cast to int vs round vs...
-        stitch_vec_len = int(cfg.n_segments * cfg.fft_size)
-        stream_to_stitch_vec = blocks.stream_to_vector(gr.sizeof_float,
-                                                       stitch_vec_len)
+        if not initial:
+            self.disconnect_all()
+            self.chain.reset_sinks()
 
-        plot_vec_len = int(cfg.n_segments * n_valid_bins)
+        preset = self.pending_preset
+        self.pending_preset = None
 
-        # Only copy sample to plot if enabled to avoid overwhelming gui thread
-        self.copy_if_gui_idle = blocks.copy(gr.sizeof_float * plot_vec_len)
+        chain = None
+        if preset is not None:
+            chain = self.chain_pool.get(preset, chain_key(cfg))
+        warm = chain is not None
+
+        if not warm:
+            chain = processing_chain(self, cfg)
+            if preset is not None:
+                self.chain_pool.put(preset, chain)
+        else:
+            # A warm chain's plotter was configured long ago
+            self.sink.redraw_plot.set()
+
+        self.active_preset = preset
+        self.chain = chain
+        self.ctrl = chain.ctrl
+        self.timedata_sink = chain.timedata_sink
+        self.iq_ring = chain.iq_ring
+        self.iq_recorder = chain.iq_recorder
+        self.freqdata_sink = chain.freqdata_sink
+        self.plot = chain.plot
+        self.plot.set_generation(cfg.generation)
 
-        self.plot = plotter_f(self, plot_vec_len)
+        if cfg.continuous_run:
+            self.set_continuous_run()
+        else:
+            self.set_single_run()
 
-        # Create the flowgraph:
+        if warm:
+            # A warm chain's controller still holds the exit request that
+            # swapped it out, which set_continuous_run leaves alone when the
+            # run mode hasn't changed
+            if cfg.continuous_run:
+                self.clear_exit_after_complete()
+            else:
+                self.set_exit_after_complete()
+
+        self.sink.configure(cfg)
+
+        # The chain holds everything but the radio, so this is the only edge
+        # that changes when switching between configurations:
         #
-        # USRP   - hardware source output stream of 32bit complex floats
-        # ctrl   - copy N samples then call retune callback and loop
-        # scaleV - scale voltage by scalar to get calibrated output
-        # fft    - compute forward FFT, complex in complex out
-        # mag^2  - convert vectors from complex to real by taking mag squared
-        # stats  - linear average or peak detect vectors if nframes > 1
-        # W2dBm  - convert volt to dBm
-        # stitch - overlap FFT segments by a certain number of bins
-        # copy   - copy if gui thread is idle, else drop
-        # plot   - plot data
+        # USRP > chain
         #
-        # USRP > ctrl > fft > mag^2 > stats > W2dBm > stitch > copy > plot
-
-        self.connect(self.usrp.uhd, self.ctrl, self.scaleV)
-        if self.single_run.is_set():
-            self.logger.debug("Connected timedata_sink")
-            self.connect((self.scaleV, 0), self.timedata_sink)
+        # or with --replay just the chain, which replays the recording itself
+        if cfg.replay:
+            self.connect(chain)
         else:
-            self.logger.debug("Disconnected timedata_sink")
-        self.connect((self.scaleV, 0), stream_to_fft_vec, self.fft)
-        if self.single_run.is_set():
-            self.logger.debug("Connected freqdata_sink")
-            self.connect((self.fft, 0), self.freqdata_sink)
+            self.connect(self.usrp.uhd, chain)
+
+        self.unlock()
+
+        if not initial:
+            self._record_configure_time(time.time() - start_time, warm)
+
+    def _record_configure_time(self, elapsed, warm):
+        """Update reconfiguration stats and log the savings of warm swaps."""
+        stats = self.stats
+        if warm:
+            stats['warm_swaps'] += 1
+            stats['warm_swap_time'] += elapsed
+            msg = "swapped in warm chain for preset {!r} in {:.1f} ms"
+            msg = msg.format(self.active_preset, elapsed * 1e3)
+            if stats['rebuilds']:
+                avg_rebuild = stats['rebuild_time'] / stats['rebuilds']
+                msg += " (rebuild averages {:.1f} ms)".format(avg_rebuild * 1e3)
+            self.logger.info(msg)
         else:
-            self.logger.debug("Disconnected freqdata_sink")
-        self.connect((self.fft, 0), c2mag_sq, stats, W2dBm, fft_vec_to_stream)
-        self.connect(fft_vec_to_stream, stream_to_stitch_vec, stitch)
-        self.connect(stitch, self.copy_if_gui_idle, self.plot)
+            stats['rebuilds'] += 1
+            stats['rebuild_time'] += elapsed
+            msg = "rebuilt flowgraph in {:.1f} ms".format(elapsed * 1e3)
+            self.logger.debug(msg)
+
+    def load_preset(self, name):
+        """Switch to a saved preset, reusing its warm chain if there is one"""
+        if self.presets.apply(name, self.pending_cfg):
+            self.pending_preset = name
+            self.reconfigure(redraw_plot=True)
+            self.apply_reconfigure()  # don't wait out the debounce window
 
-        self.msg_connect(self.plot, "gui_busy_notifier",
-                         self.copy_if_gui_idle, "en")
+    def save_preset(self, name):
+        """Save the pending configuration as a named preset"""
+        self.presets.add(name, self.pending_cfg)
+        if chain_key(self.pending_cfg) == self.chain.key:
+            # The running chain already matches, so keep it warm
+            self.chain_pool.put(name, self.chain)
+            self.active_preset = name
 
-        self.unlock()
+    def remove_preset(self, name):
+        self.presets.remove(name)
+        self.chain_pool.discard(name)
 
     def set_sample_rate(self, rate):
         new_rate = self.usrp.set_sample_rate(rate)
@@ -224,32 +362,117 @@ class top_block(gr.top_block):
             self.pending_cfg.update()
             self.reconfigure(redraw_plot=True)
 
-    def save_time_data_to_file(self, data):
-        print("NOOP")
-
-    def save_freq_data_to_file(self, data):
-        print("NOOP")
+    def telemetry(self):
+        """Return the telemetry of the sinks and every file being written,
+        as a dict of name to stats (see analyzer.async_writer.stats)."""
+        stats = self.sink.stats()
+        for name, sink in (("time data", self.timedata_sink),
+                           ("fft data", self.freqdata_sink),
+                           ("iq recording", self.iq_recorder)):
+            if sink is None:
+                continue
+            sink_stats = sink.stats()
+            if sink_stats is not None:
+                stats[name] = sink_stats
+        return stats
+
+    def log_telemetry(self):
+        for name, stats in sorted(self.telemetry().items()):
+            items = ", ".join("{} {:g}".format(key, value)
+                              for key, value in sorted(stats.items()))
+            self.logger.info("{}: {}".format(name, items))
+
+    def has_time_data(self):
+        if self.iq_ring is not None:
+            return self.iq_ring.has_data()
+        return self.timedata_sink.has_data()
+
+    def has_freq_data(self):
+        return self.freqdata_sink.has_data()
+
+    def save_time_data_to_file(self, path):
+        """Save the I/Q of the last sweep to a SigMF recording,
+        path.sigmf-meta and path.sigmf-data, or to a MATLAB v7.3 MAT-file if
+        path ends in .mat.
+
+        With --iq-ring the sweep is cut out of the ring, otherwise the
+        recording of the last single run is moved there (SigMF) or copied
+        from the spool (MAT-file).
+        """
+        base, ext = os.path.splitext(path)
+        if ext == ".mat":
+            self._save_time_data_to_matfile(path)
+            return
+        if ext not in (".sigmf-meta", ".sigmf-data", ".sigmf"):
+            base = path
+        if self.iq_ring is not None:
+            nsegments = self.iq_ring.export(base)
+            msg = "Exported {} segments of I/Q time data from the ring to {}"
+            self.logger.info(msg.format(nsegments, base + ".sigmf-data"))
+        elif self.timedata_sink.export(base):
+            msg = "Exported I/Q time data to {}.sigmf-data"
+            self.logger.info(msg.format(base))
+
+    def _save_time_data_to_matfile(self, path):
+        if self.iq_ring is not None:
+            blocks = self.iq_ring.read_segments()
+        else:
+            recording = self.timedata_sink.recording()
+            if recording is None:
+                return
+            freqs, samples = recording
+            blocks = matfile.segment_blocks(freqs, samples,
+                                            self.timedata_sink.segment_len)
+        try:
+            nsegments = matfile.save_time_data(path, self.cfg, blocks)
+        except RuntimeError as err:
+            self.logger.error(str(err))
+            return
+        msg = "Exported {} segments of I/Q time data to {}"
+        self.logger.info(msg.format(nsegments, path))
+
+    def save_freq_data_to_file(self, path):
+        """Save the complex FFT data of the last single run to a MATLAB
+        v7.3 MAT-file."""
+        vectors = self.freqdata_sink.vectors()
+        if vectors is None:
+            return
+        try:
+            nsegments = matfile.save_fft_data(path, self.cfg, vectors)
+        except RuntimeError as err:
+            self.logger.error(str(err))
+            return
+        msg = "Exported complex FFT data of {} segments to {}"
+        self.logger.info(msg.format(nsegments, path))
 
 
 def main(tb):
-    """Run the main loop of the program"""
+    """Run the main loop of the program.
+
+    With a GUI, the loop idles after a single run until the user asks for
+    another. Headless, nothing can ask, so a single run returns after one
+    sweep and a continuous run lasts until interrupted or a sink goes away.
+    """
 
     logger = logging.getLogger('gr-analyzer.main')
-    gui_alive = True
+    sink_alive = True
 
     while True:
         # Execute flow graph and wait for it to stop
         tb.run()
         tb.clear_single_run()
 
-        if tb.continuous_run.is_set() and not tb.plot_iface.is_alive():
-            # GUI was destroyed while in continuous mode
+        if tb.continuous_run.is_set() and not tb.sink.is_alive():
+            # GUI was destroyed (or another sink closed) in continuous mode
             return
 
         while not (tb.single_run.is_set() or tb.continuous_run.is_set()):
+            if tb.plot_iface is None:
+                # Headless single run is complete
+                return
             # keep certain gui elements alive
-            gui_alive = tb.plot_iface.keep_alive()
-            if not gui_alive:
+            sink_alive = tb.sink.keep_alive()
+            if not sink_alive:
                 # GUI was destroyed while in single mode
                 return
             # check run mode again in 1/4 second
@@ -261,22 +484,37 @@ def main(tb):
         if tb.rebuild_flowgraph:
             logger.info("rebuild flowgraph")
             tb.configure()
-            tb.rebuild_flowgraph = False
 
 
 if __name__ == '__main__':
     parser = init_parser()
     args = parser.parse_args()
+    if args.headless and not (args.record or args.store or args.archive or
+                              args.publish or args.iq_record):
+        parser.error("--headless requires --record, --store, --archive," +
+                     " --publish or --iq-record")
     cfg = configuration(args)
 
     if cfg.debug:
         print("pid = {}".format(os.getpid()))
         raw_input("Press Enter to continue...")
 
-    tb = top_block(cfg)
+    # The gui process is forked before UHD and the flowgraph start threads
+    plot_iface = None
+    if cfg.gui_process and not cfg.headless:
+        plot_iface = remote_plot_interface(cfg)
+
+    tb = top_block(cfg, plot_iface=plot_iface)
     try:
         main(tb)
         logging.getLogger('gr-analyzer').info("Exiting.")
     except KeyboardInterrupt:
         tb.stop()
         tb.wait()
+    finally:
+        tb.log_telemetry()
+        tb.sink.close()
+        tb.timedata_sink.reset() # remove any I/Q that wasn't exported
+        tb.freqdata_sink.reset()
+        if tb.iq_recorder is not None:
+            tb.iq_recorder.close() # finish the last recording
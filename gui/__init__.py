@@ -1,44 +1,100 @@
 import wx
 import threading
 
+from decimate import decimate_view, minmax_pyramid
+from handoff import trace_mailbox
 from gui.main import wxpygui_frame
+from sinks import partial_trace, trace_sink
 
 
-class plot_interface(object):
+class plot_interface(trace_sink):
     def __init__(self, tb):
+        trace_sink.__init__(self)
         self.tb = tb
+        # latest trace for the gui, which draws it on its own timer
+        self.mailbox = trace_mailbox()
         self.app = wx.App()
-        self.app.frame = wxpygui_frame(tb)
+        self.app.frame = wxpygui_frame(tb, self.mailbox)
         self.app.frame.Show()
         self.gui = threading.Thread(target=self.app.MainLoop)
 
-        self.redraw_plot = threading.Event()
-
         self.gui.daemon = True
         self.gui.start()
 
-    def keep_alive(self):
-        return self.update(None)
+        self.x = None # bin frequencies of incoming traces, set by configure
+        self.generation = None # configuration generation of self.x
+        self.partial = partial_trace() # trace being swept in progressive mode
+
+    def configure(self, cfg):
+        self.x = cfg.bin_freqs[:cfg.max_plotted_bin]
+        self.generation = cfg.generation
+        self.partial.configure(len(self.x))
+        self.app.frame.threshold_monitor.configure(cfg)
+
+    def update(self, points, info):
+        return self._publish(points, info, complete=True)
+
+    def update_segment(self, offset, points, info):
+        if self.partial.patch(offset, points):
+            return self.update_partial(self.partial.points, info)
+        return self.is_alive()
+
+    def update_partial(self, points, info):
+        """Show a trace that's still being swept. It isn't added to the
+        persistence display or waterfall, or checked against the threshold,
+        until it's complete."""
+        return self._publish(points, info, complete=False)
 
-    def update(self, points):
-        # if we don't have points to plot, just keep gui alive
-        keep_alive = points is None
-        redraw = self.redraw_plot.is_set() and not keep_alive
+    def _publish(self, points, info, complete):
         try:
-            if self.app.frame.closed:
+            frame = self.app.frame
+            if frame.closed:
                 return False
-            # thread-safe call to wx gui
-            wx.CallAfter(self.app.frame.update_plot,
-                         points,
-                         redraw,
-                         keep_alive)
+            if info.generation != self.generation:
+                # Stale: configure has been called since it was produced,
+                # which happens when the gui runs in its own process
+                return True
+
+            # Copy into the mailbox and reduce the trace to min/max pairs per
+            # pixel column here, in the flowgraph's thread, so the gui thread
+            # only draws what can be seen.
+            slot = self.mailbox.back_slot(len(points))
+            slot.points[:] = points
+            slot.info = info
+            slot.x = self.x
+            slot.view = view = frame.view
+            slot.xd = slot.yd = slot.pyramid = None
+            if view is not None:
+                if complete:
+                    # built here so zooming and panning never has to look
+                    # at every point of the trace again
+                    slot.pyramid = minmax_pyramid(slot.points)
+                    slot.xd, slot.yd = slot.pyramid.decimate(self.x,
+                                                             slot.points,
+                                                             view)
+                    frame.persistence.push(self.x, slot.points, view)
+                    if frame.waterfall is not None:
+                        frame.waterfall.push(self.x, slot.points, view)
+                else:
+                    slot.xd, slot.yd = decimate_view(self.x, slot.points,
+                                                     view)
+
+            if complete:
+                frame.threshold_monitor.update(slot.points, info)
 
-            if redraw:
+            slot.redraw = self.redraw_plot.is_set()
+            if slot.redraw:
                 self.redraw_plot.clear()
+            self.mailbox.publish()
             return True
         except wx.PyDeadObjectError:
             return False
 
+    def stats(self):
+        """Return how many traces the gui drew, and how many it dropped for
+        newer ones (see handoff.trace_mailbox.counts)."""
+        return {'gui': self.mailbox.counts()}
+
     def is_alive(self):
         try:
             if self.app.frame.closed:
@@ -46,6 +102,3 @@ class plot_interface(object):
             return True
         except wx.PyDeadObjectError:
             return False
-
-    def set_gui_idle(self):
-        self.tb.copy_if_gui_idle.set_enabled(True)
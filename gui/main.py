@@ -3,42 +3,64 @@ import time
 import wx
 import logging
 import numpy as np
-import matplotlib
-matplotlib.use('WXAgg')
-from matplotlib.backends.backend_wxagg import FigureCanvasWxAgg as FigureCanvas
-from matplotlib.figure import Figure
-from matplotlib.ticker import FuncFormatter
 
+from decimate import decimate_view
+from events import create_threshold_monitor
 from gui import (tune_delay, nframes, export, frequency, gain, lotuning,
                  marker, power, resolution, threshold, trigger, window,
-                 detector, span, scale)
+                 detector, span, scale, preset, waterfall, persistence,
+                 plot_backend)
 
 
 class wxpygui_frame(wx.Frame):
     """The main gui frame."""
 
-    def __init__(self, tb):
+    RENDER_FPS = 30 # traces drawn per second, at most
+    KEEP_ALIVE_INTERVAL = 0.25 # seconds between redraws while idle
+    ZOOM_STEP = 1.25 # zoom factor per mouse wheel step
+    PAN_STEP = 0.1 # fraction of the view panned per mouse wheel step
+    MIN_ZOOM_BINS = 16 # narrowest view, in bins
+
+    def __init__(self, tb, mailbox):
         wx.Frame.__init__(self, parent=None, id=-1, title="gr-analyzer")
         self.tb = tb
+        self.mailbox = mailbox # latest trace from the flowgraph
 
         self.min_power = -120 # dBm
         self.max_power = 0 # dBm
 
-        self.init_mpl_canvas()
-        self.x = None # set by configure_mpl_plot
+        self.x = None # set by configure_plot
+        self.generation = None # configuration generation of self.x
+        self.y = None # full resolution power of the last trace drawn
+        self.pyramid = None # decimate.minmax_pyramid of self.y, if sent one
+        # (xmin, xmax, width in pixels) of the plot, set by _update_view
+        self.view = None
+        self.xlim = None # set by set_xlim
+        self.full_xlim = None # xlim when not zoomed, set by format_axis
+        self.xticks = None
+
+        # draws the power spectrum, see gui.plot_backend
+        self.plot_backend = plot_backend.create(self, tb.cfg.plot_backend)
+        self.plot = self.plot_backend.panel
+        if tb.cfg.waterfall:
+            self.waterfall = waterfall.waterfall(self, tb.cfg.waterfall)
+        else:
+            self.waterfall = None
+
+        self.persistence = persistence.persistence(self, tb.cfg.persistence)
 
         # Setup a threshold level at None
         self.threshold = threshold.threshold(self, None)
+        # reports threshold crossings, fed from the flowgraph's thread
+        self.threshold_monitor = create_threshold_monitor(tb.cfg)
 
-        # Init markers (visible=False)
-        self.mkr1 = marker.marker(self, 1, '#00FF00', 'd') # thin green diamond
-        self.mkr2 = marker.marker(self, 2, '#00FF00', 'd') # thin green diamond
+        # Init markers (not plotted until set)
+        self.markers = marker.markers(self)
 
         # init control boxes
         self.gain_ctrls = gain.ctrls(self)
         self.threshold_ctrls = threshold.ctrls(self)
-        self.mkr1_ctrls = marker.mkr1_ctrls(self)
-        self.mkr2_ctrls = marker.mkr2_ctrls(self)
+        self.marker_ctrls = marker.ctrls(self)
         self.res_ctrls = resolution.ctrls(self)
         self.windowfn_ctrls = window.ctrls(self)
         self.lo_offset_ctrls = lotuning.ctrls(self)
@@ -51,6 +73,8 @@ class wxpygui_frame(wx.Frame):
         self.export_ctrls = export.ctrls(self)
         self.detector_ctrls = detector.ctrls(self)
         self.scale_ctrls = scale.ctrls(self)
+        self.preset_ctrls = preset.ctrls(self)
+        self.persistence_ctrls = persistence.ctrls(self)
 
         self.set_layout()
 
@@ -58,20 +82,18 @@ class wxpygui_frame(wx.Frame):
 
         # gui event handlers
         self.Bind(wx.EVT_CLOSE, self.close)
-        self.Bind(wx.EVT_IDLE, self.idle_notifier)
 
-        self.canvas.mpl_connect('button_press_event', self.on_mousedown)
-        self.canvas.mpl_connect('button_release_event', self.on_mouseup)
-
-        self.plot_background = None
+        # Draw on a fixed-rate timer rather than per trace, so the sweep rate
+        # never has to wait for the gui and the gui never falls behind
+        self.render_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.on_render_timer, self.render_timer)
+        self.render_timer.Start(1000 // self.RENDER_FPS)
+        self.last_keep_alive = 0
 
         # Used to peak search within range
-        self.span = None       # the actual matplotlib patch
         self.span_left = None  # left bound x coordinate
         self.span_right = None # right bound x coordinate
 
-        self.last_click_evt = None
-
         self.closed = False
 
         # Used to increment file numbers
@@ -120,6 +142,7 @@ class wxpygui_frame(wx.Frame):
         usrpstate_col1.Add(usrpstate_row2, flag=wx.EXPAND)
 
         usrpstate_col2 = wx.BoxSizer(wx.VERTICAL)
+        usrpstate_col2.Add(self.preset_ctrls.layout, flag=wx.ALL, border=5)
 
         # col 1
         usrpstate_cluster.Add(usrpstate_col1)
@@ -152,6 +175,7 @@ class wxpygui_frame(wx.Frame):
         display_col2.Add(self.power_ctrls.layout,
                          flag=wx.ALL|wx.EXPAND,
                          border=5)
+        display_col2.Add(self.persistence_ctrls.layout)
 
         # col 1
         display_cluster.Add(display_col1)
@@ -163,16 +187,14 @@ class wxpygui_frame(wx.Frame):
         data_outline = wx.StaticBox(self, wx.ID_ANY, "Data")
         data_cluster = wx.StaticBoxSizer(data_outline, wx.HORIZONTAL)
 
-        data_col3 = wx.BoxSizer(wx.VERTICAL)
-        data_col3.Add(self.threshold_ctrls.layout)
-        data_col3.Add(self.export_ctrls.layout)
+        data_col2 = wx.BoxSizer(wx.VERTICAL)
+        data_col2.Add(self.threshold_ctrls.layout)
+        data_col2.Add(self.export_ctrls.layout)
 
         # col 1
-        data_cluster.Add(self.mkr1_ctrls.layout, flag=wx.ALL, border=5)
+        data_cluster.Add(self.marker_ctrls.layout, flag=wx.ALL, border=5)
         # col 2
-        data_cluster.Add(self.mkr2_ctrls.layout, flag=wx.ALL, border=5)
-        # col 3
-        data_cluster.Add(data_col3, flag=wx.ALL, border=5)
+        data_cluster.Add(data_col2, flag=wx.ALL, border=5)
 
         # put everything together
 
@@ -187,274 +209,279 @@ class wxpygui_frame(wx.Frame):
                          flag=wx.EXPAND | wx.LEFT | wx.RIGHT,
                          border=5)
 
+        # Stack the waterfall, if any, below the plot
+        plotstack = wx.BoxSizer(wx.VERTICAL)
+        plotstack.Add(self.plot)
+        if self.waterfall is not None:
+            plotstack.Add(self.waterfall.panel)
+
         # Add plot and control stack side-by-side on the front panel
-        frontpanel.Add(self.plot, flag=wx.ALIGN_CENTER_VERTICAL)
+        frontpanel.Add(plotstack, flag=wx.ALIGN_CENTER_VERTICAL)
         frontpanel.Add(controlstack, flag=wx.ALIGN_CENTER_VERTICAL)
 
         self.SetSizer(frontpanel)
         self.Fit()
 
+    def refresh_ctrls(self):
+        """Show the pending configuration, e.g. after loading a preset."""
+        cfg = self.tb.pending_cfg
+        self.frequency_ctrls.center_freq_txtctrl.set_value()
+        self.span_ctrls.span_txt.set_value()
+        self.scale_ctrls.scale_txtctrl.set_value()
+        self.lo_offset_ctrls.lo_offset_txtctrl.set_value()
+        self.nframes_ctrls.nframes_txtctrl.set_value()
+        self.tune_delay_ctrls.tune_delay_txtctrl.set_value()
+        self.res_ctrls.samp_rate_txt.set_value()
+        self.res_ctrls.fft_txt.set_value()
+        self.res_ctrls.deltaf_txt.update()
+        self.windowfn_ctrls.windowfn_dropdown.SetStringSelection(cfg.window)
+        self.detector_ctrls.detector_dropdown.SetStringSelection(
+            cfg.detector.name
+        )
+
     ####################
     # GUI Initialization
     ####################
 
-    def init_mpl_canvas(self):
-        """Initialize a matplotlib plot."""
-        self.plot = wx.Panel(self, wx.ID_ANY, size=(700,600))
-        self.figure = Figure(figsize=(7, 6), dpi=100)
-        self.figure.subplots_adjust(right=.95)
-        self.canvas = FigureCanvas(self.plot, -1, self.figure)
-
-    def configure_mpl_plot(self, y, adjust_freq_range=True):
-        """Configure or reconfigure the matplotlib plot"""
-        maxbin = self.tb.cfg.max_plotted_bin
-        self.x = self.tb.cfg.bin_freqs[:maxbin]
-        # self.line in a numpy array in the form [[x-vals], [y-vals]], where
-        # x-vals are bin center frequencies and y-vals are powers. So once we
-        # initialize a power at each freq, just find the index of the
-        # frequency that a measurement was taken at, and insert it into the
-        # corresponding index in y-vals.
-        if adjust_freq_range:
-            len_x = len(self.x)
-            len_y = len(y)
-            if len_x != len_y:
-                # There's a race condition when in continuous mode and
-                # a frequency range-adjusting parameter (like span) is
-                # changed, so we sometimes get updated x-values before
-                # updated y-values. Since a) it only affects
-                # continuous mode and b) the user has requested a
-                # different view, there's no harm in simply dropping
-                # the old data and re-calling configure_mpl_plot next frame.
-                # Still - this is a workaround.
-                # The most "correct" solution would be to have
-                # controller_c tag the first sample propagated after
-                # flowgraph starts, which plotter_f would look for and
-                # use to trigger plot reconfig.
-                self.logger.debug("data mismatch - frame dropped")
-                return False
-
-            if hasattr(self, 'mkr1'):
-                self.mkr1.unplot()
-            if hasattr(self, 'mkr2'):
-                self.mkr2.unplot()
-            if hasattr(self, 'line'):
-                self.line.remove()
-
-            # initialize a line
-            self.line, = self.subplot.plot(self.x, y,
-                                           animated=True,
-                                           antialiased=True,
-                                           linestyle='-',
-                                           color='b')
-
-        self.canvas.draw()
-        self._update_background()
-
-        return True
+    def configure_plot(self, y, x, generation):
+        """Configure or reconfigure the plot for the traces of a new
+        configuration generation, whose bins are at frequencies x."""
+        self.x = x
+        self.generation = generation
+        self.y = y
+        self.pyramid = None
+        self.markers.clear()
+        self.plot_backend.set_line(*decimate_view(self.x, y, self.view))
 
     def format_axis(self):
         """Set the formatting of the plot axes."""
-        if hasattr(self, "subplot"):
-            ax = self.subplot
-        else:
-            ax = self.figure.add_subplot(111)
-
-        xaxis_formatter = FuncFormatter(self.format_mhz)
-        ax.xaxis.set_major_formatter(xaxis_formatter)
-        ax.set_xlabel("Frequency (MHz)")
-        ax.set_ylabel("Power (dBm)")
         cf = self.tb.cfg.center_freq
         lowest_xtick = cf - (self.tb.cfg.span / 2)
         highest_xtick = cf + (self.tb.cfg.span / 2)
-        ax.set_xlim(lowest_xtick-1e6, highest_xtick+1e6)
-        ax.set_ylim(self.min_power+1, self.max_power-1)
-        xticks = np.linspace(lowest_xtick, highest_xtick, 5, endpoint=True)
-        ax.set_xticks(xticks)
-        ax.set_yticks(np.arange(self.min_power, self.max_power, 10))
-        ax.grid(color='.90', linestyle='-', linewidth=1)
-        ax.set_title("Power Spectrum")
-
-        self.subplot = ax
-        self.canvas.draw()
-        self._update_background()
-
-    @staticmethod
-    def format_mhz(x, pos):
-        """Format x ticks (in Hz) to MHz with 0 decimal places."""
-        return "{:.1f}".format(x / float(1e6))
+        self.full_xlim = (lowest_xtick-1e6, highest_xtick+1e6)
+        self.set_xlim(self.full_xlim)
+
+    def set_xlim(self, xlim):
+        """Show the frequency range xlim, zooming or panning the plot."""
+        self.xlim = xlim
+        xmin, xmax = xlim
+        # keep the ticks inset from the edges as much as when not zoomed
+        full_min, full_max = self.full_xlim
+        inset = 1e6 * (xmax - xmin) / (full_max - full_min)
+        self.xticks = np.linspace(xmin + inset, xmax - inset, 5,
+                                  endpoint=True)
+        self.plot_backend.format_axis(
+            self.xlim,
+            (self.min_power+1, self.max_power-1),
+            self.xticks,
+            np.arange(self.min_power, self.max_power, 10),
+            self.format_mhz
+        )
+
+        self.persistence.format_axis()
+        self._update_view()
+
+        if self.waterfall is not None:
+            self.waterfall.format_axis(self.xlim,
+                                       self.min_power,
+                                       self.max_power)
+
+    def format_mhz(self, x, pos):
+        """Format x ticks (in Hz) to MHz with enough decimal places to tell
+        them apart."""
+        spacing = (self.xticks[1] - self.xticks[0]) / 1e6
+        decimals = max(1, int(np.ceil(-np.log10(spacing))) + 1)
+        return "{:.{}f}".format(x / float(1e6), decimals)
 
     ####################
     # Plotting functions
     ####################
 
-    def update_plot(self, y, redraw_plot, keep_alive):
-        """Update the plot."""
+    def update_plot(self, y, x, info, xd, yd, view, pyramid, redraw_plot,
+                    keep_alive):
+        """Update the plot.
+
+        x are the bin frequencies of trace y, and info its trace_info. xd and
+        yd are y decimated to view, the visible range and width of the plot
+        at the time the trace was sent, or None if it wasn't decimated.
+        pyramid is a decimate.minmax_pyramid of y, or None.
+        """
+
+        if not keep_alive:
+            if info.generation != self.tb.cfg.generation:
+                # Produced under a configuration that has been replaced
+                # since, so the axes no longer fit it
+                self.logger.debug("stale trace dropped")
+                return
+            if info.generation != self.generation:
+                redraw_plot = True
 
         if redraw_plot:
             #assert not keep_alive
-            self.logger.debug("Reconfiguring matplotlib plot")
+            self.logger.debug("Reconfiguring plot")
             self.format_axis()
-            if not self.configure_mpl_plot(y):
-                # Got bad data, try again next frame
-                self.tb.plot_iface.redraw_plot.set()
-                return
-
-        # Required for plot blitting
-        self.canvas.restore_region(self.plot_background)
+            self.configure_plot(y, x, info.generation)
 
         if keep_alive:
             # Just keep markers and span alive after single run
-            y = self.line.get_ydata()
-            self.subplot.draw_artist(self.line)
+            y = self.y
         else:
-            self._draw_line(y)
-            self._check_threshold(y)
-
-        self._draw_span()
-        self._draw_threshold()
-        self._draw_markers(y)
-
-        # blit canvas
-        self.canvas.blit(self.subplot.bbox)
-
-    def _update_background(self):
-        """Force update of the plot background."""
-        self.plot_background = self.canvas.copy_from_bbox(self.subplot.bbox)
-
-    def _draw_span(self):
-        """Draw a span to bound the peak search functionality."""
-        if self.span is not None:
-            self.subplot.draw_artist(self.span)
-
-    def _draw_threshold(self):
-        """Draw a span to bound the peak search functionality."""
-        if self.threshold.line is not None:
-            self.subplot.draw_artist(self.threshold.line)
-
-    def _draw_line(self, y):
-        """Draw the latest chunk of line data."""
-        self.line.set_ydata(y)
-        self.subplot.draw_artist(self.line)
-
-    def _draw_markers(self, y):
-        """Draw power markers at a specific frequency."""
-        # Update mkr1 if it's set
-        if self.mkr1.freq is not None:
-            m1bin = self.mkr1.bin_idx
-            mkr1_power = y[m1bin]
-            self.mkr1.point.set_ydata(mkr1_power)
-            self.mkr1.point.set_visible(True) # make visible
-            self.mkr1.text_label.set_visible(True)
-            self.mkr1.text_power.set_text("{:.1f} dBm".format(mkr1_power))
-            self.mkr1.text_power.set_visible(True)
-
-            # redraw
-            self.subplot.draw_artist(self.mkr1.point)
-            self.figure.draw_artist(self.mkr1.text_label)
-            self.figure.draw_artist(self.mkr1.text_power)
-
-        # Update mkr2 if it's set
-        if self.mkr2.freq is not None:
-            m2bin = self.mkr2.bin_idx
-            mkr2_power = y[m2bin]
-            self.mkr2.point.set_ydata(mkr2_power)
-            self.mkr2.point.set_visible(True) # make visible
-            self.mkr2.text_label.set_visible(True)
-            self.mkr2.text_power.set_text("{:.2f} dBm".format(mkr2_power))
-            self.mkr2.text_power.set_visible(True)
-
-            # Redraw
-            self.subplot.draw_artist(self.mkr2.point)
-            self.figure.draw_artist(self.mkr2.text_label)
-            self.figure.draw_artist(self.mkr2.text_power)
-
-    def _check_threshold(self, y):
-        """Warn to stdout if the threshold level has been crossed."""
-        # Update threshold
-        # indices of where the y-value is greater than self.threshold.level
-        if self.threshold.level is not None:
-            overloads, = np.where(y > self.threshold.level)
-            if overloads.size: # is > 0
-                self.log_threshold_overloads(overloads, y)
-
-    def log_threshold_overloads(self, overloads, y):
-        """Outout threshold violations to the logging system."""
-        logheader = "============= Overload at {} ============="
-        self.logger.warning(logheader.format(int(time.time())))
-        logmsg = "Exceeded threshold {0:.0f}dBm ({1:.2f}dBm) at {2:.2f}MHz"
-        for i in overloads:
-            self.logger.warning(
-                logmsg.format(self.threshold.level, y[i], self.x[i] / 1e6)
-            )
+            if xd is None or view != self.view:
+                # Zoomed or resized since the trace was decimated
+                xd, yd = self._decimate(y, pyramid)
+            self.y = y
+            self.pyramid = pyramid
+            self.plot_backend.set_line(xd, yd)
+
+        self.persistence.draw()
+        self.markers.draw(y, track=not keep_alive)
+        self.plot_backend.render()
+
+        if self.waterfall is not None:
+            self.waterfall.draw()
+
+    def _update_view(self):
+        """Cache the visible frequency range and plot width in pixels.
+
+        Traces are decimated to the view, so the line is re-decimated from the
+        last full resolution trace whenever the view changes.
+        """
+        xmin, xmax = self.xlim
+        width, _ = self.plot_backend.plot_size()
+        self.view = (xmin, xmax, width)
+
+        if self.y is not None and len(self.y) == len(self.x):
+            self.plot_backend.set_line(*self._decimate(self.y, self.pyramid))
+
+    def _decimate(self, y, pyramid):
+        """Decimate y to the view, from its pyramid if it has one."""
+        if pyramid is None:
+            return decimate_view(self.x, y, self.view)
+        return pyramid.decimate(self.x, y, self.view)
 
     ################
     # Event handlers
     ################
 
-    def on_mousedown(self, event):
-        """store event info for single click."""
-        self.last_click_evt = event
-
-    def on_mouseup(self, event):
-        """Determine if mouse event was single click or click-and-drag."""
-        if abs(self.last_click_evt.x - event.x) >= 5:
-            # mouse was clicked and dragged more than 5 pxls, set a span
-            self.span = self.subplot.axvspan(self.last_click_evt.xdata,
-                                             event.xdata,
-                                             color='red',
-                                             alpha=0.2,
-                                             # play nice with blitting:
-                                             animated=True)
-
-            xdata_points = [self.last_click_evt.xdata, event.xdata]
-            # always set left bound as lower value
-            self.span_left, self.span_right = sorted(xdata_points)
-        else:
-            # caught single click, clear span
-            if self.subplot.patches:
-                self.span.remove()
-                self.subplot.patches = []
-                self.span = self.span_left = self.span_right = None
+    def on_resize(self):
+        """Re-decimate the line to the new plot width."""
+        if self.xlim is not None:
+            self._update_view()
+
+    def set_span(self, left, right):
+        """Bound peak search to a span of frequencies."""
+        # always set left bound as lower value
+        self.span_left, self.span_right = sorted([left, right])
+        self.plot_backend.set_span(self.span_left, self.span_right)
+
+    def clear_span(self):
+        self.span_left = self.span_right = None
+        self.plot_backend.set_span(None, None)
+
+    def zoom(self, steps, center):
+        """Zoom in by steps of the mouse wheel (out if negative), keeping
+        frequency center where it is on the plot."""
+        if self.xlim is None or self.x is None or len(self.x) < 2:
+            return
+        xmin, xmax = self.xlim
+        full_min, full_max = self.full_xlim
+        min_width = self.MIN_ZOOM_BINS * (self.x[1] - self.x[0])
+        width = (xmax - xmin) * self.ZOOM_STEP ** -steps
+        width = min(max(width, min_width), full_max - full_min)
+        center = min(max(center, xmin), xmax)
+        left = center - (center - xmin) * width / (xmax - xmin)
+        self._show_range(left, width)
+
+    def pan(self, steps):
+        """Pan toward higher frequencies by steps of the mouse wheel (lower
+        if negative)."""
+        if self.xlim is None:
+            return
+        xmin, xmax = self.xlim
+        width = xmax - xmin
+        self._show_range(xmin + steps * self.PAN_STEP * width, width)
+
+    def reset_zoom(self):
+        if self.full_xlim is not None and self.xlim != self.full_xlim:
+            self.set_xlim(self.full_xlim)
+
+    def _show_range(self, left, width):
+        """Show width Hz from left, kept within the full span."""
+        full_min, full_max = self.full_xlim
+        left = min(max(left, full_min), full_max - width)
+        xlim = (left, left + width)
+        if xlim != self.xlim:
+            self.set_xlim(xlim)
+
+    def on_render_timer(self, event):
+        """Draw the latest trace, or keep markers alive while idle."""
+        slot = self.mailbox.take()
+        if slot is not None:
+            # The slot goes back to the flowgraph on the next take, so keep a
+            # copy of the full resolution trace for markers and peak search
+            self.update_plot(np.array(slot.points),
+                             slot.x,
+                             slot.info,
+                             slot.xd,
+                             slot.yd,
+                             slot.view,
+                             slot.pyramid,
+                             slot.redraw,
+                             keep_alive=False)
+            return
 
-    def idle_notifier(self, event):
-        self.tb.plot_iface.set_gui_idle()
+        running = self.tb.single_run.is_set() or self.tb.continuous_run.is_set()
+        now = time.time()
+        if (self.y is not None and not running and
+            now - self.last_keep_alive >= self.KEEP_ALIVE_INTERVAL):
+            self.last_keep_alive = now
+            self.update_plot(None, None, None, None, None, None, None, False,
+                             keep_alive=True)
 
     def set_continuous_run(self, event):
+        self.tb.apply_reconfigure()
         self.tb.pending_cfg.export_raw_time_data = False
         self.tb.pending_cfg.export_raw_fft_data = False
         self.tb.pending_cfg.continuous_run = True
         self.tb.set_continuous_run()
 
     def set_single_run(self, event):
+        self.tb.apply_reconfigure()
         self.tb.pending_cfg.continuous_run = False
         self.tb.set_single_run()
 
+    def apply_config(self, event):
+        self.tb.apply_reconfigure()
+
     @staticmethod
     def _verify_data_dir(dir):
         if not os.path.exists(dir):
             os.makedirs(dir)
 
     def export_time_data(self, event):
-        if (self.tb.single_run.is_set() or self.tb.continuous_run.is_set()):
+        running = (self.tb.single_run.is_set() or
+                   self.tb.continuous_run.is_set())
+        if running and not self.tb.cfg.iq_ring:
             msg = "Can't export data while the flowgraph is running."
             msg += " Use \"single\" run mode."
             self.logger.error(msg)
             return
         else:
-            if not self.tb.timedata_sink.data():
+            if not self.tb.has_time_data():
                 self.logger.warn("No more time data to export")
                 return
 
-            # creates path string 'data/time_data_01_TIMESTAMP.dat'
+            # creates path string 'data/time_data_01_TIMESTAMP.sigmf-meta'
             dirname = "data"
             self._verify_data_dir(dirname)
             fname = str.join('', ('time_data_',
                                   str(self.time_data_export_counter).zfill(2),
                                   '_',
                                   str(int(time.time())),
-                                  '.dat'))
+                                  '.sigmf-meta'))
 
-            wildcard = "Data and Settings files (*.dat; *.mat)|*.dat;*.mat"
+            wildcard = "SigMF recordings (*.sigmf-meta)|*.sigmf-meta|"
+            wildcard += "MATLAB v7.3 MAT-files (*.mat)|*.mat"
             style = wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT
             filepath_dialog = wx.FileDialog(self,
                                             message="Save As",
@@ -478,20 +505,20 @@ class wxpygui_frame(wx.Frame):
             self.logger.error(msg)
             return
         else:
-            if not self.tb.freqdata_sink.data():
+            if not self.tb.has_freq_data():
                 self.logger.warn("No more FFT data to export")
                 return False
 
-            # creates path string 'data/fft_data_01_TIMESTAMP.dat'
+            # creates path string 'data/fft_data_01_TIMESTAMP.mat'
             dirname = "data"
             self._verify_data_dir(dirname)
             fname = str.join('', ('fft_data_',
                                   str(self.fft_data_export_counter).zfill(2),
                                   '_',
                                   str(int(time.time())),
-                                  '.dat'))
+                                  '.mat'))
 
-            wildcard = "Data and Settings files (*.dat; *.mat)|*.dat;*.mat"
+            wildcard = "MATLAB v7.3 MAT-files (*.mat)|*.mat"
             style = wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT
             filepath_dialog = wx.FileDialog(self,
                                             message="Save As",
@@ -511,6 +538,10 @@ class wxpygui_frame(wx.Frame):
     def close(self, event):
         """Handle a closed gui window."""
         self.closed = True
+        self.render_timer.Stop()
+        msg = "Drew {rendered} of {written} traces ({dropped} dropped)"
+        self.logger.info(msg.format(**self.mailbox.counts()))
+        self.threshold_monitor.close()
         self.tb.stop()
         self.tb.wait()
         self.Destroy()
@@ -1,278 +1,316 @@
+import time
 import wx
 import numpy as np
 
 import utils
+from markers import marker_set, NORMAL, DELTA, PEAK
 
 
-class mkr_peaksearch_btn(wx.Button):
-    """A button to move the marker to the current peak power."""
-    def __init__(self, frame, marker, txtctrl):
-        wx.Button.__init__(self,
-                           frame,
-                           wx.ID_ANY,
-                           "Peak",
-                           style=wx.BU_EXACTFIT)
+KIND_NAMES = {NORMAL: "Normal", DELTA: "Delta", PEAK: "Peak"}
+LABEL_PREFIX = {NORMAL: "M", DELTA: u"\u0394", PEAK: "P"}
 
-        self.Bind(wx.EVT_BUTTON,
-                  lambda evt, txt=txtctrl: marker.peak_search(evt, txt))
 
-
-class mkr_left_btn(wx.Button):
-    """A button to step the marker one bin to the left."""
-    def __init__(self, frame, marker, txtctrl, label):
+class mkr_btn(wx.Button):
+    """A button that runs a marker action."""
+    def __init__(self, frame, label, action):
         wx.Button.__init__(self,
                            frame,
                            wx.ID_ANY,
                            label=label,
                            style=wx.BU_EXACTFIT)
 
-        self.Bind(wx.EVT_BUTTON,
-                  lambda evt, txt=txtctrl: marker.step_left(evt, txt))
-
-
-class mkr_right_btn(wx.Button):
-    """A button to step the marker one bin to the right."""
-    def __init__(self, frame, marker, txtctrl, label):
-        wx.Button.__init__(self,
-                           frame,
-                           wx.ID_ANY,
-                           label=label,
-                           style=wx.BU_EXACTFIT)
-
-        self.Bind(wx.EVT_BUTTON,
-                  lambda evt, txt=txtctrl: marker.step_right(evt, txt))
-
-
-class mkr_clear_btn(wx.Button):
-    """A button to clear the marker."""
-    def __init__(self, frame, marker, txtctrl):
-        wx.Button.__init__(self,
-                           frame,
-                           wx.ID_ANY,
-                           "Clear",
-                           style=wx.BU_EXACTFIT)
-
-        self.Bind(wx.EVT_BUTTON,
-                  lambda evt, txt=txtctrl: marker.clear(evt, txt))
+        self.Bind(wx.EVT_BUTTON, lambda evt: action())
 
 
 class mkr_txtctrl(wx.TextCtrl):
-    """Input TxtCtrl for setting a marker frequency."""
-    def __init__(self, frame, marker, id_):
-        wx.TextCtrl.__init__(self, frame, id=id_, style=wx.TE_PROCESS_ENTER)
-        self.Bind(wx.EVT_KILL_FOCUS, marker.jump)
-        self.Bind(wx.EVT_TEXT_ENTER, marker.jump)
-
-
-class marker(object):
-    """A SpecAn-style visual marker that follows the power level at a freq."""
-    def __init__(self, frame, id_, color, shape):
-        self.frame = frame
-        self.color = color
-        self.shape = shape
-        self.n = id_ # 1 for MKR1, 2 for MKR2
-        self.units = "MHz"
-        self.size = 8
-        self.point = None
-        self.text_label = None
-        self.text_power = None
-        self.freq = None
-        self.bin_idx = None
-
-    def find_nearest(self, value):
-        """Find the index of the closest matching value in an array."""
-        bin_freqs = self.frame.tb.cfg.bin_freqs
-        idx = self.frame.tb.cfg.find_nearest(bin_freqs, value)
-
-        return (idx, bin_freqs[idx])
-
-    def unplot(self):
-        """Remove marker and related text from the plot."""
-        self.freq = None
-        self.bin_idx = None
-        if self.point is not None:
-            self.point.remove()
-            self.frame.figure.texts.remove(self.text_label)
-            self.frame.figure.texts.remove(self.text_power)
-            self.point = self.text_label = self.text_power = None
+    """Input TxtCtrl for setting the selected marker's frequency."""
+    def __init__(self, frame):
+        wx.TextCtrl.__init__(self, frame, id=wx.ID_ANY,
+                             style=wx.TE_PROCESS_ENTER)
+        self.markers = frame.markers
+        self.shown = "" # last value set, so an unedited value isn't rounded
+        self.Bind(wx.EVT_KILL_FOCUS, self.jump)
+        self.Bind(wx.EVT_TEXT_ENTER, self.jump)
+
+    def show(self, value):
+        if not self.HasFocus():
+            self.shown = value
+            self.SetValue(value)
 
     def jump(self, event):
         """Handle frequency change from the marker TxtCtrl."""
-        evt_obj = event.GetEventObject()
-        temp_freq = evt_obj.GetValue()
+        event.Skip()
+        if self.GetValue() == self.shown:
+            return
         try:
             # MHz to Hz. Will raise ValueError if not a number
-            temp_freq = float(temp_freq) * 1e6
+            freq = float(self.GetValue()) * 1e6
         except ValueError:
-            if temp_freq == "":
+            if self.GetValue() == "":
                 # Let the user remove the marker
-                self.unplot()
-                return
-            else:
-                temp_freq = self.freq # reset to last known good value
-                if temp_freq is None:
-                    return
-
-        bin_freqs = self.frame.tb.cfg.bin_freqs
-        idx = utils.find_nearest(bin_freqs, temp_freq)
-        freq = bin_freqs[idx]
-
-        if freq != self.freq:
-            self.bin_idx = idx
-            self.freq = freq
-            self.plot()
-
-        evt_obj.SetValue(self.get_freq_str())
-
-    def get_freq_str(self):
-        """Format the current marker's freq with 2 digits precision."""
-        freq = "{:.2f}".format(self.freq / 1e6)
-        return freq
-
-    def plot(self):
-        """Plot the marker and related text."""
-        mkr_num = "MKR{}".format(self.n) # self.n is set to 1 or 2
-        label = mkr_num + "\n " + self.get_freq_str() + " " + self.units
-
-        mkr_xcoords = [0, 0.15, 0.77]
-
-        if self.point is None:
-            self.point, = self.frame.subplot.plot([self.freq], # x value
-                                                  [0], # set by update_line
-                                                  marker=self.shape,
-                                                  markerfacecolor=self.color,
-                                                  markersize=self.size,
-                                                  # draw above grid lines:
-                                                  zorder=99,
-                                                  animated=True,
-                                                  visible=False)
-
-            self.text_label = self.frame.figure.text(mkr_xcoords[self.n], # x
-                                                     0.83, # y
-                                                     label,
-                                                     color='green',
-                                                     animated=True,
-                                                     visible=False,
-                                                     size=11)
-
-            self.text_power = self.frame.figure.text(mkr_xcoords[self.n], # x
-                                                     0.80, # y location
-                                                     "", # set by update_plot
-                                                     color='green',
-                                                     visible=False,
-                                                     animated=True,
-                                                     size=11)
-        else:
-            self.point.set_xdata([self.freq])
-            self.text_label.set_text(label)
-
-    def step_left(self, event, txtctrl):
-        """Step the marker 1 bin to the left."""
-        if self.bin_idx: #is not None or 0
-            self.bin_idx -= 1
-            self.freq = self.frame.tb.cfg.bin_freqs[self.bin_idx]
-            txtctrl.SetValue(self.get_freq_str())
-            self.plot()
-
-    def step_right(self, event, txtctrl):
-        """Step the marker 1 bin to the right."""
-        if (self.bin_idx is not None and
-            self.bin_idx < len(self.frame.tb.cfg.bin_freqs) - 1):
-
-            self.bin_idx += 1
-            self.freq = self.frame.tb.cfg.bin_freqs[self.bin_idx]
-            txtctrl.SetValue(self.get_freq_str())
-            self.plot()
-
-    def clear(self, event, txtctrl):
-        """Clear a marker."""
-        self.unplot()
-        txtctrl.Clear()
-
-    def peak_search(self, event, txtctrl):
-        """Find the point of max power in the whole plot or within a span."""
-        bin_freqs = self.frame.tb.cfg.bin_freqs
-        if self.frame.span_left and self.frame.span_right:
-            left_idx = utils.find_nearest(bin_freqs, self.frame.span_left)
-            right_idx = utils.find_nearest(bin_freqs, self.frame.span_right)
-            power_data = self.frame.line.get_ydata()[left_idx:right_idx]
-        else:
-            left_idx = 0
-            right_idx = utils.find_nearest(bin_freqs, self.frame.tb.cfg.max_freq)
-            power_data = self.frame.line.get_ydata()[:right_idx]
+                self.markers.remove_selected()
+            freq = None
+
+        if freq is not None:
+            self.markers.jump(freq)
+        self.shown = None # show the marker's value even if unchanged
+        self.markers.refresh_ctrls()
+
+
+class marker_table(wx.ListCtrl):
+    """A readout of every marker, one row each."""
+    COLUMNS = (("Marker", 55), ("Type", 55), ("MHz", 90), ("dBm", 70))
+
+    def __init__(self, frame):
+        wx.ListCtrl.__init__(self,
+                             frame,
+                             wx.ID_ANY,
+                             size=(280, 120),
+                             style=wx.LC_REPORT|wx.LC_SINGLE_SEL)
+        for col, (heading, width) in enumerate(self.COLUMNS):
+            self.InsertColumn(col, heading, width=width)
+
+        self.markers = frame.markers
+        self.rows = [] # what's shown, to only set cells that changed
+        self.Bind(wx.EVT_LIST_ITEM_SELECTED, self.on_select)
+
+    def show(self, rows, selected_row):
+        """Show rows of cell strings, selecting row selected_row."""
+        while self.GetItemCount() > len(rows):
+            self.DeleteItem(self.GetItemCount() - 1)
+        while self.GetItemCount() < len(rows):
+            self.InsertStringItem(self.GetItemCount(), "")
+
+        for i, row in enumerate(rows):
+            old = self.rows[i] if i < len(self.rows) else ("",) * len(row)
+            for col, text in enumerate(row):
+                if text != old[col]:
+                    self.SetStringItem(i, col, text)
+        self.rows = rows
+
+        if (selected_row is not None and
+            selected_row != self.GetFirstSelected()):
+            self.Select(selected_row)
+
+    def on_select(self, event):
+        self.markers.select(event.GetIndex())
+
+
+class markers(object):
+    """The frame's markers, drawn with every trace and read out in a table.
+
+    Marker powers are gathered from each trace at once by a marker_set. The
+    table only changes at TABLE_FPS, or straight away when a marker is added,
+    moved or removed, so markers cost little however many there are.
+    """
+    TABLE_FPS = 4 # table refreshes per second, at most
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.set = marker_set()
+        self.selected = None # id of the marker the controls act on
+
+        self.labels = [] # plot label of each marker
+        self.labels_version = None # set version the labels were made for
+
+        self.readings = None # marker_readings of the last trace drawn
+        self.table = None # set by ctrls
+        self.txtctrl = None
+        self.table_version = None
+        self.last_table_update = 0
+
+    ####################
+    # Actions
+    ####################
+
+    def _span_bins(self):
+        """Return the (lo, hi) bins of the selected span, or None."""
+        frame = self.frame
+        if frame.span_left is None or frame.span_right is None:
+            return None
+        lo = utils.find_nearest(frame.x, frame.span_left)
+        hi = utils.find_nearest(frame.x, frame.span_right) + 1
+        return (int(lo), int(hi))
+
+    def _peak_bin(self, window):
+        """Return the bin of the max power in window, or None."""
+        y = self.frame.y
+        if y is None:
+            return None
+        lo, hi = window if window is not None else (0, len(y))
+        if hi <= lo:
+            # User selected an area with no data in it; do nothing
+            return None
         try:
-            relative_idx = np.where(power_data == np.amax(power_data))[0][0]
+            # the NaN bins of a progressive trace not swept yet are skipped
+            return lo + int(np.nanargmax(y[lo:hi]))
         except ValueError:
-            # User selected an area with no data in it; do nothing
-            return
-        # add the left index offset to get the absolute index
-        self.bin_idx = relative_idx + left_idx
-        self.freq = self.frame.tb.cfg.bin_freqs[self.bin_idx]
-        txtctrl.SetValue(self.get_freq_str())
-        self.plot()
+            return None
 
+    def add(self, kind):
+        """Add a marker at the peak of the span or the whole trace.
 
-class mkr1_ctrls(object):
-    def __init__(self, frame):
-        """Initialize gui controls for mkr1."""
-        mkr1 = frame.mkr1
-        mkr1_txtctrl = mkr_txtctrl(frame, mkr1, 1)
-        mkr1_box = wx.StaticBox(frame, wx.ID_ANY, "Marker 1 (MHz)")
-        self.layout = wx.StaticBoxSizer(mkr1_box, wx.VERTICAL)
-        self.layout.Add(mkr_peaksearch_btn(frame, mkr1, mkr1_txtctrl),
-                        proportion=0,
-                        flag=wx.ALL|wx.ALIGN_CENTER,
-                        border=5)
-
-        mkr1_hbox = wx.BoxSizer(wx.HORIZONTAL)
-        mkr1_hbox.Add(mkr_left_btn(frame, mkr1, mkr1_txtctrl, '<'),
-                      flag=wx.LEFT,
-                      border=5)
+        A delta marker reads relative to the selected marker, and a peak
+        marker keeps following the peak of the span it was added in.
+        """
+        window = self._span_bins()
+        bin_idx = self._peak_bin(window)
+        if bin_idx is None:
+            return
+        if kind == DELTA:
+            if self.selected is None:
+                return
+            self.selected = self.set.add(DELTA, bin_idx, ref=self.selected)
+        else:
+            self.selected = self.set.add(kind, bin_idx, window=window)
+        self.refresh_ctrls()
 
-        mkr1_hbox.Add(mkr1_txtctrl,
-                      proportion=1,
-                      flag=wx.EXPAND,
-                      border=1)
+    def select(self, row):
+        if 0 <= row < len(self.set):
+            self.selected = self.set.ids[row]
+            self.refresh_ctrls()
 
-        mkr1_hbox.Add(mkr_right_btn(frame, mkr1, mkr1_txtctrl, '>'),
-                      flag=wx.RIGHT,
-                      border=5)
+    def remove_selected(self):
+        if self.selected is None:
+            return
+        self.set.remove(self.selected)
+        self.selected = self.set.ids[-1] if len(self.set) else None
+        self.refresh_ctrls()
+
+    def clear(self):
+        self.set.clear()
+        self.selected = None
+        self.refresh_ctrls()
+
+    def _move(self, bin_idx):
+        nbins = len(self.frame.x)
+        self.set.move(self.selected, min(max(bin_idx, 0), nbins - 1))
+        self.refresh_ctrls()
+
+    def step(self, nbins):
+        """Step the selected marker nbins to the right (left if negative)."""
+        if self.selected is not None:
+            self._move(self.set.bin_of(self.selected) + nbins)
+
+    def jump(self, freq):
+        """Move the selected marker to the bin nearest freq."""
+        if self.selected is not None:
+            self._move(utils.find_nearest(self.frame.x, freq))
+
+    def peak_search(self):
+        """Move the selected marker to the peak of the span or whole trace."""
+        if self.selected is None:
+            return
+        bin_idx = self._peak_bin(self._span_bins())
+        if bin_idx is not None:
+            self._move(bin_idx)
+
+    ####################
+    # Drawing
+    ####################
+
+    def draw(self, y, track):
+        """Place the markers on trace y. With track, peak markers move to
+        the current peak."""
+        if not len(self.set):
+            if self.readings is not None:
+                # the last marker was just removed
+                self.readings = None
+                self.frame.plot_backend.set_markers([], [], [])
+                self._update_table()
+            return
 
-        self.layout.Add(mkr1_hbox, flag=wx.ALIGN_CENTER)
-        self.layout.Add(mkr_clear_btn(frame, mkr1, mkr1_txtctrl),
-                        proportion=0,
-                        flag=wx.ALL|wx.ALIGN_CENTER,
-                        border=5)
+        readings = self.set.read(y, track)
+        self.readings = readings
+        if self.labels_version != self.set.version:
+            self.labels = [LABEL_PREFIX[kind] + str(id_)
+                           for id_, kind in zip(readings.ids, readings.kinds)]
+            self.labels_version = self.set.version
+        self.frame.plot_backend.set_markers(self.frame.x[readings.bins],
+                                            readings.powers,
+                                            self.labels)
+
+        now = time.time()
+        if (self.table_version != self.set.version or
+            now - self.last_table_update >= 1.0 / self.TABLE_FPS):
+            self.last_table_update = now
+            self._update_table()
+
+    def refresh_ctrls(self):
+        """Show marker changes right away, rather than with the next trace."""
+        y = self.frame.y
+        if y is not None:
+            self.draw(y, track=False)
+        else:
+            self._update_table()
 
+    def _update_table(self):
+        if self.table is None:
+            return
+        self.table_version = self.set.version
+
+        readings = self.readings
+        rows = []
+        selected_row = None
+        if readings is not None:
+            freqs = self.frame.x[readings.bins]
+            for i, (id_, kind) in enumerate(zip(readings.ids,
+                                                readings.kinds)):
+                if id_ == self.selected:
+                    selected_row = i
+                if kind == DELTA:
+                    offset = freqs[i] - freqs[readings.refs[i]]
+                    freq = u"\u0394{:+.3f}".format(offset / 1e6)
+                    value = "{:+.2f} dB".format(readings.values[i])
+                else:
+                    freq = "{:.3f}".format(freqs[i] / 1e6)
+                    value = "{:.2f}".format(readings.values[i])
+                rows.append((LABEL_PREFIX[kind] + str(id_),
+                             KIND_NAMES[kind],
+                             freq,
+                             value))
+        self.table.show(rows, selected_row)
+
+        if self.txtctrl is not None:
+            if selected_row is None:
+                self.txtctrl.show("")
+            else:
+                self.txtctrl.show("{:.3f}".format(freqs[selected_row] / 1e6))
 
-class mkr2_ctrls(object):
+
+class ctrls(object):
     def __init__(self, frame):
-        """Initialize gui controls for mkr2."""
-        mkr2 = frame.mkr2
-        mkr2_txtctrl = mkr_txtctrl(frame, mkr2, 2)
-        mkr2_box = wx.StaticBox(frame, wx.ID_ANY, "Marker 2 (MHz)")
-        self.layout = wx.StaticBoxSizer(mkr2_box, wx.VERTICAL)
-        self.layout.Add(mkr_peaksearch_btn(frame, mkr2, mkr2_txtctrl),
-                        proportion=0,
-                        flag=wx.ALL|wx.ALIGN_CENTER,
-                        border=5)
-
-        mkr2_hbox = wx.BoxSizer(wx.HORIZONTAL)
-        mkr2_hbox.Add(mkr_left_btn(frame, mkr2, mkr2_txtctrl, '<'),
+        """Initialize gui controls for markers."""
+        markers = frame.markers
+        ctrl_box = wx.StaticBox(frame, wx.ID_ANY, "Markers")
+        self.layout = wx.StaticBoxSizer(ctrl_box, wx.VERTICAL)
+
+        add_hbox = wx.BoxSizer(wx.HORIZONTAL)
+        add_hbox.Add(mkr_btn(frame, "Add", lambda: markers.add(NORMAL)))
+        add_hbox.Add(mkr_btn(frame, "Delta", lambda: markers.add(DELTA)))
+        add_hbox.Add(mkr_btn(frame, "Track peak",
+                             lambda: markers.add(PEAK)))
+        self.layout.Add(add_hbox, flag=wx.ALL|wx.ALIGN_CENTER, border=5)
+
+        markers.table = marker_table(frame)
+        self.layout.Add(markers.table, flag=wx.LEFT|wx.RIGHT, border=5)
+
+        markers.txtctrl = mkr_txtctrl(frame)
+        move_hbox = wx.BoxSizer(wx.HORIZONTAL)
+        move_hbox.Add(mkr_btn(frame, "<", lambda: markers.step(-1)),
                       flag=wx.LEFT,
                       border=5)
-
-        mkr2_hbox.Add(mkr2_txtctrl,
+        move_hbox.Add(markers.txtctrl,
                       proportion=1,
                       flag=wx.EXPAND,
                       border=1)
-
-        mkr2_hbox.Add(mkr_right_btn(frame, mkr2, mkr2_txtctrl, '>'),
+        move_hbox.Add(mkr_btn(frame, ">", lambda: markers.step(1)),
                       flag=wx.RIGHT,
                       border=5)
+        move_hbox.Add(mkr_btn(frame, "Peak", markers.peak_search))
+        self.layout.Add(move_hbox, flag=wx.TOP|wx.ALIGN_CENTER, border=5)
 
-        self.layout.Add(mkr2_hbox, flag=wx.ALIGN_CENTER)
-        self.layout.Add(mkr_clear_btn(frame, mkr2, mkr2_txtctrl),
-                        proportion=0,
-                        flag=wx.ALL|wx.ALIGN_CENTER,
-                        border=5)
+        clear_hbox = wx.BoxSizer(wx.HORIZONTAL)
+        clear_hbox.Add(mkr_btn(frame, "Remove", markers.remove_selected))
+        clear_hbox.Add(mkr_btn(frame, "Clear all", markers.clear))
+        self.layout.Add(clear_hbox, flag=wx.ALL|wx.ALIGN_CENTER, border=5)
@@ -0,0 +1,195 @@
+import wx
+import numpy as np
+import matplotlib
+matplotlib.use('WXAgg')
+from matplotlib.backends.backend_wxagg import FigureCanvasWxAgg as FigureCanvas
+from matplotlib.figure import Figure
+from matplotlib.ticker import FuncFormatter
+
+from gui.plot_backend import plot_backend
+
+
+class mpl_backend(plot_backend):
+    """Plot with matplotlib, blitting animated artists over a cached
+    background."""
+
+    def __init__(self, frame):
+        plot_backend.__init__(self, frame)
+
+        self.panel = wx.Panel(frame, wx.ID_ANY, size=(700, 600))
+        self.figure = Figure(figsize=(7, 6), dpi=100)
+        self.figure.subplots_adjust(right=.95)
+        self.canvas = FigureCanvas(self.panel, -1, self.figure)
+        self.ax = self.figure.add_subplot(111)
+
+        # Every artist is animated so it's left out of the background and
+        # only drawn by render()
+        self.image = self.ax.imshow(np.full((1, 1), np.nan),
+                                    animated=True,
+                                    visible=False,
+                                    aspect='auto',
+                                    origin='lower',
+                                    interpolation='nearest',
+                                    cmap='YlOrRd',
+                                    vmin=0,
+                                    vmax=1,
+                                    zorder=1) # below the trace
+        self.line, = self.ax.plot([], [],
+                                  animated=True,
+                                  antialiased=True,
+                                  linestyle='-',
+                                  color='b')
+        # all markers are one artist, labelled by one text each
+        self.marker_points, = self.ax.plot([], [],
+                                           animated=True,
+                                           linestyle='None',
+                                           marker='d',
+                                           markerfacecolor='#00FF00',
+                                           markersize=8,
+                                           # draw above grid lines:
+                                           zorder=99)
+        self.marker_labels = []
+        self.threshold = None
+        self.span = None
+
+        self.background = None
+        self.last_click_evt = None
+
+        self.canvas.mpl_connect('button_press_event', self.on_mousedown)
+        self.canvas.mpl_connect('button_release_event', self.on_mouseup)
+        self.canvas.mpl_connect('resize_event', self.on_resize)
+        self.canvas.mpl_connect('scroll_event', self.on_scroll)
+
+    def format_axis(self, xlim, ylim, xticks, yticks, xformatter):
+        ax = self.ax
+        ax.xaxis.set_major_formatter(FuncFormatter(xformatter))
+        ax.set_xlabel("Frequency (MHz)")
+        ax.set_ylabel("Power (dBm)")
+        ax.set_xlim(*xlim)
+        ax.set_ylim(*ylim)
+        ax.set_xticks(xticks)
+        ax.set_yticks(yticks)
+        ax.grid(color='.90', linestyle='-', linewidth=1)
+        ax.set_title("Power Spectrum")
+
+        self._update_background()
+
+    def _update_background(self):
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+
+    def plot_size(self):
+        bbox = self.ax.bbox
+        return max(int(bbox.width), 1), max(int(bbox.height), 1)
+
+    def set_line(self, x, y):
+        self.line.set_data(x, y)
+
+    def set_density(self, density, extent):
+        if density is None:
+            self.image.set_visible(False)
+            return
+        self.image.set_data(density)
+        self.image.set_extent(extent)
+        self.image.set_visible(True)
+
+    def set_threshold(self, level):
+        if self.threshold is not None:
+            self.threshold.remove()
+            self.threshold = None
+        if level is not None:
+            self.threshold = self.ax.axhline(level,
+                                             color='red',
+                                             # play nice with blitting:
+                                             animated=True,
+                                             # draw above grid lines:
+                                             zorder=90)
+
+    def set_span(self, left, right):
+        if self.span is not None:
+            self.span.remove()
+            self.span = None
+        if left is not None:
+            self.span = self.ax.axvspan(left,
+                                        right,
+                                        color='red',
+                                        alpha=0.2,
+                                        # play nice with blitting:
+                                        animated=True)
+
+    def set_markers(self, x, y, labels):
+        self.marker_points.set_data(x, y)
+
+        # reuse the text artists, only adding or removing the difference
+        while len(self.marker_labels) > len(labels):
+            self.marker_labels.pop().remove()
+        while len(self.marker_labels) < len(labels):
+            self.marker_labels.append(self.ax.text(0, 0, "",
+                                                   color='green',
+                                                   animated=True,
+                                                   size=10,
+                                                   clip_on=True))
+        for text, xi, yi, label in zip(self.marker_labels, x, y, labels):
+            text.set_position((xi, yi + 2))
+            text.set_text(label)
+
+    def render(self):
+        if self.background is None:
+            return
+
+        # Required for plot blitting
+        self.canvas.restore_region(self.background)
+
+        if self.image.get_visible():
+            self.ax.draw_artist(self.image)
+        self.ax.draw_artist(self.line)
+        if self.span is not None:
+            self.ax.draw_artist(self.span)
+        if self.threshold is not None:
+            self.ax.draw_artist(self.threshold)
+        self.ax.draw_artist(self.marker_points)
+        for text in self.marker_labels:
+            self.ax.draw_artist(text)
+
+        # blit canvas
+        self.canvas.blit(self.ax.bbox)
+
+    ################
+    # Event handlers
+    ################
+
+    def on_resize(self, event):
+        self._update_background()
+        self.frame.on_resize()
+
+    def on_mousedown(self, event):
+        """store event info for single click."""
+        if event.button == 3:
+            self.frame.reset_zoom()
+            return
+        self.last_click_evt = event
+
+    def on_mouseup(self, event):
+        """Determine if mouse event was single click or click-and-drag."""
+        if event.button == 3:
+            return
+        start = self.last_click_evt
+        if start is None or start.xdata is None or event.xdata is None:
+            return # clicked or released outside the plot
+
+        if abs(start.x - event.x) >= 5:
+            # mouse was clicked and dragged more than 5 pxls, set a span
+            self.frame.set_span(start.xdata, event.xdata)
+        else:
+            # caught single click, clear span
+            self.frame.clear_span()
+
+    def on_scroll(self, event):
+        """Zoom around the pointer, or pan with shift held."""
+        if event.xdata is None:
+            return # scrolled outside the plot
+        steps = 1 if event.button == 'up' else -1
+        if event.key == 'shift':
+            self.frame.pan(steps)
+        else:
+            self.frame.zoom(steps, event.xdata)
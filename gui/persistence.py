@@ -0,0 +1,90 @@
+import time
+import wx
+import numpy as np
+
+from density import density_histogram
+
+
+class persistence(object):
+    """A persistence display drawn behind the trace.
+
+    Traces are accumulated from the flowgraph's thread, which also renders
+    the density image at most MAX_FPS times per second. The gui thread only
+    hands the latest image to the plot backend.
+    """
+    MAX_FPS = 20
+    DEFAULT_HALF_LIFE = 10 # traces
+
+    def __init__(self, frame, half_life):
+        self.frame = frame
+        self.enabled = half_life is not None
+        self.half_life = half_life or self.DEFAULT_HALF_LIFE
+        self.nrows = None # plot height in pixels, set by format_axis
+
+        self.hist = None
+        self.rendered = None # (density, extent) for the gui thread
+        self.last_render = 0
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        self.hist = None
+        self.rendered = None
+        self.frame.plot_backend.set_density(None, None)
+
+    def push(self, x, y, view):
+        """Accumulate trace y. Called from the flowgraph's thread."""
+        if not self.enabled or self.nrows is None:
+            return
+
+        power_range = (self.frame.min_power, self.frame.max_power)
+        hist = self.hist
+        if (hist is None or hist.view != view or
+            hist.power_range != power_range or hist.nrows != self.nrows):
+            hist = density_histogram(x, view, power_range, self.nrows,
+                                     self.half_life)
+            self.hist = hist
+        if hist.extent is None:
+            return
+
+        hist.add(y)
+
+        now = time.time()
+        if now - self.last_render >= 1.0 / self.MAX_FPS:
+            self.last_render = now
+            density = hist.density()
+            density[density < 1e-3] = np.nan # let the grid show through
+            xmin, xmax = hist.extent
+            extent = (xmin, xmax) + hist.power_range
+            self.rendered = (density, extent)
+
+    def format_axis(self):
+        """Size the histogram to the plot."""
+        _, self.nrows = self.frame.plot_backend.plot_size()
+
+    def draw(self):
+        """Hand the latest rendered density to the plot backend."""
+        rendered = self.rendered
+        if not self.enabled or rendered is None:
+            return
+
+        density, extent = rendered
+        self.frame.plot_backend.set_density(density, extent)
+
+
+class persistence_checkbox(wx.CheckBox):
+    """A checkbox to toggle the persistence display."""
+    def __init__(self, frame):
+        wx.CheckBox.__init__(self, frame, wx.ID_ANY, "Persistence")
+        self.frame = frame
+        self.SetValue(frame.persistence.enabled)
+        self.Bind(wx.EVT_CHECKBOX, self.update)
+
+    def update(self, event):
+        self.frame.persistence.set_enabled(self.GetValue())
+
+
+class ctrls(object):
+    def __init__(self, frame):
+        """Initialize gui controls for the persistence display."""
+        self.layout = wx.BoxSizer(wx.HORIZONTAL)
+        self.layout.Add(persistence_checkbox(frame), flag=wx.ALL, border=5)
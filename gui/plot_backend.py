@@ -0,0 +1,73 @@
+import logging
+
+
+class plot_backend(object):
+    """Whatever draws the power spectrum, behind one interface.
+
+    The frame owns the plot state (trace, markers, threshold, span) and tells
+    the backend about it through the set_* methods, which only record it.
+    Nothing is drawn until render(), so one frame costs one draw. All methods
+    are called from the gui thread.
+
+    A backend reports user input back to the frame by calling
+    frame.set_span(left, right) for a click-and-drag, frame.clear_span() for
+    a single click and frame.on_resize() after the plot changes size. The
+    mouse wheel calls frame.zoom(steps, x) around frequency x, or
+    frame.pan(steps) with shift held, and a right click frame.reset_zoom().
+    """
+    def __init__(self, frame):
+        self.frame = frame
+        self.panel = None # the wx window holding the plot, set by subclasses
+
+    def format_axis(self, xlim, ylim, xticks, yticks, xformatter):
+        """Set limits, ticks and labels. xformatter(x, pos) labels x ticks."""
+        raise NotImplementedError
+
+    def plot_size(self):
+        """Return the (width, height) of the data area in pixels."""
+        raise NotImplementedError
+
+    def set_line(self, x, y):
+        """Set the (decimated) trace."""
+        raise NotImplementedError
+
+    def set_density(self, density, extent):
+        """Set an image drawn behind the trace, or hide it if density is None.
+
+        density has values in [0, 1] and NaN where transparent, row 0 at the
+        bottom. extent is its (xmin, xmax, ymin, ymax) in data coordinates.
+        """
+        raise NotImplementedError
+
+    def set_threshold(self, level):
+        """Set the power of the threshold line, or hide it if None."""
+        raise NotImplementedError
+
+    def set_span(self, left, right):
+        """Set the frequency range of the span, or hide it if None."""
+        raise NotImplementedError
+
+    def set_markers(self, x, y, labels):
+        """Place a marker at each (x, y), labelled with the matching string
+        of labels. Empty arrays remove all markers."""
+        raise NotImplementedError
+
+    def render(self):
+        """Draw everything set so far."""
+        raise NotImplementedError
+
+
+def create(frame, name):
+    """Return the named plot backend, falling back to matplotlib."""
+    if name == "raster":
+        try:
+            from gui.raster_backend import raster_backend
+            return raster_backend(frame)
+        except (ImportError, AttributeError) as err:
+            # e.g. a wxPython without the bitmap buffer api
+            logger = logging.getLogger('gr-analyzer.plot_backend')
+            msg = "Raster plotting unavailable ({}), using matplotlib"
+            logger.warning(msg.format(err))
+
+    from gui.mpl_backend import mpl_backend
+    return mpl_backend(frame)
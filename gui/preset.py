@@ -0,0 +1,93 @@
+import wx
+
+
+class preset_dropdown(wx.ComboBox):
+    """Dropdown for switching between saved presets."""
+    def __init__(self, frame):
+        self.frame = frame
+
+        wx.ComboBox.__init__(self,
+                             frame,
+                             id=wx.ID_ANY,
+                             choices=frame.tb.presets.names(),
+                             style=wx.CB_READONLY)
+
+        _, height = self.GetSize()
+        self.SetMinSize((120, height))
+
+        if frame.tb.pending_preset is not None:
+            self.SetStringSelection(frame.tb.pending_preset)
+        self.Bind(wx.EVT_COMBOBOX, self.update)
+
+    def update(self, event):
+        """Switch to the preset selected by the user via dropdown."""
+        self.frame.tb.load_preset(self.GetValue())
+        self.frame.refresh_ctrls()
+
+    def refresh(self, selection=None):
+        """Reload the list of presets and optionally select one."""
+        self.SetItems(self.frame.tb.presets.names())
+        if selection is not None:
+            self.SetStringSelection(selection)
+
+
+class preset_save_btn(wx.Button):
+    """A button to save the current settings as a named preset."""
+    def __init__(self, frame, dropdown):
+        wx.Button.__init__(self,
+                           frame,
+                           wx.ID_ANY,
+                           label="Save",
+                           style=wx.BU_EXACTFIT)
+
+        self.frame = frame
+        self.dropdown = dropdown
+        self.Bind(wx.EVT_BUTTON, self.save)
+
+    def save(self, event):
+        """Prompt for a name and save the pending settings under it."""
+        dialog = wx.TextEntryDialog(self.frame,
+                                    "Preset name:",
+                                    "Save Preset",
+                                    self.dropdown.GetValue())
+
+        if dialog.ShowModal() == wx.ID_OK:
+            name = dialog.GetValue().strip()
+            if name:
+                self.frame.tb.save_preset(name)
+                self.dropdown.refresh(name)
+
+        dialog.Destroy()
+
+
+class preset_delete_btn(wx.Button):
+    """A button to delete the selected preset."""
+    def __init__(self, frame, dropdown):
+        wx.Button.__init__(self,
+                           frame,
+                           wx.ID_ANY,
+                           label="Delete",
+                           style=wx.BU_EXACTFIT)
+
+        self.frame = frame
+        self.dropdown = dropdown
+        self.Bind(wx.EVT_BUTTON, self.delete)
+
+    def delete(self, event):
+        name = self.dropdown.GetValue()
+        if name:
+            self.frame.tb.remove_preset(name)
+            self.dropdown.refresh()
+
+
+class ctrls(object):
+    def __init__(self, frame):
+        """Initialize gui controls for presets."""
+        box = wx.StaticBox(frame, wx.ID_ANY, "Presets")
+        self.layout = wx.StaticBoxSizer(box, wx.VERTICAL)
+        self.preset_dropdown = preset_dropdown(frame)
+        hbox = wx.BoxSizer(wx.HORIZONTAL)
+        hbox.Add(preset_save_btn(frame, self.preset_dropdown))
+        hbox.Add(preset_delete_btn(frame, self.preset_dropdown))
+        self.layout.Add(self.preset_dropdown, flag=wx.ALL, border=5)
+        self.layout.Add(hbox, flag=wx.ALL|wx.ALIGN_CENTER, border=5)
@@ -0,0 +1,190 @@
+import time
+import logging
+import threading
+
+from analyzer import trace_info
+from gui import plot_interface
+from presets import apply_settings, settings_of
+from remote import REMOTE_FIELDS
+from shmring import shared_trace_ring
+
+
+class _rpc(object):
+    """Call a command of the remote_plot_interface and wait for its reply."""
+    def __init__(self, conn):
+        self.conn = conn
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger('gr-analyzer.gui_process')
+
+    def __call__(self, command, *args):
+        with self.lock:
+            self.conn.send((command,) + args)
+            status, value = self.conn.recv()
+        if status != 'ok':
+            msg = "Command {!r} failed in the flowgraph process: {}"
+            self.logger.error(msg.format(command, value))
+            return None
+        return value
+
+
+class _run_state_event(object):
+    """Read-only threading.Event look-alike for the flowgraph's run mode."""
+    def __init__(self, ring_holder, index):
+        self.ring_holder = ring_holder
+        self.index = index
+
+    def is_set(self):
+        return self.ring_holder.ring.run_state()[self.index]
+
+
+class _remote_usrp(object):
+    def __init__(self, rpc):
+        self.rpc = rpc
+
+    def get_gain(self):
+        return self.rpc('get_gain')
+
+    def set_gain(self, gain):
+        self.rpc('set_gain', gain)
+
+
+class _remote_presets(object):
+    def __init__(self, rpc):
+        self.rpc = rpc
+
+    def names(self):
+        return self.rpc('preset_names') or []
+
+
+class tb_proxy(object):
+    """Stands in for the top_block in the gui process.
+
+    cfg and pending_cfg are local copies. Edits to pending_cfg are sent along
+    with every command that applies them, and cfg follows the flowgraph's
+    configure events.
+    """
+    def __init__(self, state, rpc):
+        self.rpc = rpc
+        self.ring = None # set by serve
+        # the configuration the top_block starts with
+        self.cfg = state.cfg
+        self.pending_cfg = state.pending_cfg
+        self.pending_preset = state.pending_preset
+        self.plot_iface = None
+
+        self.usrp = _remote_usrp(rpc)
+        self.presets = _remote_presets(rpc)
+        self.single_run = _run_state_event(self, 0)
+        self.continuous_run = _run_state_event(self, 1)
+
+    def _pending_settings(self):
+        return settings_of(self.pending_cfg, REMOTE_FIELDS)
+
+    def reconfigure(self, redraw_plot=False):
+        self.rpc('reconfigure', self._pending_settings(), redraw_plot)
+
+    def apply_reconfigure(self):
+        self.rpc('apply_reconfigure', self._pending_settings())
+
+    def set_single_run(self):
+        self.rpc('set_single_run', self._pending_settings())
+
+    def set_continuous_run(self):
+        self.rpc('set_continuous_run', self._pending_settings())
+
+    def load_preset(self, name):
+        settings = self.rpc('load_preset', name)
+        if settings is not None:
+            apply_settings(settings, self.pending_cfg)
+
+    def save_preset(self, name):
+        self.rpc('save_preset', name, self._pending_settings())
+
+    def remove_preset(self, name):
+        self.rpc('remove_preset', name)
+
+    def has_time_data(self):
+        return self.rpc('has_time_data')
+
+    def has_freq_data(self):
+        return self.rpc('has_freq_data')
+
+    def save_time_data_to_file(self, path):
+        self.rpc('save_time_data_to_file', path)
+
+    def save_freq_data_to_file(self, path):
+        self.rpc('save_freq_data_to_file', path)
+
+    def stop(self):
+        """The window was closed, stop the flowgraph."""
+        self.rpc('close')
+
+    def wait(self):
+        pass
+
+
+class gui_process(object):
+    """The main loop of the gui process.
+
+    Traces are read from the shared ring in this process's main thread and
+    handed to an ordinary plot_interface, so decimation, persistence and the
+    waterfall all run here, away from the flowgraph.
+    """
+    POLL_INTERVAL = 0.005 # seconds between checks for new traces
+
+    def __init__(self, state, ring_path, nslots, capacity, cmd_conn,
+                 evt_conn):
+        self.evt_conn = evt_conn
+        self.proxy = tb_proxy(state, _rpc(cmd_conn))
+        self.proxy.ring = shared_trace_ring(ring_path, nslots, capacity)
+        self.iface = self.proxy.plot_iface = plot_interface(self.proxy)
+
+        self.generation = 0 # of the configuration proxy.cfg reflects
+        self.last_seq = 0   # of the last trace read from the ring
+        self.closed = False
+
+    def handle(self, event):
+        """Apply an event from the flowgraph process."""
+        kind = event[0]
+        if kind == 'configure':
+            _, self.generation, settings = event
+            apply_settings(settings, self.proxy.cfg)
+            self.proxy.cfg.generation = self.generation
+            self.iface.configure(self.proxy.cfg)
+        elif kind == 'ring':
+            _, path, nslots, capacity = event
+            self.proxy.ring.close()
+            self.proxy.ring = shared_trace_ring(path, nslots, capacity)
+            self.last_seq = 0
+        elif kind == 'close':
+            self.closed = True
+
+    def run(self):
+        while self.iface.is_alive() and not self.closed:
+            while self.evt_conn.poll() and not self.closed:
+                self.handle(self.evt_conn.recv())
+
+            for seq, info, redraw, partial, points in \
+                    self.proxy.ring.read_since(self.last_seq):
+                self.last_seq = seq
+                info = trace_info(*info)
+                while info.generation > self.generation and not self.closed:
+                    # The trace got here before its configure event
+                    self.handle(self.evt_conn.recv())
+                if self.closed:
+                    return
+                if redraw:
+                    self.iface.redraw_plot.set()
+                if partial:
+                    alive = self.iface.update_partial(points, info)
+                else:
+                    alive = self.iface.update(points, info)
+                if not alive:
+                    return
+
+            time.sleep(self.POLL_INTERVAL)
+
+
+def serve(*args):
+    """Entry point of the gui process, see remote.remote_plot_interface."""
+    gui_process(*args).run()
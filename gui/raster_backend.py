@@ -0,0 +1,250 @@
+import wx
+import numpy as np
+
+import raster
+from gui.plot_backend import plot_backend
+
+
+WHITE = (255, 255, 255)
+GRID = (230, 230, 230)
+BLUE = (0, 0, 255)
+RED = (255, 0, 0)
+MARKER = (0, 255, 0)
+TEXT_GREEN = (0, 128, 0)
+
+
+class raster_backend(plot_backend):
+    """Plot by drawing straight into a numpy RGB buffer.
+
+    Axes, grid and labels are drawn once per format_axis with a wx.DC and
+    cached as pixels. A frame is a copy of that background, the trace drawn
+    as one vertical run per pixel column (see raster.trace_spans), and a
+    single bitmap copy to the screen. The drawing is a few whole-array numpy
+    operations per frame, so it costs O(pixels) however many points the
+    trace has. It still holds the GIL while it runs: to keep rendering off
+    the flowgraph's interpreter entirely, use --gui-process.
+    """
+    # space around the data area for ticks and labels, in pixels
+    LEFT, TOP, RIGHT, BOTTOM = 70, 40, 30, 60
+
+    def __init__(self, frame):
+        plot_backend.__init__(self, frame)
+
+        self.panel = wx.Panel(frame, wx.ID_ANY, size=(700, 600))
+        self.panel.SetBackgroundStyle(wx.BG_STYLE_CUSTOM)
+        self.font = wx.Font(9,
+                            wx.FONTFAMILY_SWISS,
+                            wx.FONTSTYLE_NORMAL,
+                            wx.FONTWEIGHT_NORMAL)
+
+        self.xlim = self.ylim = None
+        self.line = None
+        self.density = None
+        self.threshold = None
+        self.span = None
+        self.markers = None # (x, y, labels)
+        self.axis_args = None # last format_axis arguments, to redo on resize
+
+        self.drag_start = None
+
+        self._allocate(*self.panel.GetSize())
+
+        self.panel.Bind(wx.EVT_PAINT, self.on_paint)
+        self.panel.Bind(wx.EVT_SIZE, self.on_size)
+        self.panel.Bind(wx.EVT_LEFT_DOWN, self.on_mousedown)
+        self.panel.Bind(wx.EVT_LEFT_UP, self.on_mouseup)
+        self.panel.Bind(wx.EVT_MOUSEWHEEL, self.on_mousewheel)
+        self.panel.Bind(wx.EVT_RIGHT_UP, self.on_rightclick)
+
+    def _allocate(self, width, height):
+        """(Re)allocate the pixel buffers for a panel of width x height."""
+        width, height = max(width, 1), max(height, 1)
+        self.width, self.height = width, height
+        self.background = np.empty((height, width, 3), dtype=np.uint8)
+        self.background[...] = WHITE
+        self.pixels = self.background.copy()
+        self.bitmap = wx.EmptyBitmap(width, height, 24)
+        self.bitmap.CopyFromBuffer(self.pixels, wx.BitmapBufferFormat_RGB)
+
+        self.data_width = max(width - self.LEFT - self.RIGHT, 1)
+        self.data_height = max(height - self.TOP - self.BOTTOM, 1)
+
+    def _data_area(self, img):
+        return img[self.TOP:self.TOP + self.data_height,
+                   self.LEFT:self.LEFT + self.data_width]
+
+    def _to_px(self, x, y):
+        """Map data coordinates to pixel (column, row) in the data area."""
+        col = raster.to_pixels(x, self.xlim, self.data_width)
+        row = self.data_height - 1 - raster.to_pixels(y, self.ylim,
+                                                      self.data_height)
+        return col, row
+
+    def format_axis(self, xlim, ylim, xticks, yticks, xformatter):
+        self.axis_args = (xlim, ylim, xticks, yticks, xformatter)
+        self.xlim, self.ylim = xlim, ylim
+
+        bitmap = wx.EmptyBitmap(self.width, self.height, 24)
+        dc = wx.MemoryDC(bitmap)
+        dc.SetBackground(wx.WHITE_BRUSH)
+        dc.Clear()
+        dc.SetFont(self.font)
+
+        left, top = self.LEFT, self.TOP
+        right, bottom = left + self.data_width, top + self.data_height
+
+        # grid and tick labels
+        dc.SetPen(wx.Pen(wx.Colour(*GRID)))
+        for i, x in enumerate(xticks):
+            col, _ = self._to_px(x, 0)
+            if 0 <= col < self.data_width:
+                dc.DrawLine(left + col, top, left + col, bottom)
+                label = xformatter(x, i)
+                w, h = dc.GetTextExtent(label)
+                dc.DrawText(label, left + col - w // 2, bottom + 5)
+        for y in yticks:
+            _, row = self._to_px(0, y)
+            if 0 <= row < self.data_height:
+                dc.DrawLine(left, top + row, right, top + row)
+                label = "{:g}".format(y)
+                w, h = dc.GetTextExtent(label)
+                dc.DrawText(label, left - w - 5, top + row - h // 2)
+
+        # frame and labels
+        dc.SetPen(wx.BLACK_PEN)
+        dc.SetBrush(wx.TRANSPARENT_BRUSH)
+        dc.DrawRectangle(left - 1, top - 1,
+                         self.data_width + 2, self.data_height + 2)
+        title = "Power Spectrum"
+        w, h = dc.GetTextExtent(title)
+        dc.DrawText(title, left + (self.data_width - w) // 2, top - h - 10)
+        xlabel = "Frequency (MHz)"
+        w, h = dc.GetTextExtent(xlabel)
+        dc.DrawText(xlabel, left + (self.data_width - w) // 2, bottom + 30)
+        ylabel = "Power (dBm)"
+        w, h = dc.GetTextExtent(ylabel)
+        dc.DrawRotatedText(ylabel, 10, top + (self.data_height + w) // 2, 90)
+
+        dc.SelectObject(wx.NullBitmap)
+        bitmap.CopyToBuffer(self.background, wx.BitmapBufferFormat_RGB)
+
+        self.render()
+
+    def plot_size(self):
+        return self.data_width, self.data_height
+
+    def set_line(self, x, y):
+        self.line = (x, y)
+
+    def set_density(self, density, extent):
+        self.density = None if density is None else (density, extent)
+
+    def set_threshold(self, level):
+        self.threshold = level
+
+    def set_span(self, left, right):
+        self.span = None if left is None else (left, right)
+
+    def set_markers(self, x, y, labels):
+        self.markers = (x, y, labels) if len(x) else None
+
+    def render(self):
+        if self.xlim is None:
+            return
+
+        np.copyto(self.pixels, self.background)
+        area = self._data_area(self.pixels)
+
+        if self.density is not None:
+            density, extent = self.density
+            raster.draw_image(area, density, extent, self.xlim, self.ylim)
+        if self.line is not None:
+            x, y = self.line
+            top, bottom = raster.trace_spans(x, y, self.xlim, self.ylim,
+                                             self.data_width,
+                                             self.data_height)
+            raster.draw_spans(area, top, bottom, BLUE)
+        if self.span is not None:
+            left, _ = self._to_px(self.span[0], 0)
+            right, _ = self._to_px(self.span[1], 0)
+            raster.shade_columns(area, left, right, RED, 0.2)
+        if self.threshold is not None:
+            _, row = self._to_px(0, self.threshold)
+            raster.draw_hline(area, row, RED)
+        if self.markers is not None:
+            x, y, labels = self.markers
+            cols, rows = self._to_px(x, y)
+            raster.draw_diamonds(area, rows, cols, 4, MARKER)
+
+        self.bitmap.CopyFromBuffer(self.pixels, wx.BitmapBufferFormat_RGB)
+
+        if self.markers is not None:
+            # text is cheap to draw with a dc over the finished pixels
+            dc = wx.MemoryDC(self.bitmap)
+            dc.SetFont(self.font)
+            dc.SetTextForeground(wx.Colour(*TEXT_GREEN))
+            for col, row, label in zip(cols, rows, labels):
+                # NaN power, e.g. a bin not swept yet, fails both tests
+                if 0 <= col < self.data_width and row == row:
+                    dc.DrawText(label,
+                                self.LEFT + int(col) + 6,
+                                self.TOP + max(int(row) - 18, 0))
+            dc.SelectObject(wx.NullBitmap)
+
+        dc = wx.ClientDC(self.panel)
+        dc.DrawBitmap(self.bitmap, 0, 0)
+
+    ################
+    # Event handlers
+    ################
+
+    def on_paint(self, event):
+        dc = wx.PaintDC(self.panel)
+        dc.DrawBitmap(self.bitmap, 0, 0)
+
+    def on_size(self, event):
+        width, height = event.GetSize()
+        if (width, height) != (self.width, self.height):
+            self._allocate(width, height)
+            if self.axis_args is not None:
+                self.format_axis(*self.axis_args)
+            self.frame.on_resize()
+        event.Skip()
+
+    def _to_data_x(self, col):
+        xmin, xmax = self.xlim
+        return xmin + (col - self.LEFT) * (xmax - xmin) / float(self.data_width)
+
+    def on_mousedown(self, event):
+        """store event info for single click."""
+        self.drag_start = event.GetX()
+        event.Skip()
+
+    def on_mouseup(self, event):
+        """Determine if mouse event was single click or click-and-drag."""
+        start, end = self.drag_start, event.GetX()
+        self.drag_start = None
+        if start is None or self.xlim is None:
+            return
+
+        if abs(start - end) >= 5:
+            # mouse was clicked and dragged more than 5 pxls, set a span
+            self.frame.set_span(self._to_data_x(start), self._to_data_x(end))
+        else:
+            # caught single click, clear span
+            self.frame.clear_span()
+        event.Skip()
+
+    def on_mousewheel(self, event):
+        """Zoom around the pointer, or pan with shift held."""
+        if self.xlim is None:
+            return
+        steps = event.GetWheelRotation() / float(event.GetWheelDelta())
+        if event.ShiftDown():
+            self.frame.pan(steps)
+        else:
+            self.frame.zoom(steps, self._to_data_x(event.GetX()))
+
+    def on_rightclick(self, event):
+        self.frame.reset_zoom()
+        event.Skip()
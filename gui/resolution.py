@@ -104,11 +104,11 @@ class ctrls(object):
         grid = wx.FlexGridSizer(rows=3, cols=2)
         deltaf = u"Δf: "
         deltaf_label_txt = wx.StaticText(frame, wx.ID_ANY, deltaf)
-        deltaf_txt = deltaf_statictxt(frame)
+        self.deltaf_txt = deltaf_txt = deltaf_statictxt(frame)
         samp_rate_label_txt = wx.StaticText(frame, wx.ID_ANY, "Sample Rate (MS/s): ")
-        samp_rate_txt = sample_rate_txtctrl(frame, deltaf_txt)
+        self.samp_rate_txt = samp_rate_txt = sample_rate_txtctrl(frame, deltaf_txt)
         fft_label_txt = wx.StaticText(frame, wx.ID_ANY, "FFT size (bins): ")
-        fft_txt = fftsize_txtctrl(frame, deltaf_txt)
+        self.fft_txt = fft_txt = fftsize_txtctrl(frame, deltaf_txt)
 
         grid.Add(samp_rate_label_txt,
                  proportion=0,
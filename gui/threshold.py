@@ -20,26 +20,16 @@ class threshold(object):
     """A horizontal line to indicate user-defined overload threshold."""
     def __init__(self, frame, level):
         self.frame = frame
-        self.line = None
         self.level = level # default level in dBm or None
 
     def plot(self):
-        # plot the new threshold and add it to our blitted background
-        f_min = self.frame.tb.cfg.min_freq
-        f_max = self.frame.tb.cfg.max_freq
-        xs = [f_min - 1e7, f_max + 1e7]
-        ys = [self.level] * 2
-        self.line, = self.frame.subplot.plot(xs, ys,
-                                             color='red',
-                                             # play nice with blitting:
-                                             animated=True,
-                                             # draw above grid lines:
-                                             zorder=90)
+        self.frame.plot_backend.set_threshold(self.level)
+        self.frame.threshold_monitor.set_level(self.level)
 
     def unplot(self):
-        self.line.remove()
-        self.line = None
         self.level = None
+        self.frame.plot_backend.set_threshold(None)
+        self.frame.threshold_monitor.set_level(None)
 
     def set_level(self, event):
         """Set the level to a user input value."""
@@ -17,14 +17,24 @@ class single_run_btn(wx.Button):
         self.Bind(wx.EVT_BUTTON, frame.set_single_run)
 
 
+class apply_btn(wx.Button):
+    """A button to apply all pending settings with a single rebuild."""
+    def __init__(self, frame):
+        wx.Button.__init__(self, frame, wx.ID_ANY, label="Apply")
+
+        self.Bind(wx.EVT_BUTTON, frame.apply_config)
+
+
 class ctrls(object):
     def __init__(self, frame):
         """Initialize gui controls for triggering the flowgraph"""
         ctrl_label = wx.StaticBox(frame, wx.ID_ANY, "Trigger")
         self.layout = wx.StaticBoxSizer(ctrl_label, wx.VERTICAL)
-        grid = wx.GridSizer(rows=2, cols=1)
+        grid = wx.GridSizer(rows=3, cols=1)
         self.single_run_btn = single_run_btn(frame)
         self.continuous_run_btn = continuous_run_btn(frame)
+        self.apply_btn = apply_btn(frame)
         grid.Add(self.single_run_btn)
         grid.Add(self.continuous_run_btn)
+        grid.Add(self.apply_btn)
         self.layout.Add(grid, flag=wx.ALL, border=5)
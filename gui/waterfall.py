@@ -0,0 +1,103 @@
+import time
+import wx
+import numpy as np
+import matplotlib
+matplotlib.use('WXAgg')
+from matplotlib.backends.backend_wxagg import FigureCanvasWxAgg as FigureCanvas
+from matplotlib.figure import Figure
+from matplotlib.ticker import FuncFormatter
+
+from decimate import column_max, view_slice
+from ringbuffer import trace_ring
+
+
+class waterfall(object):
+    """A waterfall of recent traces, drawn below the power spectrum.
+
+    Traces are reduced to one row per pixel column and pushed into a
+    preallocated ring buffer from the flowgraph's thread. The gui thread
+    only updates the data of a single image artist and blits it, at most
+    MAX_FPS times per second so the trace plot is never starved.
+    """
+    MAX_FPS = 20
+
+    def __init__(self, frame, depth):
+        self.frame = frame
+        self.depth = depth
+
+        self.panel = wx.Panel(frame, wx.ID_ANY, size=(700, 250))
+        self.figure = Figure(figsize=(7, 2.5), dpi=100)
+        self.figure.subplots_adjust(right=.95, bottom=.2)
+        self.canvas = FigureCanvas(self.panel, -1, self.figure)
+        self.ax = self.figure.add_subplot(111)
+        self.ax.set_yticks([])
+        self.ax.set_ylabel("History")
+
+        # (ring, view, extent) swapped as a whole by the flowgraph's thread
+        self.history = None
+        self.image = None
+        self.background = None
+        self.last_draw = 0
+
+    def push(self, x, y, view):
+        """Add trace y as the newest row. Called from the flowgraph's thread.
+
+        The ring is reallocated whenever the view changes, since old rows no
+        longer line up with the plot.
+        """
+        history = self.history
+        if history is None or history[1] != view:
+            xs = x[view_slice(x, view)]
+            if not len(xs):
+                return
+            extent = (xs[0], xs[-1], 0, self.depth)
+            history = (trace_ring(self.depth, view[2]), view, extent)
+            self.history = history
+
+        ring = history[0]
+        ys = y[view_slice(x, view)]
+        if len(ys):
+            ring.push(column_max(ys, ring.width))
+
+    def format_axis(self, xlim, min_power, max_power):
+        """Match the x range of the power spectrum and reset the colormap."""
+        if self.image is not None:
+            self.image.remove()
+
+        self.image = self.ax.imshow(np.full((1, 1), np.nan),
+                                    animated=True,
+                                    aspect='auto',
+                                    origin='lower', # newest row on top
+                                    interpolation='nearest',
+                                    cmap='viridis',
+                                    vmin=min_power,
+                                    vmax=max_power)
+        # set limits after imshow, which autoscales to the image
+        self.ax.set_xlim(*xlim)
+        self.ax.set_ylim(0, self.depth)
+        self.ax.set_xticks(self.frame.xticks)
+        self.ax.xaxis.set_major_formatter(FuncFormatter(self.frame.format_mhz))
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.last_draw = 0
+
+    def draw(self):
+        """Blit the latest history, rate limited to MAX_FPS."""
+        now = time.time()
+        if (self.history is None or self.image is None or
+            now - self.last_draw < 1.0 / self.MAX_FPS):
+            return
+        self.last_draw = now
+
+        # The whole image is redrawn rather than shifting the blitted bitmap
+        # by the new rows: a row is rarely a whole number of pixels high and
+        # any number of rows may have arrived since the last frame. set_data
+        # only takes the ring's contiguous view, so the cost is Agg mapping
+        # depth x width values to colors, at most MAX_FPS times a second.
+        ring, _, extent = self.history
+        self.image.set_data(ring.view())
+        self.image.set_extent(extent)
+
+        self.canvas.restore_region(self.background)
+        self.ax.draw_artist(self.image)
+        self.canvas.blit(self.ax.bbox)
@@ -0,0 +1,73 @@
+"""Hand the latest trace from the flowgraph to a reader that runs at its own rate."""
+
+import threading
+
+import numpy as np
+
+
+class trace_slot(object):
+    """One preallocated trace plus whatever the writer attaches to it."""
+    def __init__(self, size):
+        self.points = np.empty(size, dtype=np.float32)
+        self.redraw = False
+
+
+class trace_mailbox(object):
+    """A triple buffer where the latest trace wins.
+
+    The writer fills the back slot and publishes it, the reader takes the
+    most recently published slot. Neither ever waits for the other: the lock
+    is only held to swap two slot indices. Slots are reused, so no memory is
+    allocated per trace. A trace that is overwritten before it is taken
+    counts as dropped, but its redraw flag carries over to the next trace so
+    a reconfiguration is never missed.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.slots = [None, None, None]
+        self.back, self.middle, self.front = 0, 1, 2
+        self.fresh = False # middle slot holds an untaken trace
+
+        self.written = 0
+        self.rendered = 0
+        self.dropped = 0
+
+    def back_slot(self, size):
+        """Return the writer's slot, sized to hold size points.
+
+        Only the writer calls this, so only the back slot is (re)allocated.
+        The others are resized as they cycle through the back.
+        """
+        slot = self.slots[self.back]
+        if slot is None or len(slot.points) != size:
+            slot = self.slots[self.back] = trace_slot(size)
+        return slot
+
+    def publish(self):
+        """Make the back slot the latest trace."""
+        with self.lock:
+            back, middle = self.back, self.middle
+            if self.fresh:
+                self.dropped += 1
+                self.slots[back].redraw |= self.slots[middle].redraw
+            self.back, self.middle = middle, back
+            self.fresh = True
+            self.written += 1
+
+    def take(self):
+        """Return the latest trace not yet taken, or None.
+
+        The slot belongs to the reader until its next call to take.
+        """
+        with self.lock:
+            if not self.fresh:
+                return None
+            self.front, self.middle = self.middle, self.front
+            self.fresh = False
+            self.rendered += 1
+            return self.slots[self.front]
+
+    def counts(self):
+        return dict(written=self.written,
+                    rendered=self.rendered,
+                    dropped=self.dropped)
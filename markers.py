@@ -0,0 +1,129 @@
+"""Any number of markers on a trace, read out together."""
+
+from collections import namedtuple
+
+import numpy as np
+
+
+NORMAL = 'normal' # follows the power at a fixed bin
+DELTA = 'delta'   # reads relative to another marker
+PEAK = 'peak'     # jumps to the highest bin in its window every trace
+
+
+# Parallel sequences, one entry per marker in the order they were added.
+# values are the powers, except for delta markers where they're relative to
+# the power of the reference marker, found at position refs[i]. Markers that
+# aren't deltas are their own reference.
+marker_readings = namedtuple('marker_readings', ['ids',
+                                                 'kinds',
+                                                 'bins',
+                                                 'powers',
+                                                 'values',
+                                                 'refs'])
+
+
+class marker_set(object):
+    """The markers on a trace, as bin indices.
+
+    Markers change rarely and are read every trace, so the per-marker lists
+    are turned into index arrays once per change, and reading all markers
+    is one fancy-indexing gather however many there are. Peak markers that
+    share a search window share a single nanargmax.
+    """
+    def __init__(self):
+        self.version = 0  # bumped on every change
+        self.clear()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, kind, bin_idx, ref=None, window=None):
+        """Add a marker and return its id."""
+        if kind == DELTA and ref not in self.ids:
+            raise ValueError("delta marker needs an existing reference")
+        id_ = self.next_id
+        self.next_id += 1
+        self.ids.append(id_)
+        self.kinds.append(kind)
+        self.bins.append(int(bin_idx))
+        self.refs.append(ref if kind == DELTA else None)
+        self.windows.append(window if kind == PEAK else None)
+        self._changed()
+        return id_
+
+    def remove(self, id_):
+        """Remove a marker. Deltas from it become normal markers."""
+        i = self.ids.index(id_)
+        for attr in (self.ids, self.kinds, self.bins, self.refs, self.windows):
+            del attr[i]
+        for j, ref in enumerate(self.refs):
+            if ref == id_:
+                self.kinds[j] = NORMAL
+                self.refs[j] = None
+        self._changed()
+
+    def clear(self):
+        self.ids = []
+        self.kinds = []
+        self.bins = []
+        self.refs = []    # id of the reference marker of delta markers
+        self.windows = [] # (lo, hi) bins searched by peak markers, or None
+        self.next_id = 1
+        self._changed()
+
+    def bin_of(self, id_):
+        return self.bins[self.ids.index(id_)]
+
+    def kind_of(self, id_):
+        return self.kinds[self.ids.index(id_)]
+
+    def move(self, id_, bin_idx):
+        """Move a marker to bin_idx. Peak markers keep tracking."""
+        self.bins[self.ids.index(id_)] = int(bin_idx)
+        self._changed()
+
+    def _changed(self):
+        self.version += 1
+        self._index = None
+
+    def _build_index(self):
+        ref_pos = [self.ids.index(r) if r is not None else i
+                   for i, r in enumerate(self.refs)]
+        peaks = {}
+        for i, (kind, window) in enumerate(zip(self.kinds, self.windows)):
+            if kind == PEAK:
+                peaks.setdefault(window, []).append(i)
+        self._index = (np.array(ref_pos, dtype=np.intp),
+                       np.array([k == DELTA for k in self.kinds], dtype=bool),
+                       [(w, np.array(p, dtype=np.intp))
+                        for w, p in peaks.items()])
+
+    def read(self, y, track=True):
+        """Return the marker_readings of trace y.
+
+        With track, peak markers first move to the highest bin of their
+        window in y.
+        """
+        if self._index is None:
+            self._build_index()
+        ref_pos, is_delta, peaks = self._index
+
+        bins = np.array(self.bins, dtype=np.intp)
+        np.clip(bins, 0, len(y) - 1, out=bins)
+        if track and peaks:
+            for window, members in peaks:
+                lo, hi = window if window is not None else (0, len(y))
+                if hi > lo:
+                    # the bins of a progressive trace not swept yet are NaN,
+                    # and a window with nothing swept keeps its peak
+                    try:
+                        bins[members] = lo + np.nanargmax(y[lo:hi])
+                    except ValueError:
+                        pass
+            self.bins = bins.tolist()
+
+        powers = y[bins]
+        values = np.where(is_delta, powers - powers[ref_pos], powers)
+
+        return marker_readings(self.ids, self.kinds, bins, powers, values,
+                               ref_pos)
@@ -0,0 +1,247 @@
+"""Export I/Q, complex FFT data and settings as MATLAB v7.3 MAT-files.
+
+A v7.3 MAT-file is an HDF5 file behind a 512 byte header, so it's written
+with h5py, which is only imported, and needed, by these exports. Data is
+written to resizable datasets a block of rows at a time, straight from the
+memory-mapped spools of the sinks, so memory use doesn't grow with the
+export. Unlike recordings, exports don't go through analyzer.async_writer:
+they are made on request, on the gui's thread rather than the flowgraph's,
+and h5py does its own I/O.
+
+MATLAB reads the dimensions of an HDF5 dataset in reverse, so an array
+written with shape (segments, samples) loads as samples x segments, one
+column per segment.
+"""
+
+import time
+import struct
+
+import numpy as np
+
+
+HEADER_TEXT = "MATLAB 7.3 MAT-file, Platform: GLNXA64, Created on: {}"
+HEADER_TEXT += " HDF5 schema 1.00 ."
+USERBLOCK_SIZE = 512
+BLOCK_BYTES = 64 * 2**20  # bytes of samples written per block, at most
+
+# how MATLAB stores complex numbers
+MAT_COMPLEX = {
+    np.dtype(np.complex64): np.dtype([('real', '<f4'), ('imag', '<f4')]),
+    np.dtype(np.complex128): np.dtype([('real', '<f8'), ('imag', '<f8')]),
+}
+
+MAT_CLASSES = {
+    np.dtype(np.float64): 'double',
+    np.dtype(np.float32): 'single',
+    np.dtype(np.complex128): 'double',
+    np.dtype(np.complex64): 'single',
+    np.dtype(np.int64): 'int64',
+    np.dtype(np.int32): 'int32',
+    np.dtype(np.uint32): 'uint32',
+    np.dtype(np.uint8): 'uint8',
+}
+
+
+def open_matfile(path):
+    """Create the MAT-file at path and return it as an h5py.File."""
+    try:
+        import h5py
+    except ImportError:
+        raise RuntimeError("MATLAB export needs h5py (pip install h5py)")
+    return h5py.File(path, 'w', userblock_size=USERBLOCK_SIZE)
+
+
+def close_matfile(f):
+    """Close a file made by open_matfile and write its MAT-file header."""
+    path = f.filename
+    f.close()
+    text = HEADER_TEXT.format(time.strftime("%a %b %d %H:%M:%S %Y"))
+    # text, subsystem data offset (none), version 0x0200, endian indicator
+    header = text.ljust(116) + struct.pack("<8xH2s", 0x0200, "IM")
+    with open(path, 'r+b') as mat:
+        mat.write(header)
+
+
+def _set_class(obj, mat_class):
+    obj.attrs['MATLAB_class'] = np.string_(mat_class)
+
+
+def write_array(group, name, value):
+    """Write a number, bool, string or array as the variable or struct
+    field name. None is written as NaN."""
+    if value is None:
+        value = np.nan
+    if isinstance(value, basestring):
+        chars = np.fromstring(str(value), dtype=np.uint8).astype(np.uint16)
+        dset = group.create_dataset(name, data=chars.reshape(-1, 1))
+        _set_class(dset, 'char')
+        dset.attrs['MATLAB_int_decode'] = np.int32(2)
+        return dset
+    if isinstance(value, (bool, np.bool_)):
+        dset = group.create_dataset(name, data=np.uint8([[value]]))
+        _set_class(dset, 'logical')
+        dset.attrs['MATLAB_int_decode'] = np.int32(1)
+        return dset
+
+    value = np.asarray(value)
+    if value.dtype not in MAT_CLASSES:
+        value = value.astype(np.float64)
+    mat_class = MAT_CLASSES[value.dtype]
+    if value.ndim < 2:
+        value = value.reshape(1, -1) # a column vector in MATLAB
+    if value.dtype in MAT_COMPLEX:
+        value = np.ascontiguousarray(value).view(MAT_COMPLEX[value.dtype])
+    dset = group.create_dataset(name, data=value)
+    _set_class(dset, mat_class)
+    return dset
+
+
+def create_rows(group, name, ncols, dtype):
+    """Create a dataset of rows of ncols items of dtype, to be filled with
+    append_rows. MATLAB sees a row as a column."""
+    dtype = np.dtype(dtype)
+    row_bytes = ncols * dtype.itemsize
+    chunk_rows = max(1, min(1024, 2**20 // row_bytes))
+    dset = group.create_dataset(name,
+                                shape=(0, ncols),
+                                maxshape=(None, ncols),
+                                chunks=(chunk_rows, ncols),
+                                dtype=MAT_COMPLEX.get(dtype, dtype))
+    _set_class(dset, MAT_CLASSES[dtype])
+    return dset
+
+
+def append_rows(dset, rows):
+    """Append a 2-D array of rows to a dataset made by create_rows."""
+    rows = np.ascontiguousarray(rows)
+    if rows.dtype in MAT_COMPLEX:
+        rows = rows.view(MAT_COMPLEX[rows.dtype])
+    start = dset.shape[0]
+    dset.resize(start + len(rows), axis=0)
+    dset[start:] = rows
+
+
+def create_struct(group, name):
+    """Create a struct, whose fields are the variables written to it."""
+    struct_group = group.create_group(name)
+    _set_class(struct_group, 'struct')
+    return struct_group
+
+
+def config_fields(cfg):
+    """Return the settings of cfg worth keeping with exported data."""
+    return {
+        'center_freq': cfg.center_freq,
+        'span': cfg.span,
+        'sample_rate': cfg.sample_rate,
+        'gain': cfg.gain,
+        'lo_offset': cfg.lo_offset,
+        'scale': cfg.scale,
+        'fft_size': cfg.fft_size,
+        'nframes': cfg.nframes,
+        'detector': cfg.detector.name,
+        'window': cfg.window,
+        'window_coefficients': np.asarray(cfg.window_coefficients),
+        'overlap': cfg.overlap,
+        'deltaf': cfg.deltaf,
+        'freq_step': cfg.freq_step,
+        'min_freq': cfg.min_freq,
+        'max_freq': cfg.max_freq,
+        'center_freqs': np.asarray(cfg.center_freqs),
+        'bin_start': cfg.bin_start,
+        'bin_stop': cfg.bin_stop,
+        'skip_initial': cfg.skip_initial,
+        'tune_delay': cfg.tune_delay,
+        'continuous_run': cfg.continuous_run,
+    }
+
+
+def write_config(f, cfg):
+    config = create_struct(f, 'config')
+    for name, value in sorted(config_fields(cfg).items()):
+        write_array(config, name, value)
+
+
+def save_config(path, cfg):
+    """Save the settings of cfg as the struct config of a MAT-file."""
+    f = open_matfile(path)
+    try:
+        write_config(f, cfg)
+    finally:
+        close_matfile(f)
+
+
+def segment_blocks(center_freqs, samples, segment_len):
+    """Yield the segments of a recording as blocks for save_time_data.
+
+    samples is the recording, usually memory mapped, and center_freqs the
+    frequency of each of its segments. Only whole segments are yielded, in
+    blocks of up to BLOCK_BYTES.
+    """
+    nsegments = len(samples) // segment_len
+    segments = samples[:nsegments * segment_len].reshape(nsegments,
+                                                        segment_len)
+    rows = max(1, BLOCK_BYTES // (segment_len * samples.itemsize))
+    for start in xrange(0, nsegments, rows):
+        yield center_freqs[start:start + rows], segments[start:start + rows]
+
+
+def save_time_data(path, cfg, blocks):
+    """Save I/Q to a MAT-file, as the struct time_data and cfg's config.
+
+    blocks yields (center_freqs, samples) pairs, the center frequencies of
+    a block of segments and their samples as a 2-D array, one row per
+    segment. time_data.samples has one column per segment and
+    time_data.center_frequency the frequency of each.
+    """
+    f = open_matfile(path)
+    try:
+        write_config(f, cfg)
+        time_data = create_struct(f, 'time_data')
+        freqs = create_rows(time_data, 'center_frequency', 1, np.float64)
+        samples = None
+        for block_freqs, block in blocks:
+            if samples is None:
+                samples = create_rows(time_data, 'samples', block.shape[1],
+                                      block.dtype)
+            append_rows(freqs, np.reshape(block_freqs, (-1, 1)))
+            append_rows(samples, block)
+        nsegments = freqs.shape[0]
+    finally:
+        close_matfile(f)
+
+    return nsegments
+
+
+def save_fft_data(path, cfg, vectors):
+    """Save the complex FFT vectors of a sweep to a MAT-file, as the struct
+    fft_data and cfg's config.
+
+    vectors is an (nvectors, fft_size) array of nframes vectors per
+    segment, usually memory mapped. The bins discarded by the overlap are
+    left out, and fft_data.samples holds the nframes frames of every other
+    bin as a column, with its frequency in fft_data.bin_frequency.
+    """
+    nsegments = len(vectors) // cfg.nframes
+    bins = np.arange(cfg.bin_start, cfg.bin_stop)
+    offsets = (bins - cfg.fft_size // 2) * cfg.deltaf
+    center_freqs = np.asarray(cfg.center_freqs)
+
+    f = open_matfile(path)
+    try:
+        write_config(f, cfg)
+        fft_data = create_struct(f, 'fft_data')
+        freqs = create_rows(fft_data, 'bin_frequency', 1, np.float64)
+        samples = create_rows(fft_data, 'samples', cfg.nframes,
+                              vectors.dtype)
+        for segment in xrange(nsegments):
+            frames = vectors[segment * cfg.nframes:
+                             (segment + 1) * cfg.nframes,
+                             cfg.bin_start:cfg.bin_stop]
+            fc = center_freqs[segment % len(center_freqs)]
+            append_rows(freqs, (fc + offsets).reshape(-1, 1))
+            append_rows(samples, frames.T)
+    finally:
+        close_matfile(f)
+
+    return nsegments
@@ -0,0 +1,138 @@
+import os
+import json
+import errno
+import logging
+from collections import OrderedDict
+
+import consts
+
+
+# configuration attributes that make up a preset
+PRESET_FIELDS = ("center_freq",
+                 "requested_span",
+                 "sample_rate",
+                 "fft_size",
+                 "nframes",
+                 "overlap",
+                 "tune_delay",
+                 "lo_offset",
+                 "scale",
+                 "window",
+                 "detector")
+
+
+def settings_of(cfg, fields=PRESET_FIELDS):
+    """Return the given fields of cfg as a JSON and pickle friendly dict."""
+    settings = dict((field, getattr(cfg, field)) for field in fields)
+    if 'detector' in settings:
+        settings['detector'] = cfg.detector.name
+    return settings
+
+
+def apply_settings(settings, cfg):
+    """Apply settings from settings_of() to cfg and update it."""
+    settings = dict(settings)
+    cfg.center_freq = settings.pop('center_freq')
+    cfg.requested_span = settings.pop('requested_span')
+    cfg.sample_rate = settings.pop('sample_rate')
+    cfg.set_fft_size(settings.pop('fft_size'))
+    cfg.overlap = settings.pop('overlap')
+    cfg.nframes = settings.pop('nframes')
+    cfg.tune_delay = settings.pop('tune_delay')
+    cfg.lo_offset = settings.pop('lo_offset')
+    cfg.scale = settings.pop('scale')
+    cfg.detector = consts.Detector[str(settings.pop('detector'))]
+    # also resizes window to fft_size
+    cfg.set_window(str(settings.pop('window')))
+    for field, value in settings.items():
+        setattr(cfg, field, value)
+    cfg.update()
+
+
+class preset_store(object):
+    """Named analyzer views persisted to a JSON file."""
+    def __init__(self, path):
+        self.logger = logging.getLogger('gr-analyzer.presets')
+        self.path = os.path.expanduser(path)
+        self.presets = {}
+        self.load()
+
+    def load(self):
+        """(Re)load presets from disk, keeping none if the file is unusable."""
+        try:
+            with open(self.path) as f:
+                self.presets = json.load(f)
+        except IOError as err:
+            if err.errno != errno.ENOENT:
+                self.logger.warning("Unable to read presets: {}".format(err))
+        except ValueError as err:
+            msg = "Ignoring malformed presets file {}: {}"
+            self.logger.warning(msg.format(self.path, err))
+
+    def save(self):
+        """Write presets to disk, replacing the old file atomically."""
+        dirname = os.path.dirname(self.path)
+        if dirname and not os.path.exists(dirname):
+            os.makedirs(dirname)
+
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.presets, f, indent=2, sort_keys=True)
+        os.rename(tmp_path, self.path)
+
+    def names(self):
+        return sorted(self.presets.keys())
+
+    def add(self, name, cfg):
+        """Store the preset-relevant settings of cfg under name."""
+        self.presets[name] = settings_of(cfg)
+        self.save()
+        self.logger.info("Saved preset {!r}".format(name))
+
+    def remove(self, name):
+        if self.presets.pop(name, None) is not None:
+            self.save()
+            self.logger.info("Removed preset {!r}".format(name))
+
+    def apply(self, name, cfg):
+        """Apply a saved preset to cfg. Return True if successful."""
+        try:
+            preset = self.presets[name]
+        except KeyError:
+            msg = "Unknown preset {!r}, must be one of {!r}"
+            self.logger.error(msg.format(name, self.names()))
+            return False
+
+        apply_settings(preset, cfg)
+
+        return True
+
+
+class chain_pool(object):
+    """Pre-built processing chains of the most recently used presets.
+
+    Chains are keyed by preset name and validated against chain_key(), so a
+    chain built for an older version of a preset is never swapped in.
+    """
+    def __init__(self, size):
+        self.size = size
+        self.chains = OrderedDict()
+
+    def get(self, name, key):
+        """Return the warm chain for name if it still matches key, or None."""
+        chain = self.chains.pop(name, None)
+        if chain is None or chain.key != key:
+            return None
+
+        self.chains[name] = chain # mark as most recently used
+        return chain
+
+    def put(self, name, chain):
+        """Keep chain warm under name, evicting the least recently used."""
+        self.chains.pop(name, None)
+        self.chains[name] = chain
+        while len(self.chains) > self.size:
+            self.chains.popitem(last=False)
+
+    def discard(self, name):
+        self.chains.pop(name, None)
@@ -0,0 +1,133 @@
+"""Draw traces straight into RGB pixel buffers with numpy.
+
+Images are (rows, columns, 3) uint8 arrays with row 0 at the top. Every
+function is vectorized over pixels, so drawing a frame costs O(pixels)
+regardless of how many points the trace had before decimation.
+"""
+
+import numpy as np
+
+
+def to_pixels(values, lim, npx):
+    """Map values in the data range lim onto [0, npx) pixel coordinates."""
+    lo, hi = lim
+    return (np.asarray(values, dtype=np.float64) - lo) * (npx / float(hi - lo))
+
+
+def trace_spans(x, y, xlim, ylim, width, height):
+    """Return the (top, bottom) rows the line through (x, y) covers in each
+    of width pixel columns, as floats. Columns the line doesn't reach are NaN.
+
+    x must be ascending. Each column spans every point that falls in it and
+    the line's crossings of its left and right edges, so consecutive points
+    are joined whether there are more points than columns or fewer.
+    """
+    top = np.full(width, np.nan)
+    bottom = np.full(width, np.nan)
+    if len(x) == 0:
+        return top, bottom
+
+    xf = to_pixels(x, xlim, width)
+    # rows count down from the top, so flip the power axis
+    yf = height - 1 - to_pixels(y, ylim, height)
+
+    # where the line crosses each column edge
+    edges = np.arange(width + 1, dtype=np.float64)
+    crossings = np.interp(edges, xf, yf)
+    crossings[(edges < xf[0]) | (edges > xf[-1])] = np.nan
+    top = np.fmin(crossings[:-1], crossings[1:])
+    bottom = np.fmax(crossings[:-1], crossings[1:])
+
+    # the points themselves, grouped by column
+    cols = np.floor(xf).astype(np.intp)
+    inside = (cols >= 0) & (cols < width)
+    cols, yf = cols[inside], yf[inside]
+    if len(cols):
+        starts = np.flatnonzero(np.r_[True, cols[1:] != cols[:-1]])
+        ucols = cols[starts]
+        top[ucols] = np.fmin(top[ucols], np.minimum.reduceat(yf, starts))
+        bottom[ucols] = np.fmax(bottom[ucols], np.maximum.reduceat(yf, starts))
+
+    return top, bottom
+
+
+def draw_spans(img, top, bottom, color):
+    """Fill rows top..bottom of each column of img, skipping NaN columns."""
+    rows = np.arange(img.shape[0])[:, np.newaxis]
+    with np.errstate(invalid='ignore'):
+        mask = (rows >= np.floor(top)) & (rows <= np.ceil(bottom))
+    img[mask] = color
+
+
+def draw_hline(img, row, color):
+    row = int(round(row))
+    if 0 <= row < img.shape[0]:
+        img[row] = color
+
+
+def shade_columns(img, left, right, color, alpha):
+    """Blend color into columns left..right of img."""
+    left = max(int(left), 0)
+    right = min(int(np.ceil(right)), img.shape[1])
+    if left < right:
+        region = img[:, left:right]
+        blended = region * (1.0 - alpha) + np.asarray(color) * alpha
+        region[...] = blended.astype(np.uint8)
+
+
+def draw_diamonds(img, rows, cols, radius, color):
+    """Draw a diamond centered on each (row, col), clipped to img."""
+    rows = np.round(np.asarray(rows)).astype(np.intp)
+    cols = np.round(np.asarray(cols)).astype(np.intp)
+    dy, dx = np.mgrid[-radius:radius + 1, -radius:radius + 1]
+    inside = np.abs(dy) + np.abs(dx) <= radius
+    rr = rows[:, np.newaxis] + dy[inside]
+    cc = cols[:, np.newaxis] + dx[inside]
+    visible = ((rr >= 0) & (rr < img.shape[0]) &
+               (cc >= 0) & (cc < img.shape[1]))
+    img[rr[visible], cc[visible]] = color
+
+
+def gradient_lut(colors, n=256):
+    """Return an (n, 3) uint8 colormap through evenly spaced anchor colors."""
+    colors = np.asarray(colors, dtype=np.float64)
+    anchors = np.linspace(0, n - 1, len(colors))
+    idx = np.arange(n)
+    lut = [np.interp(idx, anchors, colors[:, c]) for c in range(3)]
+    return np.column_stack(lut).astype(np.uint8)
+
+
+# light yellow to dark red, like matplotlib's YlOrRd
+DENSITY_LUT = gradient_lut([(255, 255, 204), (253, 141, 60), (128, 0, 38)])
+
+
+def draw_image(img, data, extent, xlim, ylim, lut=DENSITY_LUT):
+    """Draw data, with values in [0, 1] and row 0 at the bottom, over img.
+
+    extent is (xmin, xmax, ymin, ymax) of data in the same units as xlim and
+    ylim. Resampling is nearest neighbour, and NaN pixels are left alone.
+    """
+    height, width = img.shape[:2]
+    nrows, ncols = data.shape
+    xmin, xmax, ymin, ymax = extent
+
+    # data coordinates of every pixel center, then the data cell under it
+    xstep = float(xlim[1] - xlim[0]) / width
+    ystep = float(ylim[1] - ylim[0]) / height
+    px = xlim[0] + (np.arange(width) + 0.5) * xstep
+    py = ylim[1] - (np.arange(height) + 0.5) * ystep
+    ci = np.floor((px - xmin) * (ncols / float(xmax - xmin))).astype(np.intp)
+    ri = np.floor((py - ymin) * (nrows / float(ymax - ymin))).astype(np.intp)
+    cin = (ci >= 0) & (ci < ncols)
+    rin = (ri >= 0) & (ri < nrows)
+    if not cin.any() or not rin.any():
+        return
+
+    rows = np.flatnonzero(rin)[:, np.newaxis]
+    cols = np.flatnonzero(cin)
+    cells = data[ri[rin]][:, ci[cin]]
+    visible = ~np.isnan(cells)
+    levels = np.clip(cells[visible] * (len(lut) - 1), 0, len(lut) - 1)
+    region = img[rows, cols] # a copy, written back below
+    region[visible] = lut[levels.astype(np.intp)]
+    img[rows, cols] = region
@@ -0,0 +1,228 @@
+"""Run the GUI in a child process (--gui-process).
+
+The flowgraph process keeps the top_block and a remote_plot_interface sink.
+The GUI process gets a stand-in for the top_block (gui.process.tb_proxy):
+  - traces go to it through a shared_trace_ring
+  - configuration changes go to it over an event pipe
+  - everything the GUI asks of the top_block comes back over a command pipe
+Rendering can then never hold the GIL of the process running the flowgraph.
+"""
+
+import logging
+import threading
+import multiprocessing
+from copy import copy
+
+from presets import PRESET_FIELDS, apply_settings, preset_store, settings_of
+from shmring import shared_trace_ring
+from sinks import partial_trace, trace_sink
+
+
+# pending_cfg fields the GUI can change, on top of those saved in presets
+REMOTE_FIELDS = PRESET_FIELDS + ("continuous_run",
+                                 "export_raw_time_data",
+                                 "export_raw_fft_data")
+
+
+def _gui_process_main(*args):
+    # wx is only ever imported in the gui process
+    from gui.process import serve
+    serve(*args)
+
+
+class _initial_state(object):
+    """What the gui process needs of the top_block to start, before there
+    is one."""
+    def __init__(self, cfg):
+        self.cfg = copy(cfg)
+        self.pending_preset = None
+        # the preset the top_block will start with
+        if cfg.preset:
+            presets = preset_store(cfg.presets_file)
+            if cfg.preset in presets.names():
+                presets.apply(cfg.preset, self.cfg)
+                self.pending_preset = cfg.preset
+        self.pending_cfg = copy(self.cfg)
+
+
+class remote_plot_interface(trace_sink):
+    """The flowgraph's end of a GUI running in another process.
+
+    The process is forked as this is made, so make it before the top_block
+    and pass it in: once UHD and the flowgraph have started threads, a
+    child forked from the process can inherit locks held by them and
+    deadlock. Python 2's multiprocessing can only fork.
+    """
+    RING_SLOTS = 8
+    INITIAL_CAPACITY = 1 << 16 # points per slot, grown on demand
+    CLOSE_TIMEOUT = 2 # seconds to wait for the gui process to exit
+
+    def __init__(self, cfg):
+        trace_sink.__init__(self)
+        self.logger = logging.getLogger('gr-analyzer.remote')
+        self.tb = None # set by attach
+        self.closed = False
+        self.partial = partial_trace() # trace being swept in progressive mode
+
+        self.ring = shared_trace_ring.create(self.RING_SLOTS,
+                                             self.INITIAL_CAPACITY)
+        self.old_rings = [] # replaced rings, removed on close
+
+        self.cmd_conn, child_cmd_conn = multiprocessing.Pipe()
+        child_evt_conn, self.evt_conn = multiprocessing.Pipe(duplex=False)
+        self.evt_lock = threading.Lock()
+
+        # Forked, so the gui starts from a copy of the configuration
+        self.process = multiprocessing.Process(target=_gui_process_main,
+                                               args=(_initial_state(cfg),
+                                                     self.ring.path,
+                                                     self.RING_SLOTS,
+                                                     self.INITIAL_CAPACITY,
+                                                     child_cmd_conn,
+                                                     child_evt_conn))
+        self.process.daemon = True
+        self.process.start()
+        self.server = None
+
+    def attach(self, tb):
+        """Start serving the gui's commands with tb."""
+        self.tb = tb
+        self.server = threading.Thread(target=self._serve_commands)
+        self.server.daemon = True
+        self.server.start()
+
+    def configure(self, cfg):
+        self.partial.configure(cfg.max_plotted_bin)
+        settings = settings_of(cfg, REMOTE_FIELDS)
+        self._send_event('configure', cfg.generation, settings)
+
+    def _send_event(self, *event):
+        with self.evt_lock:
+            self.evt_conn.send(event)
+
+    def update(self, points, info, partial=False):
+        if not self.is_alive():
+            return False
+
+        if len(points) > self.ring.capacity:
+            self._grow_ring(len(points))
+
+        redraw = self.redraw_plot.is_set()
+        self.ring.write(points, info, redraw, partial)
+        if redraw:
+            self.redraw_plot.clear()
+        self._publish_run_state()
+        return True
+
+    def update_segment(self, offset, points, info):
+        if self.partial.patch(offset, points):
+            return self.update(self.partial.points, info, partial=True)
+        return self.is_alive()
+
+    def _grow_ring(self, npoints):
+        """Move to a ring big enough for traces of npoints."""
+        capacity = self.ring.capacity
+        while capacity < npoints:
+            capacity *= 2
+        self.old_rings.append(self.ring)
+        self.ring = shared_trace_ring.create(self.RING_SLOTS, capacity)
+        self._send_event('ring', self.ring.path, self.RING_SLOTS, capacity)
+
+    def _publish_run_state(self):
+        self.ring.set_run_state(self.tb.single_run.is_set(),
+                                self.tb.continuous_run.is_set())
+
+    def keep_alive(self):
+        self._publish_run_state()
+        return self.is_alive()
+
+    def is_alive(self):
+        return not self.closed and self.process.is_alive()
+
+    def close(self):
+        self.closed = True
+        try:
+            self._send_event('close')
+        except IOError:
+            pass # already gone
+        self.process.join(self.CLOSE_TIMEOUT)
+        if self.process.is_alive():
+            self.process.terminate()
+        for ring in self.old_rings + [self.ring]:
+            ring.close(unlink=True)
+
+    ##########################
+    # Commands from the gui
+    ##########################
+
+    def _serve_commands(self):
+        while True:
+            try:
+                request = self.cmd_conn.recv()
+            except (EOFError, IOError):
+                self.closed = True # gui process went away
+                return
+
+            command, args = request[0], request[1:]
+            try:
+                reply = ('ok', getattr(self, '_cmd_' + command)(*args))
+            except Exception as err:
+                msg = "gui command {!r} failed".format(command)
+                self.logger.exception(msg)
+                reply = ('error', str(err))
+            self._publish_run_state()
+            self.cmd_conn.send(reply)
+
+    def _cmd_reconfigure(self, settings, redraw_plot):
+        apply_settings(settings, self.tb.pending_cfg)
+        self.tb.reconfigure(redraw_plot=redraw_plot)
+
+    def _cmd_apply_reconfigure(self, settings):
+        apply_settings(settings, self.tb.pending_cfg)
+        self.tb.apply_reconfigure()
+
+    def _cmd_set_single_run(self, settings):
+        apply_settings(settings, self.tb.pending_cfg)
+        self.tb.set_single_run()
+
+    def _cmd_set_continuous_run(self, settings):
+        apply_settings(settings, self.tb.pending_cfg)
+        self.tb.set_continuous_run()
+
+    def _cmd_get_gain(self):
+        return self.tb.usrp.get_gain()
+
+    def _cmd_set_gain(self, gain):
+        self.tb.usrp.set_gain(gain)
+
+    def _cmd_preset_names(self):
+        return self.tb.presets.names()
+
+    def _cmd_load_preset(self, name):
+        self.tb.load_preset(name)
+        return settings_of(self.tb.pending_cfg, REMOTE_FIELDS)
+
+    def _cmd_save_preset(self, name, settings):
+        apply_settings(settings, self.tb.pending_cfg)
+        self.tb.save_preset(name)
+
+    def _cmd_remove_preset(self, name):
+        self.tb.remove_preset(name)
+
+    def _cmd_has_time_data(self):
+        return self.tb.has_time_data()
+
+    def _cmd_has_freq_data(self):
+        return self.tb.has_freq_data()
+
+    def _cmd_save_time_data_to_file(self, path):
+        self.tb.save_time_data_to_file(path)
+
+    def _cmd_save_freq_data_to_file(self, path):
+        self.tb.save_freq_data_to_file(path)
+
+    def _cmd_close(self):
+        """The gui window was closed."""
+        self.closed = True
+        self.tb.stop()
+        self.tb.wait()
@@ -0,0 +1,106 @@
+from copy import copy
+import logging
+import os
+
+import numpy as np
+
+from analyzer import recorded_segments
+
+
+def replay_base(path):
+    """Return the base path of the SigMF recording at path."""
+    base, ext = os.path.splitext(path)
+    if ext in (".sigmf-meta", ".sigmf-data", ".sigmf"):
+        return base
+    return path
+
+
+class replay(object):
+    """Stand-in for usrp when replaying a SigMF recording (--replay).
+
+    The recording fixes the sample rate and the frequencies that can be
+    tuned, so apply_cfg holds the configuration to them, much as the USRP
+    holds it to the rates it supports. Everything downstream of the radio,
+    fft size, window, detector and number of frames, can be changed freely
+    as long as a segment holds fft_size * nframes samples.
+
+    The replay_source_c in the chain plays the part of both the USRP and
+    its controller, and calls tune as it starts each segment.
+    """
+    def __init__(self, cfg):
+        self.logger = logging.getLogger('gr-analyzer.replay')
+
+        self.base = replay_base(cfg.replay)
+        self.sample_rate, segments = recorded_segments(self.base)
+        if not segments:
+            raise RuntimeError("No segments in {}".format(cfg.replay))
+
+        self.freqs = np.array(sorted(set(s['frequency'] for s in segments)))
+        self.segment_len = min(s['length'] for s in segments)
+        gains = [s['gain'] for s in segments if s['gain'] is not None]
+        self.gain = gains[0] if gains else None
+
+        msg = "Replaying {} segments at {} S/s from {}"
+        self.logger.info(msg.format(len(segments), self.sample_rate,
+                                    self.base + ".sigmf-data"))
+
+        self.apply_cfg(cfg)
+
+    def get_cfg(self):
+        self.cfg_updated = False
+        return self.cfg
+
+    def apply_cfg(self, cfg):
+        """Return True if cfg modified, else False"""
+
+        self.cfg = copy(cfg)
+        modified = False
+
+        if cfg.sample_rate != self.sample_rate:
+            self.cfg.sample_rate = self.sample_rate
+            self.cfg.update()
+            modified = True
+
+        nframes = self.segment_len // self.cfg.fft_size
+        if not nframes:
+            msg = "Recorded segments of {} samples are shorter than the fft"
+            raise RuntimeError(msg.format(self.segment_len))
+        if self.cfg.nframes > nframes:
+            msg = "Recorded segments only hold {} frames of {} bins"
+            self.logger.warn(msg.format(nframes, self.cfg.fft_size))
+            self.cfg.nframes = nframes
+            modified = True
+
+        for fc in self.cfg.center_freqs:
+            nearest = self.freqs[np.abs(self.freqs - fc).argmin()]
+            if abs(nearest - fc) > self.cfg.deltaf / 2:
+                msg = "Nothing recorded at {} Hz, replaying {} Hz instead"
+                self.logger.warn(msg.format(fc, nearest))
+
+        if self.cfg.gain is None:
+            self.cfg.gain = self.gain
+
+        return modified
+
+    def tune(self, freq, gain):
+        """Called by the replay_source_c as it starts a segment."""
+        if gain is not None:
+            self.gain = gain
+
+    def set_clock_rate(self, rate):
+        return self.sample_rate
+
+    def get_clock_rate(self):
+        return self.sample_rate
+
+    def set_sample_rate(self, rate, auto_adjust_master_clock=True):
+        """The recording's rate is the only one available."""
+        return self.sample_rate
+
+    def set_gain(self, gain):
+        """The gain is recorded in the samples, so can't be changed."""
+        self.logger.warn("Can't change the gain of a recording")
+
+    def get_gain(self):
+        """Return the gain the segment being replayed was recorded at."""
+        return self.gain
@@ -0,0 +1,34 @@
+"""A fixed-size history of traces for image views like the waterfall."""
+
+import numpy as np
+
+
+class trace_ring(object):
+    """A fixed-depth history of equal-length rows, preallocated.
+
+    Every row is stored twice, depth rows apart, so the history from oldest to
+    newest is always the contiguous slice buf[head:head + depth]. Reading it
+    never copies or rolls the buffer, and writing costs one row.
+    """
+    def __init__(self, depth, width, dtype=np.float32):
+        self.depth = depth
+        self.width = width
+        self.buf = np.empty((2 * depth, width), dtype=dtype)
+        self.head = 0 # slot of the oldest row, next to be overwritten
+        self.clear()
+
+    def clear(self):
+        """Forget all rows. Empty rows are NaN, which plots as blank."""
+        self.buf.fill(np.nan)
+
+    def push(self, row):
+        """Overwrite the oldest row with row."""
+        i = self.head
+        self.buf[i] = row
+        self.buf[i + self.depth] = row
+        self.head = (i + 1) % self.depth
+
+    def view(self):
+        """Return the history, oldest row first, as a view of the buffer."""
+        head = self.head
+        return self.buf[head:head + self.depth]
@@ -0,0 +1,124 @@
+"""A ring of traces in shared memory, written by one process and read by
+another."""
+
+import os
+import mmap
+import tempfile
+
+import numpy as np
+
+
+# ring header, uint64 words
+_WRITE_SEQ = 0      # sequence number of the latest complete trace
+_SINGLE_RUN = 1     # run state of the writer's flowgraph
+_CONTINUOUS_RUN = 2
+_HEADER_WORDS = 8
+
+# per slot header, uint64 words
+_SEQ = 0            # sequence number of the trace in the slot, 0 if torn
+_NPOINTS = 1
+_GENERATION = 2     # configuration the trace was produced under
+_REDRAW = 3
+_PARTIAL = 4        # the trace is still being swept
+_SWEEP = 5          # sweep sequence number within the generation
+_START_TIME = 6     # float64 host times of the sweep, see trace_info
+_END_TIME = 7       # NaN while the sweep is in progress
+_SLOT_WORDS = 8
+
+
+class shared_trace_ring(object):
+    """Fixed-capacity slots of float32 traces in a memory-mapped file.
+
+    The writer never waits: it overwrites the oldest slot and bumps the
+    slot's sequence number last, seqlock style. A reader copies a slot and
+    checks the sequence number again, so a trace overwritten while being
+    read is skipped rather than returned torn.
+    """
+    def __init__(self, path, nslots, capacity, create=False):
+        self.path = path
+        self.nslots = nslots
+        self.capacity = capacity
+
+        meta_bytes = 8 * (_HEADER_WORDS + nslots * _SLOT_WORDS)
+        size = meta_bytes + 4 * nslots * capacity
+        with open(path, 'w+b' if create else 'r+b') as f:
+            if create:
+                f.truncate(size)
+            self.mm = mmap.mmap(f.fileno(), size)
+
+        self.header = np.frombuffer(self.mm, np.uint64, _HEADER_WORDS)
+        self.meta = np.frombuffer(self.mm, np.uint64, nslots * _SLOT_WORDS,
+                                  8 * _HEADER_WORDS).reshape(nslots, -1)
+        self.times = self.meta.view(np.float64) # same words, as float64
+        self.data = np.frombuffer(self.mm, np.float32, nslots * capacity,
+                                  meta_bytes).reshape(nslots, capacity)
+
+    @classmethod
+    def create(cls, nslots, capacity):
+        """Create a ring in a new file, in /dev/shm where available."""
+        tmpdir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+        fd, path = tempfile.mkstemp(prefix="gr-analyzer-", dir=tmpdir)
+        os.close(fd)
+        return cls(path, nslots, capacity, create=True)
+
+    def write(self, points, info, redraw, partial=False):
+        """Publish a trace of at most capacity points, and its trace_info."""
+        seq = int(self.header[_WRITE_SEQ]) + 1
+        meta = self.meta[seq % self.nslots]
+        times = self.times[seq % self.nslots]
+        npoints = len(points)
+
+        meta[_SEQ] = 0 # torn until the trace is complete
+        self.data[seq % self.nslots, :npoints] = points
+        meta[_NPOINTS] = npoints
+        meta[_GENERATION] = info.generation
+        meta[_REDRAW] = redraw
+        meta[_PARTIAL] = partial
+        meta[_SWEEP] = info.seq
+        times[_START_TIME] = info.start_time
+        times[_END_TIME] = np.nan if info.end_time is None else info.end_time
+        meta[_SEQ] = seq
+        self.header[_WRITE_SEQ] = seq
+
+    def read_since(self, last_seq):
+        """Yield (seq, info, redraw, partial, points) of every trace
+        published after last_seq that's still in the ring, oldest first.
+
+        info is a (generation, sweep seq, start_time, end_time) tuple, in the
+        order of the fields of a trace_info.
+        """
+        latest = int(self.header[_WRITE_SEQ])
+        for seq in xrange(max(last_seq + 1, latest - self.nslots + 1),
+                          latest + 1):
+            meta = self.meta[seq % self.nslots]
+            times = self.times[seq % self.nslots]
+            if meta[_SEQ] != seq:
+                continue # overwritten already
+            npoints = int(meta[_NPOINTS])
+            end_time = float(times[_END_TIME])
+            info = (int(meta[_GENERATION]),
+                    int(meta[_SWEEP]),
+                    float(times[_START_TIME]),
+                    None if np.isnan(end_time) else end_time)
+            redraw = bool(meta[_REDRAW])
+            partial = bool(meta[_PARTIAL])
+            points = self.data[seq % self.nslots, :npoints].copy()
+            if meta[_SEQ] != seq:
+                continue # overwritten while copying
+            yield seq, info, redraw, partial, points
+
+    def set_run_state(self, single_run, continuous_run):
+        self.header[_SINGLE_RUN] = single_run
+        self.header[_CONTINUOUS_RUN] = continuous_run
+
+    def run_state(self):
+        """Return the writer's (single_run, continuous_run)."""
+        return (bool(self.header[_SINGLE_RUN]),
+                bool(self.header[_CONTINUOUS_RUN]))
+
+    def close(self, unlink=False):
+        # numpy views keep the map alive, so drop them before closing it
+        self.header = self.meta = self.times = self.data = None
+        self.mm.close()
+        if unlink:
+            os.unlink(self.path)
@@ -0,0 +1,320 @@
+"""Consumers of stitched traces.
+
+plotter_f hands every trace to a single trace_sink. The GUI
+(gui.plot_interface) is one implementation; the sinks in this module let the
+analyzer run without a display.
+
+Every trace comes with an analyzer.trace_info: the configuration generation
+it was produced under (cfg.generation of the configure call that preceded
+it), its sweep sequence number and the host times its sweep started and
+ended.
+"""
+
+import time
+import socket
+import struct
+import logging
+import threading
+from Queue import Queue, Full, Empty
+
+import numpy as np
+
+
+# Record written by file_sink and network_sink, little endian:
+#   float64  host time the sweep started
+#   float64  host time the sweep ended
+#   uint32   configuration generation
+#   uint32   sweep sequence number within the generation
+#   float64  frequency of the first bin in Hz
+#   float64  bin width in Hz
+#   uint32   number of points
+# followed by the points as float32 dBm.
+RECORD_HEADER = struct.Struct("<ddIIddI")
+
+
+def pack_record_header(npoints, info, cfg):
+    """Return the header of a trace record for a trace of npoints."""
+    return RECORD_HEADER.pack(info.start_time, info.end_time,
+                              info.generation, info.seq,
+                              cfg.min_freq, cfg.deltaf, npoints)
+
+
+class trace_sink(object):
+    """Base class for anything that consumes stitched traces."""
+    def __init__(self):
+        # Set whenever the next trace comes from a new configuration
+        self.redraw_plot = threading.Event()
+
+    def configure(self, cfg):
+        """Called with the new configuration every time the flowgraph is
+        (re)configured, before any trace produced under it arrives. Traces
+        produced under it have info.generation == cfg.generation."""
+        pass
+
+    def update(self, points, info):
+        """Consume one trace and its trace_info. Return False if the sink
+        has gone away.
+
+        points is only valid for the duration of the call.
+        """
+        raise NotImplementedError
+
+    def update_segment(self, offset, points, info):
+        """Consume the bins of one segment of the trace being swept, which
+        start at bin offset, in progressive mode (--progressive). info is
+        that of the sweep, with no end_time yet. The whole trace still goes
+        to update once the sweep is complete, so sinks that only want
+        consistent traces can ignore segments.
+
+        points is only valid for the duration of the call.
+        """
+        return self.is_alive()
+
+    def keep_alive(self):
+        """Called periodically while the flowgraph is idle."""
+        return self.is_alive()
+
+    def is_alive(self):
+        return True
+
+    def stats(self):
+        """Return the telemetry of the sink and any files it writes, as a
+        dict of name to stats (see analyzer.async_writer.stats)."""
+        return {}
+
+    def close(self):
+        pass
+
+
+class partial_trace(object):
+    """The trace being swept, patched together from segments.
+
+    Bins not yet swept since the last configure are NaN, which plots as a
+    gap. Otherwise they hold the previous sweep's power.
+    """
+    MAX_FPS = 30 # partial traces worth showing per second, at most
+
+    def __init__(self):
+        self.points = None
+        self.last_shown = 0
+
+    def configure(self, npoints):
+        self.points = np.full(npoints, np.nan, dtype=np.float32)
+
+    def patch(self, offset, bins):
+        """Copy in one segment's bins. Return True if it's time to show
+        the partial trace again."""
+        if self.points is None or offset + len(bins) > len(self.points):
+            return False
+        self.points[offset:offset + len(bins)] = bins
+
+        now = time.time()
+        if now - self.last_shown < 1.0 / self.MAX_FPS:
+            return False
+        self.last_shown = now
+        return True
+
+
+class _event_group(object):
+    """A threading.Event look-alike that sets and clears several events."""
+    def __init__(self, events):
+        self.events = events
+
+    def set(self):
+        for event in self.events:
+            event.set()
+
+    def clear(self):
+        for event in self.events:
+            event.clear()
+
+    def is_set(self):
+        return any(event.is_set() for event in self.events)
+
+
+class multi_sink(trace_sink):
+    """Fan traces out to several sinks."""
+    def __init__(self, sinks):
+        self.sinks = list(sinks)
+        self.redraw_plot = _event_group([s.redraw_plot for s in self.sinks])
+
+    def configure(self, cfg):
+        for sink in self.sinks:
+            sink.configure(cfg)
+
+    def update(self, points, info):
+        alive = [sink.update(points, info) for sink in self.sinks]
+        return all(alive)
+
+    def update_segment(self, offset, points, info):
+        alive = [sink.update_segment(offset, points, info)
+                 for sink in self.sinks]
+        return all(alive)
+
+    def keep_alive(self):
+        alive = [sink.keep_alive() for sink in self.sinks]
+        return all(alive)
+
+    def is_alive(self):
+        return all(sink.is_alive() for sink in self.sinks)
+
+    def stats(self):
+        stats = {}
+        for sink in self.sinks:
+            stats.update(sink.stats())
+        return stats
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+class callback_sink(trace_sink):
+    """Call a function with every trace and its trace_info.
+
+    The callback runs in the flowgraph's thread and receives a view of the
+    flowgraph's buffer, so it should be quick and copy anything it keeps.
+    Returning False from the callback stops the flowgraph.
+    """
+    def __init__(self, callback):
+        trace_sink.__init__(self)
+        self.callback = callback
+
+    def update(self, points, info):
+        return self.callback(points, info) is not False
+
+
+class queue_sink(trace_sink):
+    """Hand copies of traces to other threads through a bounded queue.
+
+    When the queue is full the oldest trace is dropped, so a slow consumer
+    never stalls the flowgraph. Items are (info, points) tuples.
+    """
+    def __init__(self, maxsize=1):
+        trace_sink.__init__(self)
+        self.queue = Queue(maxsize)
+        self.dropped = 0
+
+    def update(self, points, info):
+        item = (info, np.array(points, dtype=np.float32))
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return True
+            except Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except Empty:
+                    pass
+
+    def get(self, block=True, timeout=None):
+        """Return the oldest queued (info, points) tuple."""
+        return self.queue.get(block, timeout)
+
+
+class file_sink(trace_sink):
+    """Append every trace to a file as a RECORD_HEADER + float32 record.
+
+    Records are written by an async_writer, so the flowgraph never waits for
+    the disk. A record the disk can't take in time is dropped whole.
+    """
+    def __init__(self, path):
+        # only imported here, keeping this module importable without the
+        # analyzer package
+        from analyzer import async_writer
+
+        trace_sink.__init__(self)
+        self.logger = logging.getLogger('gr-analyzer.file_sink')
+        self.cfg = None
+        self.writer = async_writer(path, append=True)
+        self.logger.info("Recording traces to {}".format(path))
+
+    def configure(self, cfg):
+        self.cfg = cfg
+
+    def update(self, points, info):
+        points = np.asarray(points, dtype='<f4')
+        self.writer.write(pack_record_header(len(points), info, self.cfg) +
+                          points.tostring())
+        return True
+
+    def stats(self):
+        return {'record': self.writer.stats()}
+
+    def close(self):
+        self.writer.close()
+
+
+class network_sink(trace_sink):
+    """Publish traces to any number of TCP clients.
+
+    Each trace is sent as the same record that file_sink writes. A client
+    that can't keep up is disconnected rather than allowed to stall the
+    flowgraph.
+    """
+    SEND_TIMEOUT = 0.05 # seconds
+
+    def __init__(self, port, host=''):
+        trace_sink.__init__(self)
+        self.logger = logging.getLogger('gr-analyzer.network_sink')
+        self.cfg = None
+        self.clients = []
+        self.lock = threading.Lock()
+
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind((host, port))
+        self.server.listen(5)
+
+        self.acceptor = threading.Thread(target=self._accept)
+        self.acceptor.daemon = True
+        self.acceptor.start()
+        self.logger.info("Publishing traces on TCP port {}".format(port))
+
+    def _accept(self):
+        while True:
+            try:
+                conn, addr = self.server.accept()
+            except socket.error:
+                return # server socket was closed
+            conn.settimeout(self.SEND_TIMEOUT)
+            with self.lock:
+                self.clients.append(conn)
+            self.logger.info("Client {}:{} connected".format(*addr))
+
+    def configure(self, cfg):
+        self.cfg = cfg
+
+    def update(self, points, info):
+        with self.lock:
+            if not self.clients:
+                return True
+            clients = list(self.clients)
+
+        points = np.asarray(points, dtype='<f4')
+        header = pack_record_header(len(points), info, self.cfg)
+        record = header + points.tostring()
+
+        for conn in clients:
+            try:
+                conn.sendall(record)
+            except socket.error:
+                # A partial record can't be recovered from, so drop the client
+                self.logger.warning("Dropping slow or closed client")
+                conn.close()
+                with self.lock:
+                    self.clients.remove(conn)
+
+        return True
+
+    def close(self):
+        try:
+            self.server.shutdown(socket.SHUT_RDWR) # wake up the acceptor
+        except socket.error:
+            pass
+        self.server.close()
+        with self.lock:
+            for conn in self.clients:
+                conn.close()
+            self.clients = []
@@ -0,0 +1,362 @@
+#!/usr/bin/env python
+"""Read recorded traces back for analysis in numpy.
+
+Reads the three formats traces are recorded in:
+  - a trace store (--store), whose chunks are memory mapped
+  - a record file (--record, file_sink), memory mapped as a whole
+  - an archive (--archive), whose blocks are decoded one at a time
+as trace_blocks, runs of traces on one frequency axis, the (min_freq,
+deltaf) the analyzer swept them with, so bin i of a trace is at
+min_freq + i * deltaf Hz, as in cfg.bin_freqs.
+
+Selecting a frequency range and time range of a memory-mapped block
+returns a view of the file, so nothing is read until it's used, and
+iter_blocks streams the blocks of any number of recordings, e.g. a store
+per day, reading only those the tiles say overlap the ranges:
+
+  for block in iter_blocks(paths, freq_range=(88e6, 108e6)):
+      peaks = block.traces.max(axis=1)
+
+Run as a script, it lists the blocks of recordings, or with --peak prints
+the strongest bin of every trace, e.g.
+
+  ./tracereader.py /data/store --freq 88M 108M --time 2024-05-01T00:00 \\
+      2024-05-02T00:00 --peak
+"""
+
+from __future__ import print_function
+
+import os
+import time
+import argparse
+
+import numpy as np
+
+from sinks import RECORD_HEADER
+from tracestore import (INDEX_FILE, TILES_FILE, read_index, read_tiles,
+                        select_chunks)
+from archive import BLOCK_MAGIC, TILES_SUFFIX, archive_reader
+
+
+# RECORD_HEADER as a numpy dtype, so a run of records can be viewed as an
+# array of headers
+RECORD_DTYPE = np.dtype([
+    ('start_time', '<f8'),
+    ('end_time', '<f8'),
+    ('generation', '<u4'),
+    ('seq', '<u4'),
+    ('min_freq', '<f8'),
+    ('deltaf', '<f8'),
+    ('npoints', '<u4'),
+])
+assert RECORD_DTYPE.itemsize == RECORD_HEADER.size
+
+
+class trace_block(object):
+    """Consecutive traces on one frequency axis.
+
+    traces is a 2-D float32 array of dBm, one row per trace, and meta the
+    trace_info of every row (fields generation, seq, start_time and
+    end_time), both often views of a memory-mapped file.
+    """
+    def __init__(self, axis, traces, meta):
+        self.axis = axis  # (min_freq, deltaf)
+        self.traces = traces
+        self.meta = meta
+
+    @property
+    def start_time(self):
+        return float(self.meta['start_time'][0])
+
+    @property
+    def end_time(self):
+        return float(self.meta['end_time'][-1])
+
+    def freqs(self):
+        """Return the frequency of every bin."""
+        min_freq, deltaf = self.axis
+        return min_freq + np.arange(self.traces.shape[1]) * deltaf
+
+    def select(self, freq_range=None, time_range=None):
+        """Return the block of the bins in freq_range and the traces in
+        time_range, each a (start, end) pair or None for all, or None if
+        there are none. traces and meta of the result are views of this
+        block's."""
+        min_freq, deltaf = self.axis
+        npoints = self.traces.shape[1]
+        first, stop = 0, npoints
+        if freq_range is not None:
+            lo, hi = freq_range
+            first = max(int(np.ceil((lo - min_freq) / deltaf)), 0)
+            stop = min(int(np.floor((hi - min_freq) / deltaf)) + 1, npoints)
+
+        # sweeps are recorded in order, so a time range is a run of rows
+        start_row, stop_row = 0, len(self.traces)
+        if time_range is not None:
+            start, end = time_range
+            start_row = np.searchsorted(self.meta['end_time'], start)
+            stop_row = np.searchsorted(self.meta['start_time'], end,
+                                       side='right')
+
+        if first >= stop or start_row >= stop_row:
+            return None
+        return trace_block((min_freq + first * deltaf, deltaf),
+                           self.traces[start_row:stop_row, first:stop],
+                           self.meta[start_row:stop_row])
+
+
+def _overlaps(start_time, end_time, min_freq, max_freq, time_range,
+              freq_range):
+    if time_range is not None:
+        if end_time < time_range[0] or start_time > time_range[1]:
+            return False
+    if freq_range is not None:
+        if max_freq < freq_range[0] or min_freq > freq_range[1]:
+            return False
+    return True
+
+
+class store_reader(object):
+    """Read the chunks of a trace store, memory mapped."""
+    def __init__(self, path):
+        self.path = path
+        self.entries = read_index(path)
+
+    def blocks(self, freq_range=None, time_range=None):
+        """Yield the trace_block of every chunk with traces in freq_range
+        and time_range, cut down to them."""
+        entries = self.entries
+        if freq_range is not None or time_range is not None:
+            # the tiles find the chunks, keeping any without tiles
+            tiles = read_tiles(os.path.join(self.path, TILES_FILE))
+            chunks = set(select_chunks(tiles, [e['chunk'] for e in entries],
+                                       time_range, freq_range))
+            entries = [e for e in entries if e['chunk'] in chunks]
+
+        for entry in entries:
+            axis = (entry['min_freq'], entry['deltaf'])
+            traces = np.load(os.path.join(self.path, entry['data']),
+                             mmap_mode='r')
+            meta = np.load(os.path.join(self.path, entry['meta']),
+                           mmap_mode='r')
+            block = trace_block(axis, traces, meta)
+            block = block.select(freq_range, time_range)
+            if block is not None:
+                yield block
+
+    def close(self):
+        pass
+
+
+class record_reader(object):
+    """Read a record file written by file_sink (--record), memory mapped.
+
+    Consecutive records of the same axis and length are viewed as one
+    trace_block, whose traces and meta are strided views of the file, so
+    records are never copied. A record cut short at the end of the file
+    is ignored.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.runs = []  # (offset, nrecords, npoints, min_freq, deltaf)
+        if not os.path.getsize(path):
+            self.data = None
+            return
+        self.data = np.memmap(path, np.uint8, 'r')
+        self._find_runs()
+
+    def _headers(self, offset, npoints):
+        """Return a strided view of the headers of the records of npoints
+        from offset to the end of the file."""
+        record_size = RECORD_HEADER.size + 4 * npoints
+        nrecords = (len(self.data) - offset) // record_size
+        return np.ndarray((nrecords,), RECORD_DTYPE, self.data, offset,
+                          (record_size,))
+
+    def _find_runs(self):
+        offset = 0
+        while len(self.data) - offset >= RECORD_HEADER.size:
+            first = np.ndarray((), RECORD_DTYPE, self.data, offset)
+            npoints = int(first['npoints'])
+            headers = self._headers(offset, npoints)
+            if not len(headers):
+                break
+            # the run ends at the first record on another axis
+            same = ((headers['npoints'] == npoints) &
+                    (headers['min_freq'] == first['min_freq']) &
+                    (headers['deltaf'] == first['deltaf']))
+            nrecords = len(same) if same.all() else int(same.argmin())
+            self.runs.append((offset, nrecords, npoints,
+                              float(first['min_freq']),
+                              float(first['deltaf'])))
+            offset += nrecords * (RECORD_HEADER.size + 4 * npoints)
+
+    def blocks(self, freq_range=None, time_range=None):
+        """Yield a trace_block of every run of records with traces in
+        freq_range and time_range, cut down to them."""
+        for offset, nrecords, npoints, min_freq, deltaf in self.runs:
+            record_size = RECORD_HEADER.size + 4 * npoints
+            meta = self._headers(offset, npoints)[:nrecords]
+            if not _overlaps(meta['start_time'][0], meta['end_time'][-1],
+                             min_freq, min_freq + (npoints - 1) * deltaf,
+                             time_range, freq_range):
+                continue
+            traces = np.ndarray((nrecords, npoints), '<f4', self.data,
+                                offset + RECORD_HEADER.size,
+                                (record_size, 4))
+            block = trace_block((min_freq, deltaf), traces, meta)
+            block = block.select(freq_range, time_range)
+            if block is not None:
+                yield block
+
+    def close(self):
+        self.data = None
+
+
+class archive_blocks(object):
+    """Read the blocks of an archive (--archive).
+
+    Blocks are compressed, so each is decoded as it's yielded and selecting
+    from it copies nothing further; only the blocks the tiles say overlap
+    the ranges are decoded.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.reader = archive_reader(path)
+
+    def blocks(self, freq_range=None, time_range=None):
+        """Yield the trace_block of every block with traces in freq_range
+        and time_range, cut down to them."""
+        numbers = range(len(self.reader.blocks))
+        if freq_range is not None or time_range is not None:
+            # the tiles find the blocks, keeping any without tiles
+            numbers = select_chunks(read_tiles(self.path + TILES_SUFFIX),
+                                    numbers, time_range, freq_range)
+
+        for i in numbers:
+            info = self.reader.blocks[i]
+            meta, traces = self.reader.read(i)
+            block = trace_block((info['min_freq'], info['deltaf']),
+                                traces, meta)
+            block = block.select(freq_range, time_range)
+            if block is not None:
+                yield block
+
+    def close(self):
+        self.reader.close()
+
+
+def open_traces(path):
+    """Return the reader of the recording at path: a trace store
+    directory, an archive or a record file."""
+    if os.path.isdir(path):
+        if not os.path.exists(os.path.join(path, INDEX_FILE)):
+            raise ValueError("{} is not a trace store".format(path))
+        return store_reader(path)
+    with open(path, 'rb') as f:
+        magic = f.read(len(BLOCK_MAGIC))
+    if magic == BLOCK_MAGIC:
+        return archive_blocks(path)
+    return record_reader(path)
+
+
+def iter_blocks(paths, freq_range=None, time_range=None):
+    """Yield the trace_blocks of the recordings at paths, in turn, with
+    traces in freq_range and time_range, each a (start, end) pair or None
+    for all.
+
+    One recording is open at a time, so this streams through any amount
+    of data for batch jobs.
+    """
+    if isinstance(paths, basestring):
+        paths = [paths]
+    for path in paths:
+        reader = open_traces(path)
+        try:
+            for block in reader.blocks(freq_range, time_range):
+                yield block
+        finally:
+            reader.close()
+
+
+def iter_traces(paths, freq_range=None, time_range=None):
+    """Yield (axis, meta, points) of every trace of the recordings at
+    paths, as iter_blocks selects them."""
+    for block in iter_blocks(paths, freq_range, time_range):
+        for meta, points in zip(block.meta, block.traces):
+            yield block.axis, meta, points
+
+
+def read_traces(paths, freq_range=None, time_range=None):
+    """Return the trace_blocks of the recordings at paths as a list."""
+    return list(iter_blocks(paths, freq_range, time_range))
+
+
+def parse_time(value):
+    """Convert a time argument, seconds since the epoch or a local
+    YYYY-mm-ddTHH:MM[:SS], to seconds since the epoch."""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    for fmt in ("%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M", "%Y-%m-%d"):
+        try:
+            return time.mktime(time.strptime(value, fmt))
+        except ValueError:
+            pass
+    msg = "invalid time: {0!r}, use seconds or YYYY-mm-ddTHH:MM:SS"
+    raise argparse.ArgumentTypeError(msg.format(value))
+
+
+def _format_time(t):
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(t))
+
+
+def main():
+    # imported here, so the library doesn't need gnuradio
+    from cli_parser import eng_float
+
+    parser = argparse.ArgumentParser(
+        description="List or scan recorded traces")
+    parser.add_argument("paths", nargs="+", metavar="path",
+                        help="trace store, archive or record file")
+    parser.add_argument("--freq", type=eng_float, nargs=2, default=None,
+                        metavar=("low", "high"),
+                        help="only the bins from low to high Hz")
+    parser.add_argument("--time", type=parse_time, nargs=2, default=None,
+                        metavar=("start", "end"),
+                        help="only the sweeps from start to end, seconds" +
+                             " or local YYYY-mm-ddTHH:MM:SS")
+    parser.add_argument("--peak", action="store_true",
+                        help="print the strongest bin of every trace" +
+                             " instead of listing blocks")
+    args = parser.parse_args()
+
+    if args.peak:
+        print("{:<19} {:>16} {:>10}".format("start", "freq (Hz)", "dBm"))
+    ntraces = 0
+    for block in iter_blocks(args.paths, args.freq, args.time):
+        ntraces += len(block.traces)
+        if not args.peak:
+            min_freq, deltaf = block.axis
+            max_freq = min_freq + (block.traces.shape[1] - 1) * deltaf
+            print("{} - {}  {:>6} traces  {:>7} bins  {:.6g} - {:.6g} Hz"
+                  .format(_format_time(block.start_time),
+                          _format_time(block.end_time),
+                          len(block.traces), block.traces.shape[1],
+                          min_freq, max_freq))
+            continue
+        freqs = block.freqs()
+        for meta, points in zip(block.meta, block.traces):
+            if np.isnan(points).all():
+                continue
+            peak = np.nanargmax(points)
+            print("{} {:>16.0f} {:>10.1f}".format(
+                _format_time(meta['start_time']), freqs[peak],
+                points[peak]))
+    if not args.peak:
+        print("{} traces".format(ntraces))
+
+
+if __name__ == '__main__':
+    main()
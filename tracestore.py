@@ -0,0 +1,328 @@
+"""Record traces continuously to a chunked, append-only trace store.
+
+A store is a directory of chunks. Every chunk holds the traces of a single
+configuration, so they share one frequency axis, in two .npy files:
+  NNNNNN.npy       float32 dBm, one row per trace
+  NNNNNN.meta.npy  one TRACE_META_DTYPE row per trace (its trace_info)
+Once both are written, a line describing the chunk is appended to
+index.jsonl. A chunk missing from the index, e.g. after a crash, is ignored,
+so readers only ever see whole chunks and can memory-map them.
+
+Alongside, tiles.bin summarizes every chunk as tiles of TILE_BINS bins,
+one TILE_DTYPE record per tile with the time and frequency it covers and
+the min, max and mean power in it. A query for a band and a time span
+reads the tiles alone to find the chunks worth reading, and questions such
+as "was anything above -70 dBm there?" are answered by the tiles without
+reading any chunk. A chunk's tiles are written before its index line, and
+the tiles of a chunk that never made the index are dropped when the store
+is next opened; a chunk with no tiles at all is never ruled out.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from Queue import Queue, Full, Empty
+
+import numpy as np
+
+from sinks import trace_sink
+
+
+STORE_VERSION = 1
+INDEX_FILE = "index.jsonl"
+STORE_FILE = "store.json"
+TILES_FILE = "tiles.bin"
+TILE_BINS = 256  # bins per tile, at most
+
+TRACE_META_DTYPE = np.dtype([
+    ('generation', '<u4'),
+    ('seq', '<u4'),
+    ('start_time', '<f8'),
+    ('end_time', '<f8'),
+])
+
+
+TILE_DTYPE = np.dtype([
+    ('chunk', '<u4'),       # chunk of a store, block of an archive
+    ('start_time', '<f8'),  # start of the first sweep in the chunk
+    ('end_time', '<f8'),    # end of the last sweep in the chunk
+    ('min_freq', '<f8'),    # frequency of the first bin of the tile
+    ('max_freq', '<f8'),    # frequency of the last bin of the tile
+    ('min', '<f4'),         # power over the tile's bins and traces, dBm
+    ('max', '<f4'),
+    ('mean', '<f4'),        # NaN if every point is NaN, as are min and max
+])
+
+
+def summarize_tiles(chunk, axis, traces, meta):
+    """Return the TILE_DTYPE records of a chunk of traces."""
+    min_freq, deltaf = axis
+    npoints = traces.shape[1]
+    starts = np.arange(0, npoints, TILE_BINS)
+    stops = np.minimum(starts + TILE_BINS, npoints)
+
+    # reduce the traces to one row, then the row to tiles; fmin and fmax
+    # skip NaN unless there's nothing else
+    valid = ~np.isnan(traces)
+    sums = np.add.reduceat(np.where(valid, traces, 0).sum(axis=0,
+                                                         dtype=np.float64),
+                           starts)
+    counts = np.add.reduceat(valid.sum(axis=0), starts)
+
+    tiles = np.zeros(len(starts), dtype=TILE_DTYPE)
+    tiles['chunk'] = chunk
+    tiles['start_time'] = meta['start_time'][0]
+    tiles['end_time'] = meta['end_time'][-1]
+    tiles['min_freq'] = min_freq + starts * deltaf
+    tiles['max_freq'] = min_freq + (stops - 1) * deltaf
+    tiles['min'] = np.fmin.reduceat(np.fmin.reduce(traces, axis=0), starts)
+    tiles['max'] = np.fmax.reduceat(np.fmax.reduce(traces, axis=0), starts)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        tiles['mean'] = np.where(counts, sums / counts, np.nan)
+    return tiles
+
+
+def read_tiles(path):
+    """Return the tiles of the tile file at path, memory mapped, or an
+    empty array if there are none."""
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        size = 0
+    # a record cut short by a crash isn't a tile
+    ntiles = size // TILE_DTYPE.itemsize
+    if not ntiles:
+        return np.zeros(0, dtype=TILE_DTYPE)
+    return np.memmap(path, TILE_DTYPE, 'r', shape=(ntiles,))
+
+
+def select_tiles(tiles, time_range=None, freq_range=None):
+    """Return the tiles overlapping time_range and freq_range, each a
+    (start, end) pair or None for any."""
+    mask = np.ones(len(tiles), dtype=bool)
+    if time_range is not None:
+        start, end = time_range
+        mask &= (tiles['end_time'] >= start) & (tiles['start_time'] <= end)
+    if freq_range is not None:
+        lo, hi = freq_range
+        mask &= (tiles['max_freq'] >= lo) & (tiles['min_freq'] <= hi)
+    return tiles[mask]
+
+
+def select_chunks(tiles, chunks, time_range=None, freq_range=None):
+    """Return those of chunks, a list of chunk numbers, with tiles
+    overlapping time_range and freq_range, or with no tiles at all, which
+    can't be ruled out (e.g. a store written before there were tiles)."""
+    tiled = set(np.unique(tiles['chunk']).tolist())
+    tiles = select_tiles(tiles, time_range, freq_range)
+    selected = set(np.unique(tiles['chunk']).tolist())
+    return [c for c in chunks if c in selected or c not in tiled]
+
+
+class tile_writer(object):
+    """Append the tiles of every chunk written to a tile file.
+
+    nchunks is the number of whole chunks already written; the tiles of
+    any after them, written before a crash cut their chunk short, are
+    dropped, as is a record cut short.
+    """
+    def __init__(self, path, nchunks):
+        self.path = path
+        # the tiles are in chunk order
+        keep = int(np.searchsorted(read_tiles(path)['chunk'], nchunks))
+        self.f = open(path, 'ab')
+        self.f.truncate(keep * TILE_DTYPE.itemsize)
+
+    def append(self, chunk, axis, traces, meta):
+        summarize_tiles(chunk, axis, traces, meta).tofile(self.f)
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+def query_store(path, time_range=None, freq_range=None):
+    """Return the index entries of the chunks of the store at path with
+    traces overlapping time_range and freq_range, found from the tiles."""
+    entries = read_index(path)
+    chunks = set(select_chunks(read_tiles(os.path.join(path, TILES_FILE)),
+                               [entry['chunk'] for entry in entries],
+                               time_range, freq_range))
+    return [entry for entry in entries if entry['chunk'] in chunks]
+
+
+def read_index(path):
+    """Return the chunk entries of the store at path, oldest first."""
+    try:
+        with open(os.path.join(path, INDEX_FILE)) as f:
+            lines = f.readlines()
+    except IOError:
+        return []
+    # a line cut short by a crash isn't a chunk
+    return [json.loads(line) for line in lines if line.endswith("\n")]
+
+
+class store_writer(object):
+    """Append chunks to the store at path, creating it if need be."""
+    def __init__(self, path):
+        self.path = path
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        store_file = os.path.join(path, STORE_FILE)
+        if not os.path.exists(store_file):
+            with open(store_file, 'w') as f:
+                json.dump({'format': "gr-analyzer trace store",
+                           'version': STORE_VERSION}, f)
+        entries = read_index(path)
+        self.next_chunk = entries[-1]['chunk'] + 1 if entries else 0
+        index_file = os.path.join(path, INDEX_FILE)
+        self.index = open(index_file, 'a')
+        # drop a line cut short by a crash, which the next line would
+        # otherwise run on from
+        with open(index_file) as f:
+            self.index.truncate(f.read().rfind("\n") + 1)
+        self.tiles = tile_writer(os.path.join(path, TILES_FILE),
+                                 self.next_chunk)
+
+    def append(self, axis, traces, meta):
+        """Write traces (2-D float32) and their meta rows as a new chunk.
+
+        axis is the (min_freq, deltaf) of the traces' bins.
+        """
+        chunk = self.next_chunk
+        self.next_chunk += 1
+        data_name = "{:06d}.npy".format(chunk)
+        meta_name = "{:06d}.meta.npy".format(chunk)
+        np.save(os.path.join(self.path, data_name), traces)
+        np.save(os.path.join(self.path, meta_name), meta)
+
+        min_freq, deltaf = axis
+        entry = {
+            'chunk': chunk,
+            'data': data_name,
+            'meta': meta_name,
+            'rows': len(traces),
+            'npoints': traces.shape[1],
+            'min_freq': min_freq,
+            'deltaf': deltaf,
+            'start_time': float(meta['start_time'][0]),
+            'end_time': float(meta['end_time'][-1]),
+        }
+        # tiles first, so a chunk in the index always has its tiles
+        self.tiles.append(chunk, axis, traces, meta)
+        self.index.write(json.dumps(entry, sort_keys=True) + "\n")
+        self.index.flush()
+        return entry
+
+    def stats(self):
+        """Chunks are whole files written from the recorder's thread, each
+        complete before its index line, so there's no writer telemetry."""
+        return None
+
+    def close(self):
+        self.index.close()
+        self.tiles.close()
+
+
+class trace_recorder(trace_sink):
+    """Record every trace from a writer thread, to a store_writer (--store)
+    or an archive.archive_writer (--archive).
+
+    The flowgraph's thread only copies the trace into a bounded queue. If
+    the writer falls behind, traces are dropped and counted rather than
+    ever making the flowgraph wait. The writer batches traces into chunks
+    of up to CHUNK_ROWS, written whenever a chunk is full, the configuration
+    changes or FLUSH_INTERVAL has passed.
+    """
+    QUEUE_SIZE = 256     # traces waiting for the writer, at most
+    CHUNK_ROWS = 256     # traces per chunk, at most
+    FLUSH_INTERVAL = 5.0 # seconds a trace can wait to be written
+
+    def __init__(self, store, name="store"):
+        trace_sink.__init__(self)
+        self.logger = logging.getLogger('gr-analyzer.trace_recorder')
+        self.store = store
+        self.name = name # of the recorder in stats
+        self.queue = Queue(self.QUEUE_SIZE)
+        self.axis = None
+        self.dropped = 0
+        self.written = 0
+
+        self.writer = threading.Thread(target=self._write)
+        self.writer.daemon = True
+        self.writer.start()
+        self.logger.info("Recording traces to {}".format(store.path))
+
+    def configure(self, cfg):
+        self.axis = (cfg.min_freq, cfg.deltaf)
+
+    def update(self, points, info):
+        item = (self.axis, info, np.array(points, dtype=np.float32))
+        try:
+            self.queue.put_nowait(item)
+        except Full:
+            self.dropped += 1
+        return True
+
+    def _write(self):
+        chunk = None # preallocated rows of the chunk being filled
+        meta = np.zeros(self.CHUNK_ROWS, dtype=TRACE_META_DTYPE)
+        nrows = 0
+        axis = None
+        first_time = 0
+
+        while True:
+            timeout = max(first_time + self.FLUSH_INTERVAL - time.time(), 0)
+            try:
+                item = self.queue.get(timeout=timeout if nrows else None)
+            except Empty:
+                item = () # time to flush
+
+            if nrows and (not item or item[0] != axis or
+                          len(item[2]) != chunk.shape[1]):
+                self.store.append(axis, chunk[:nrows], meta[:nrows])
+                self.written += nrows
+                nrows = 0
+            if item is None:
+                self.store.close()
+                return
+            if not item:
+                continue
+
+            axis, info, points = item
+            if chunk is None or chunk.shape[1] != len(points):
+                chunk = np.empty((self.CHUNK_ROWS, len(points)),
+                                 dtype=np.float32)
+            if not nrows:
+                first_time = time.time()
+            chunk[nrows] = points
+            meta[nrows] = (info.generation, info.seq,
+                           info.start_time, info.end_time)
+            nrows += 1
+
+            if nrows == self.CHUNK_ROWS:
+                self.store.append(axis, chunk, meta)
+                self.written += nrows
+                nrows = 0
+
+    def stats(self):
+        """Return telemetry named as that of analyzer.async_writer, with
+        that of the store's own writer if it has one."""
+        stats = {self.name: {
+            'queue_depth': self.queue.qsize(),
+            'queue_capacity': self.QUEUE_SIZE,
+            'written_traces': self.written,
+            'dropped_writes': self.dropped,
+        }}
+        store_stats = self.store.stats()
+        if store_stats is not None:
+            stats[self.name + " file"] = store_stats
+        return stats
+
+    def close(self):
+        self.queue.put(None) # flush and stop the writer
+        self.writer.join()
+        msg = "Recorded {} traces ({} dropped)"
+        self.logger.info(msg.format(self.written, self.dropped))